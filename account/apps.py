@@ -1,5 +1,14 @@
+import os
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class AccountConfig(AppConfig):
     name = "account"
+
+    def ready(self):  # noqa: PLR6301
+        # The session cache unpickles every file in SESSION_CACHE_DIR, so only
+        # the app's user may read or write it, even if it already existed.
+        os.makedirs(settings.SESSION_CACHE_DIR, mode=0o700, exist_ok=True)
+        os.chmod(settings.SESSION_CACHE_DIR, 0o700)
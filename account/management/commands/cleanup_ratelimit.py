@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+from account.ratelimit import CounterCache
+
+
+class Command(BaseCommand):
+    help = "Delete expired rate-limit counters from the database."
+
+    def handle(self, *args, **options):
+        cache = caches[settings.RATELIMIT_USE_CACHE]
+        if not isinstance(cache, CounterCache):
+            self.stdout.write("The rate-limit cache expires its own counters.")
+            return
+        deleted = cache.delete_expired()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired counters."))
@@ -9,3 +9,14 @@ class MyModel(models.Model):
 
     def __str__(self):
         return self.username
+
+
+class RateLimitCounter(models.Model):
+    """A counter of the shared rate-limit cache, see account.ratelimit."""
+
+    key = models.CharField(max_length=255, unique=True)
+    value = models.BigIntegerField(default=0)
+    expires = models.DateTimeField(null=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.key}={self.value}"
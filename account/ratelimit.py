@@ -0,0 +1,95 @@
+from datetime import UTC, datetime
+
+from .models import RateLimitCounter
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+class CounterCache(BaseCache):
+    """A cache of integer counters stored in the RateLimitCounter table.
+
+    It implements the subset of the cache API django_ratelimit relies on,
+    ``add`` and ``incr`` in particular, with single-statement updates so
+    counts stay exact across worker processes and, on a database server,
+    across hosts. Only integers can be stored.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+
+    def _expires(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        return None if timeout is None else datetime.fromtimestamp(timeout, tz=UTC)
+
+    @staticmethod
+    def _live(key):
+        now = timezone.now()
+        return RateLimitCounter.objects.filter(
+            Q(expires__isnull=True) | Q(expires__gt=now), key=key
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+        expires = self._expires(timeout)
+        # Reuse the row of an expired counter rather than deleting it first.
+        if RateLimitCounter.objects.filter(key=key, expires__lte=timezone.now()).update(
+            value=value, expires=expires
+        ):
+            return True
+        try:
+            with transaction.atomic():
+                RateLimitCounter.objects.create(key=key, value=value, expires=expires)
+        except IntegrityError:
+            return False
+        return True
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version)
+        value = self._live(key).values_list("value", flat=True).first()
+        return default if value is None else value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+        RateLimitCounter.objects.update_or_create(
+            key=key, defaults={"value": value, "expires": self._expires(timeout)}
+        )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+        return bool(self._live(key).update(expires=self._expires(timeout)))
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version)
+        deleted, _ = RateLimitCounter.objects.filter(key=key).delete()
+        return bool(deleted)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version)
+        return self._live(key).exists()
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version)
+        # The UPDATE locks the row until commit, so the value read back is
+        # the one this increment produced.
+        with transaction.atomic():
+            counter = self._live(key)
+            if not counter.update(value=F("value") + delta):
+                raise ValueError(f"Key '{key}' not found")
+            return counter.values_list("value", flat=True).get()
+
+    def clear(self):  # noqa: PLR6301
+        RateLimitCounter.objects.all().delete()
+
+    @staticmethod
+    def delete_expired():
+        """Delete expired counters; returns the number deleted.
+
+        Every rate window uses a new key, so these pile up unless
+        ``manage.py cleanup_ratelimit`` runs periodically.
+        """
+        deleted, _ = RateLimitCounter.objects.filter(
+            expires__lte=timezone.now()
+        ).delete()
+        return deleted
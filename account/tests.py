@@ -1 +1,132 @@
-# Create your tests here.
+import io
+import os
+import stat
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from .models import RateLimitCounter
+from .ratelimit import CounterCache
+from django.apps import apps
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from imgpredict.middleware import REFRESHED_KEY, SessionRefreshMiddleware
+
+
+class CounterCacheTests(TestCase):
+    """The database-backed counters shared by the rate limits."""
+
+    def setUp(self):
+        self.cache = CounterCache("", {})
+
+    def expire(self, key):
+        RateLimitCounter.objects.filter(key=self.cache.make_key(key)).update(
+            expires=timezone.now() - timedelta(seconds=1)
+        )
+
+    def test_add_only_creates_missing_keys(self):
+        self.assertTrue(self.cache.add("a", 1, 60))
+        self.assertFalse(self.cache.add("a", 5, 60))
+        self.assertEqual(self.cache.get("a"), 1)
+        counter = RateLimitCounter.objects.get(key=self.cache.make_key("a"))
+        self.assertAlmostEqual(
+            counter.expires, timezone.now() + timedelta(seconds=60), delta=timedelta(5)
+        )
+
+    def test_add_without_timeout_never_expires(self):
+        self.cache.add("a", 1, None)
+        self.assertIsNone(RateLimitCounter.objects.get().expires)
+        self.assertTrue(self.cache.has_key("a"))
+
+    def test_incr(self):
+        self.cache.add("a", 1, 60)
+        self.assertEqual(self.cache.incr("a"), 2)
+        self.assertEqual(self.cache.incr("a", 3), 5)
+        self.assertEqual(self.cache.get("a"), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
+
+    def test_expired_counters_are_gone(self):
+        self.cache.add("a", 7, 60)
+        self.expire("a")
+        self.assertIsNone(self.cache.get("a"))
+        self.assertFalse(self.cache.has_key("a"))
+        with self.assertRaises(ValueError):
+            self.cache.incr("a")
+        # The expired row is reused for the next window.
+        self.assertTrue(self.cache.add("a", 1, 60))
+        self.assertEqual(self.cache.incr("a"), 2)
+        self.assertEqual(RateLimitCounter.objects.count(), 1)
+
+    def test_cleanup_deletes_only_expired_counters(self):
+        self.cache.add("old", 1, 60)
+        self.expire("old")
+        self.cache.add("new", 1, 60)
+        self.cache.add("forever", 1, None)
+        out = io.StringIO()
+        call_command("cleanup_ratelimit", stdout=out)
+        self.assertIn("Deleted 1 expired counters", out.getvalue())
+        self.assertEqual(
+            set(RateLimitCounter.objects.values_list("key", flat=True)),
+            {self.cache.make_key("new"), self.cache.make_key("forever")},
+        )
+
+
+@override_settings(SESSION_REFRESH_THRESHOLD=3600)
+class SessionRefreshMiddlewareTests(TestCase):
+    """Unchanged sessions are re-saved once per refresh threshold, not per request."""
+
+    middleware = SessionRefreshMiddleware(lambda request: HttpResponse())
+
+    def run_request(self, session, now):
+        request = RequestFactory().get("/")
+        request.session = session
+        with mock.patch("imgpredict.middleware.time.time", return_value=now):
+            self.middleware(request)
+        return request.session
+
+    @staticmethod
+    def stored_session(refreshed):
+        session = SessionStore()
+        session["user"] = "someone"
+        session[REFRESHED_KEY] = refreshed
+        session.save()
+        return SessionStore(session.session_key)
+
+    def test_empty_session_is_left_alone(self):
+        session = self.run_request(SessionStore(), now=5000)
+        self.assertFalse(session.modified)
+
+    def test_recent_session_is_not_saved(self):
+        session = self.run_request(self.stored_session(refreshed=2000), now=5000)
+        self.assertFalse(session.modified)
+        self.assertEqual(session[REFRESHED_KEY], 2000)
+
+    def test_stale_session_is_refreshed(self):
+        session = self.run_request(self.stored_session(refreshed=1000), now=5000)
+        self.assertTrue(session.modified)
+        self.assertEqual(session[REFRESHED_KEY], 5000)
+
+    def test_modified_session_counts_as_refreshed(self):
+        session = self.stored_session(refreshed=4000)
+        session["cart"] = 1
+        session = self.run_request(session, now=5000)
+        self.assertEqual(session[REFRESHED_KEY], 5000)
+
+    @override_settings(SESSION_REFRESH_THRESHOLD=0)
+    def test_zero_threshold_saves_every_request(self):
+        session = self.run_request(self.stored_session(refreshed=5000), now=5000)
+        self.assertTrue(session.modified)
+
+    def test_session_cache_dir_is_private(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_dir = os.path.join(tmp, "sessions")
+            os.mkdir(cache_dir)
+            os.chmod(cache_dir, 0o755)  # noqa: S103 - what ready() must tighten
+            with override_settings(SESSION_CACHE_DIR=cache_dir):
+                apps.get_app_config("account").ready()
+            self.assertEqual(stat.S_IMODE(os.stat(cache_dir).st_mode), 0o700)
@@ -104,7 +104,6 @@ def login_view(request):
     if form.is_valid():
         user = form.get_user()
         login(request, user)
-        request.session["user_id"] = user.id
         messages.success(request, "You are now logged in!")
         next_url = request.POST.get("next", "homepage")
         return redirect(next_url)
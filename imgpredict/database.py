@@ -0,0 +1,78 @@
+from urllib.parse import parse_qsl, unquote, urlparse
+
+
+ENGINES = {
+    "postgres": "django.db.backends.postgresql",
+    "postgresql": "django.db.backends.postgresql",
+    "pgsql": "django.db.backends.postgresql",
+    "mysql": "django.db.backends.mysql",
+    "sqlite": "django.db.backends.sqlite3",
+}
+
+
+def sqlite_options(tuned, busy_timeout):
+    """Connection options for SQLite.
+
+    The tuned mode switches to WAL so readers never wait on the writer,
+    relaxes fsyncs to once per checkpoint, and starts write transactions
+    with BEGIN IMMEDIATE so concurrent writers queue on the busy timeout
+    instead of failing with "database is locked" when upgrading a lock.
+    """
+    if not tuned:
+        return {}
+    return {
+        "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;",
+        "transaction_mode": "IMMEDIATE",
+        "timeout": busy_timeout,
+    }
+
+
+def parse_database_url(
+    url,
+    *,
+    sqlite_tuned=True,
+    sqlite_busy_timeout=20,
+    pool_max_size=10,
+    conn_max_age=60,
+):
+    """Build a ``DATABASES`` entry from a URL such as ``postgres://u:p@host/db``.
+
+    ``sqlite:////absolute/path.sqlite3`` selects SQLite. Query parameters
+    are passed through as driver options (for example ``?sslmode=require``).
+    PostgreSQL uses psycopg's connection pool unless ``pool_max_size`` is 0,
+    in which case connections persist for ``conn_max_age`` seconds.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ENGINES:
+        raise ValueError(f"Unsupported DATABASE_URL scheme: {parsed.scheme!r}")
+    engine = ENGINES[parsed.scheme]
+    options = dict(parse_qsl(parsed.query))
+
+    if engine == ENGINES["sqlite"]:
+        return {
+            "ENGINE": engine,
+            "NAME": unquote(parsed.path[1:]),
+            "OPTIONS": {**sqlite_options(sqlite_tuned, sqlite_busy_timeout), **options},
+        }
+
+    database = {
+        "ENGINE": engine,
+        "NAME": unquote(parsed.path.lstrip("/")),
+        "USER": unquote(parsed.username or ""),
+        "PASSWORD": unquote(parsed.password or ""),
+        "HOST": parsed.hostname or "",
+        "PORT": str(parsed.port or ""),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": options,
+    }
+    if engine == ENGINES["postgres"] and pool_max_size:
+        # Pooled connections are returned to the pool instead of persisting.
+        database["CONN_MAX_AGE"] = 0
+        database["OPTIONS"]["pool"] = {
+            "min_size": min(2, pool_max_size),
+            "max_size": pool_max_size,
+            "timeout": 10,
+        }
+    else:
+        database["CONN_MAX_AGE"] = conn_max_age
+    return database
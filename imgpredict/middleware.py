@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+
+
+# Session key holding when the session was last written, as a Unix timestamp
+REFRESHED_KEY = "_session_refreshed"
+
+
+class SessionRefreshMiddleware:
+    """Keep sessions alive without writing them on every request.
+
+    Django saves a session when it is modified; this middleware additionally
+    re-saves an unchanged session once SESSION_REFRESH_THRESHOLD seconds have
+    passed since its last write, which pushes its expiry and the cookie's
+    max-age forward. Must sit right after SessionMiddleware so the flag it
+    sets is seen when the response leaves that middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        session = getattr(request, "session", None)
+        if session is None or session.is_empty():
+            return response
+
+        now = int(time.time())
+        if session.modified:
+            # The session is written anyway; count it as a refresh.
+            session[REFRESHED_KEY] = now
+        elif now - session.get(REFRESHED_KEY, 0) >= settings.SESSION_REFRESH_THRESHOLD:
+            session[REFRESHED_KEY] = now
+        return response
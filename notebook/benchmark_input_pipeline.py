@@ -0,0 +1,82 @@
+"""Compare ImageDataGenerator.flow with the tf.data pipeline in input_pipeline.py.
+
+Measures the input pipeline on its own (images/s over one epoch) and a
+short training run of the model in cifar_model.py, extrapolated to a full
+epoch. Run from this directory: ``python benchmark_input_pipeline.py``.
+"""
+
+import argparse
+import math
+import time
+
+import tensorflow as tf
+from cifar_data import load, prepare
+from cifar_model import build_model
+from input_pipeline import make_training_dataset
+from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+
+def generator_flow(x, y, batch_size):
+    """The augmentation train_model.py used before the tf.data pipeline."""
+    datagen = ImageDataGenerator(
+        rotation_range=15,
+        width_shift_range=0.1,
+        height_shift_range=0.1,
+        horizontal_flip=True,
+        zoom_range=0.1,
+    )
+    return datagen.flow(x.astype("float32") / 255.0, y, batch_size=batch_size)
+
+
+def pipeline_rate(batches, steps, batch_size):
+    """Images/s drawn from ``batches`` over ``steps`` batches."""
+    iterator = iter(batches)
+    next(iterator)
+    start = time.perf_counter()
+    for _ in range(steps):
+        next(iterator)
+    return steps * batch_size / (time.perf_counter() - start)
+
+
+def fit_seconds_per_step(batches, steps):
+    """Seconds per training step, after one warm-up step."""
+    model = build_model()
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
+        loss="categorical_crossentropy",
+        metrics=["accuracy"],
+    )
+    model.fit(batches, epochs=1, steps_per_epoch=1, verbose=0)
+    start = time.perf_counter()
+    model.fit(batches, epochs=1, steps_per_epoch=steps, verbose=0)
+    return (time.perf_counter() - start) / steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--fit-steps", type=int, default=100)
+    args = parser.parse_args()
+
+    prepare()
+    x_train, y_train = load("train")
+    y_train = tf.keras.utils.to_categorical(y_train, 10)
+    steps_per_epoch = math.ceil(len(x_train) / args.batch_size)
+
+    candidates = {
+        "ImageDataGenerator": lambda: generator_flow(x_train, y_train, args.batch_size),
+        "tf.data": lambda: make_training_dataset(x_train, y_train, args.batch_size),
+    }
+    print(f"{steps_per_epoch} steps of {args.batch_size} images per epoch")  # noqa: T201
+    for name, batches in candidates.items():
+        rate = pipeline_rate(batches(), steps_per_epoch - 1, args.batch_size)
+        step = fit_seconds_per_step(batches(), args.fit_steps)
+        print(  # noqa: T201
+            f"{name:>18}: input {rate:8.0f} images/s, "
+            f"training {step * 1000:6.1f} ms/step, "
+            f"{step * steps_per_epoch:6.1f} s/epoch"
+        )
+
+
+if __name__ == "__main__":
+    main()
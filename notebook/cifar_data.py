@@ -0,0 +1,145 @@
+"""CIFAR-10 as memory-mapped uint8 arrays, converted once and read offline.
+
+``python cifar_data.py`` writes ``x_<split>.npy`` / ``y_<split>.npy`` for
+the train, val and test splits to ``data/cifar10``. The val/test split
+halves the official test set exactly as
+``train_test_split(test_size=0.5, random_state=0)`` did, so results stay
+comparable with earlier runs. Images are kept as uint8; normalize them per
+batch (see input_pipeline.py) rather than converting whole arrays.
+"""
+
+import argparse
+import os
+import pickle  # noqa: S403
+import shutil
+import tarfile
+
+import numpy as np
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cifar10")
+SPLITS = ("train", "val", "test")
+SPLIT_SEED = 0
+
+_TRAIN_BATCHES = [f"data_batch_{i}" for i in range(1, 6)]
+_TEST_BATCH = "test_batch"
+_BATCH_NAMES = {*_TRAIN_BATCHES, _TEST_BATCH}
+
+
+def _unpickle(data):
+    batch = pickle.loads(data, encoding="bytes")  # noqa: S301
+    images = batch[b"data"].reshape(-1, 3, 32, 32).transpose(0, 2, 3, 1)
+    return np.ascontiguousarray(images), np.asarray(batch[b"labels"], np.uint8)
+
+
+def _read_batches(source):
+    """Read the python-version batches from an extracted directory or .tar.gz."""
+    if os.path.isdir(source):
+        batches = {}
+        for name in _BATCH_NAMES:
+            with open(os.path.join(source, name), "rb") as f:
+                batches[name] = _unpickle(f.read())
+        return batches
+    with tarfile.open(source) as archive:
+        return {
+            os.path.basename(member.name): _unpickle(archive.extractfile(member).read())
+            for member in archive.getmembers()
+            if os.path.basename(member.name) in _BATCH_NAMES
+        }
+
+
+def _download():
+    """Fetch CIFAR-10 through Keras' dataset cache (network on first use)."""
+    import tensorflow as tf  # noqa: PLC0415
+
+    (x_train, y_train), (x_test, y_test) = tf.keras.datasets.cifar10.load_data()
+    return x_train, y_train.ravel(), x_test, y_test.ravel()
+
+
+def split_test_set(x_test, y_test, seed=SPLIT_SEED):
+    """Halve the test set into ``(val, test)`` pairs, as train_test_split did."""
+    permutation = np.random.RandomState(seed).permutation(len(x_test))
+    n_val = int(np.ceil(0.5 * len(x_test)))
+    val_idx, test_idx = permutation[:n_val], permutation[n_val:]
+    return (x_test[val_idx], y_test[val_idx]), (x_test[test_idx], y_test[test_idx])
+
+
+def prepare(data_dir=DATA_DIR, source=None, force=False):
+    """Convert CIFAR-10 into ``data_dir`` unless it is already there.
+
+    ``source`` is the ``cifar-10-batches-py`` directory or the
+    ``cifar-10-python.tar.gz`` archive; without one the dataset comes from
+    ``tf.keras.datasets.cifar10``. Returns ``data_dir``.
+    """
+    if is_prepared(data_dir) and not force:
+        return data_dir
+    if source is None:
+        x_train, y_train, x_test, y_test = _download()
+    else:
+        batches = _read_batches(source)
+        x_train = np.concatenate([batches[name][0] for name in _TRAIN_BATCHES])
+        y_train = np.concatenate([batches[name][1] for name in _TRAIN_BATCHES])
+        x_test, y_test = batches[_TEST_BATCH]
+    val, test = split_test_set(x_test, y_test)
+    arrays = {"train": (x_train, y_train), "val": val, "test": test}
+
+    # Write next to the target and swap it in, so readers never see half a cache.
+    tmp_dir = f"{data_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for split, (x, y) in arrays.items():
+        np.save(
+            os.path.join(tmp_dir, f"x_{split}.npy"), np.ascontiguousarray(x, np.uint8)
+        )
+        np.save(
+            os.path.join(tmp_dir, f"y_{split}.npy"), np.asarray(y, np.uint8).ravel()
+        )
+    shutil.rmtree(data_dir, ignore_errors=True)
+    os.replace(tmp_dir, data_dir)
+    return data_dir
+
+
+def is_prepared(data_dir=DATA_DIR):
+    return all(
+        os.path.exists(os.path.join(data_dir, f"{kind}_{split}.npy"))
+        for split in SPLITS
+        for kind in ("x", "y")
+    )
+
+
+def load(split, data_dir=DATA_DIR):
+    """Return ``(images, labels)`` for ``split`` as read-only memory maps.
+
+    Images are uint8 (N, 32, 32, 3) and labels uint8 (N,). Pages are read
+    from disk on first access and shared between processes.
+    """
+    if split not in SPLITS:
+        raise ValueError(f"Unknown split {split!r}; expected one of {SPLITS}.")
+    if not is_prepared(data_dir):
+        raise FileNotFoundError(
+            f"No CIFAR-10 cache in {data_dir}; run `python cifar_data.py` first."
+        )
+    return (
+        np.load(os.path.join(data_dir, f"x_{split}.npy"), mmap_mode="r"),
+        np.load(os.path.join(data_dir, f"y_{split}.npy"), mmap_mode="r"),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert CIFAR-10 to .npy files.")
+    parser.add_argument(
+        "--source", help="cifar-10-batches-py directory or cifar-10-python.tar.gz."
+    )
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--force", action="store_true", help="Convert again.")
+    args = parser.parse_args()
+
+    data_dir = prepare(args.data_dir, args.source, args.force)
+    for split in SPLITS:
+        x, _ = load(split, data_dir)
+        print(f"{split}: {len(x)} images")  # noqa: T201
+    print(f"Saved to {data_dir}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import tensorflow as tf
+from tensorflow.keras.layers import (
+    BatchNormalization,
+    Conv2D,
+    Dense,
+    Dropout,
+    Flatten,
+    Input,
+    MaxPooling2D,
+)
+from tensorflow.keras.models import Sequential
+
+
+def build_model(
+    weight_decay=1e-4,
+    filters=(32, 64, 128),
+    dropouts=(0.2, 0.3, 0.3),
+    dense_units=128,
+):
+    """The CIFAR-10 CNN trained by train_model.py, uncompiled.
+
+    Each entry of ``filters`` adds a block of two 3x3 convolutions of that
+    width (with batch norm), 2x2 max pooling and dropout at the matching
+    rate from ``dropouts``. The defaults give the original architecture.
+    """
+    if len(filters) != len(dropouts):
+        raise ValueError("filters and dropouts need one entry per block.")
+    layers = [Input(shape=(32, 32, 3))]
+    for width, rate in zip(filters, dropouts, strict=True):
+        for _ in range(2):
+            layers.extend((
+                Conv2D(
+                    width,
+                    (3, 3),
+                    activation="relu",
+                    padding="same",
+                    kernel_regularizer=tf.keras.regularizers.l2(weight_decay),
+                ),
+                BatchNormalization(),
+            ))
+        layers.extend((MaxPooling2D((2, 2)), Dropout(rate)))
+    layers.extend((
+        Flatten(),
+        Dense(dense_units, activation="relu"),
+        Dense(10, activation="softmax"),
+    ))
+    return Sequential(layers)
@@ -0,0 +1,134 @@
+import math
+
+import tensorflow as tf
+
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+# Augmentation ranges, matching the ImageDataGenerator the model was trained with
+ROTATION_DEGREES = 15
+SHIFT_FRACTION = 0.1
+ZOOM_RANGE = 0.1
+
+# Epoch seeds are seed * EPOCH_SEED_STRIDE + epoch, distinct for any real run
+EPOCH_SEED_STRIDE = 1_000_003
+
+
+def normalize(images):
+    """Scale uint8 pixels to float32 in [0, 1]."""
+    return tf.cast(images, tf.float32) / 255.0
+
+
+def _transforms(n, height, width, seed):
+    """Random affine matrices, one per image, in ImageProjectiveTransform form."""
+    seeds = tf.random.experimental.stateless_split(seed, num=6)
+
+    def uniform(i, limit):
+        return tf.random.stateless_uniform([n], seeds[i], -limit, limit)
+
+    angle = uniform(0, ROTATION_DEGREES * math.pi / 180)
+    shift_x = uniform(1, SHIFT_FRACTION) * width
+    shift_y = uniform(2, SHIFT_FRACTION) * height
+    zoom_x = 1 + uniform(3, ZOOM_RANGE)
+    zoom_y = 1 + uniform(4, ZOOM_RANGE)
+    flip = tf.where(tf.random.stateless_uniform([n], seeds[5]) < 0.5, -1.0, 1.0)
+
+    # Map each output pixel back to its source pixel, rotating about the centre.
+    cx, cy = (width - 1) / 2, (height - 1) / 2
+    a0, a1 = zoom_x * tf.cos(angle) * flip, -zoom_x * tf.sin(angle)
+    b0, b1 = zoom_y * tf.sin(angle) * flip, zoom_y * tf.cos(angle)
+    zeros = tf.zeros_like(a0)
+    return tf.stack(
+        [
+            a0,
+            a1,
+            cx + shift_x - a0 * cx - a1 * cy,
+            b0,
+            b1,
+            cy + shift_y - b0 * cx - b1 * cy,
+            zeros,
+            zeros,
+        ],
+        axis=1,
+    )
+
+
+def augment_batch(images, seed):
+    """Randomly flip, shift, rotate and zoom a float (N, H, W, C) batch.
+
+    The four transforms are composed into one affine matrix per image and
+    applied with a single bilinear warp over the whole batch, as
+    ImageDataGenerator does per image. ``seed`` is a shape-[2] integer
+    tensor; the same seed always gives the same augmentation.
+    """
+    shape = tf.shape(images)
+    transforms = _transforms(
+        shape[0], tf.cast(shape[1], tf.float32), tf.cast(shape[2], tf.float32), seed
+    )
+    return tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=transforms,
+        output_shape=shape[1:3],
+        fill_value=0.0,
+        interpolation="BILINEAR",
+        fill_mode="NEAREST",
+    )
+
+
+def steps_per_epoch(x, batch_size):
+    return math.ceil(len(x) / batch_size)
+
+
+def make_dataset(x, y, batch_size=32):
+    """Batches of uint8 images ``x`` and labels ``y`` for evaluation.
+
+    Normalization runs per batch in a parallel map, and the next batch is
+    prefetched while the model works on the current one.
+    """
+    return (
+        tf.data.Dataset.from_tensor_slices((x, y))
+        .cache()
+        .batch(batch_size)
+        .map(lambda images, labels: (normalize(images), labels), AUTOTUNE)
+        .prefetch(AUTOTUNE)
+    )
+
+
+def make_training_dataset(x, y, batch_size=32, seed=0, initial_epoch=0):
+    """Shuffled, augmented training batches that repeat epoch after epoch.
+
+    Like make_dataset, but each batch is also augmented as a whole. The
+    dataset is unbounded, so pass ``steps_per_epoch`` to ``fit``. Each
+    epoch's order and augmentation depend only on ``seed`` and the epoch
+    number; a run resumed at ``initial_epoch`` sees exactly the batches an
+    uninterrupted run would.
+    """
+    # Held in variables so the map functions reference the arrays instead
+    # of copying them into the dataset graph as constants.
+    images = tf.Variable(x, trainable=False)
+    labels = tf.Variable(y, trainable=False)
+
+    def epoch_batches(epoch):
+        # A stateless permutation, so the order is a function of the epoch
+        epoch_seed = seed * EPOCH_SEED_STRIDE + epoch
+        order = tf.argsort(
+            tf.random.stateless_uniform([len(x)], tf.stack([epoch_seed, -1]))
+        )
+        return (
+            tf.data.Dataset.from_tensor_slices(order)
+            .batch(batch_size)
+            .enumerate()
+            .map(
+                lambda step, index: (
+                    augment_batch(
+                        normalize(tf.gather(images, index)),
+                        tf.stack([epoch_seed, step]),
+                    ),
+                    tf.gather(labels, index),
+                ),
+                num_parallel_calls=AUTOTUNE,
+            )
+        )
+
+    epochs = tf.data.Dataset.counter(initial_epoch)
+    return epochs.flat_map(epoch_batches).prefetch(AUTOTUNE)
@@ -0,0 +1,242 @@
+"""Hyperparameter sweep over the CIFAR-10 CNN with successive halving.
+
+    python sweep.py --trials 27 --min-epochs 2 --max-epochs 18 --eta 3
+
+Configurations are sampled from SEARCH_SPACE. Each trial is a resumable
+train_model run in ``<sweep-dir>/trial-NN``. Every trial trains for
+--min-epochs. The best 1/--eta by validation accuracy then continue to
+--eta times as many epochs, and so on up to --max-epochs. Trials run as
+separate processes, --workers at a time, each limited to --threads CPU
+threads so concurrent trials do not oversubscribe the cores.
+
+Finally, the single-image inference latency of every trial's model is
+measured one model at a time. ``leaderboard.csv`` lists it next to the
+accuracy. Running the same command again picks up where it stopped.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+
+RUNS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runs")
+
+SEARCH_SPACE = {
+    "learning_rate": [3e-4, 1e-3, 3e-3],
+    "weight_decay": [0.0, 1e-4, 5e-4],
+    "filters": [(16, 32, 64), (32, 64, 128), (48, 96, 192)],
+    "dropouts": [(0.1, 0.2, 0.2), (0.2, 0.3, 0.3), (0.3, 0.4, 0.4)],
+    "dense_units": [64, 128, 256],
+}
+
+LEADERBOARD_FIELDS = [
+    "trial",
+    "epochs",
+    "val_accuracy",
+    "val_loss",
+    "latency_ms",
+    "params",
+    *SEARCH_SPACE,
+]
+
+
+def sample_configs(count, seed=0):
+    """Draw ``count`` distinct configurations from SEARCH_SPACE."""
+    grid = list(itertools.product(*SEARCH_SPACE.values()))
+    picks = random.Random(seed).sample(grid, min(count, len(grid)))  # noqa: S311
+    return [dict(zip(SEARCH_SPACE, values, strict=True)) for values in picks]
+
+
+def limit_threads(threads):
+    """Cap this process's TensorFlow and OpenMP thread pools.
+
+    Runs as the worker initializer, before TensorFlow creates its pools.
+    """
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    import tensorflow as tf  # noqa: PLC0415
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def run_trial(trial_dir, config, epochs, train_size=None):
+    """Train (or resume) one trial up to ``epochs``; return its best scores."""
+    from train_model import load_splits, read_history, train  # noqa: PLC0415
+
+    splits = load_splits()
+    if train_size:
+        x_train, y_train = splits["train"]
+        splits["train"] = (x_train[:train_size], y_train[:train_size])
+    model_options = {
+        name: value for name, value in config.items() if name != "learning_rate"
+    }
+    train(
+        trial_dir,
+        splits,
+        epochs=epochs,
+        learning_rate=config["learning_rate"],
+        model=model_options,
+        verbose=0,
+    )
+    # Score only this rung's epochs, so a rerun ranks trials the same way
+    # even when some have already trained further.
+    history = {
+        name: values[:epochs] for name, values in read_history(trial_dir).items()
+    }
+    return {
+        "epochs": len(history["val_accuracy"]),
+        "val_accuracy": max(history["val_accuracy"]),
+        "val_loss": min(history["val_loss"]),
+    }
+
+
+def measure_latency(trial_dir, iterations=100):
+    """Median single-image inference time of a trial's model, in milliseconds."""
+    import numpy as np  # noqa: PLC0415
+    import tensorflow as tf  # noqa: PLC0415
+
+    model = tf.keras.models.load_model(os.path.join(trial_dir, "model.keras"))
+    # A traced function, as served, so Python overhead does not swamp the model.
+    predict = tf.function(lambda batch: model(batch, training=False))
+    image = tf.constant(np.zeros((1, 32, 32, 3), np.float32))
+    for _ in range(10):
+        predict(image).numpy()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        predict(image).numpy()
+        timings.append(time.perf_counter() - start)
+    return {
+        "latency_ms": statistics.median(timings) * 1000,
+        "params": model.count_params(),
+    }
+
+
+def _prepare_trials(sweep_dir, configs):
+    """Create a directory per trial, refusing to reuse one with another config."""
+    trials = {}
+    for index, config in enumerate(configs):
+        name = f"trial-{index:02d}"
+        trial_dir = os.path.join(sweep_dir, name)
+        os.makedirs(trial_dir, exist_ok=True)
+        path = os.path.join(trial_dir, "config.json")
+        stored = json.loads(json.dumps(config))
+        if os.path.exists(path):
+            with open(path) as f:
+                if json.load(f) != stored:
+                    raise ValueError(
+                        f"{trial_dir} holds a different configuration; "
+                        f"use a new --sweep-dir."
+                    )
+        else:
+            with open(path, "w") as f:
+                json.dump(stored, f, indent=2)
+        trials[name] = config
+    return trials
+
+
+def _pool(workers, threads):
+    # A fresh process per task, so every trial starts with its own limited
+    # thread pools and returns its memory when it ends.
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=limit_threads,
+        initargs=(threads,),
+        max_tasks_per_child=1,
+    )
+
+
+def successive_halving(sweep_dir, trials, args):
+    """Train the trials rung by rung, keeping the best 1/eta after each."""
+    results = {}
+    alive = list(trials)
+    epochs = args.min_epochs
+    while True:
+        print(f"Training {len(alive)} trials to {epochs} epochs")  # noqa: T201
+        with _pool(args.workers, args.threads) as executor:
+            futures = {
+                name: executor.submit(
+                    run_trial,
+                    os.path.join(sweep_dir, name),
+                    trials[name],
+                    epochs,
+                    args.train_size,
+                )
+                for name in alive
+            }
+            for name, future in futures.items():
+                results[name] = future.result()
+                print(  # noqa: T201
+                    f"  {name}: val_accuracy {results[name]['val_accuracy']:.4f} "
+                    f"after {results[name]['epochs']} epochs"
+                )
+        if epochs >= args.max_epochs or len(alive) == 1:
+            return results
+        alive.sort(key=lambda name: results[name]["val_accuracy"], reverse=True)
+        alive = alive[: max(1, len(alive) // args.eta)]
+        epochs = min(epochs * args.eta, args.max_epochs)
+
+
+def write_leaderboard(path, trials, results):
+    rows = [
+        {"trial": name, **results[name], **trials[name]}
+        for name in sorted(
+            results, key=lambda name: results[name]["val_accuracy"], reverse=True
+        )
+    ]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, LEADERBOARD_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep CNN hyperparameters.")
+    parser.add_argument("--sweep-dir", default=os.path.join(RUNS_DIR, "sweep"))
+    parser.add_argument("--trials", type=int, default=27)
+    parser.add_argument("--seed", type=int, default=0, help="Sampling seed.")
+    parser.add_argument("--min-epochs", type=int, default=2)
+    parser.add_argument("--max-epochs", type=int, default=18)
+    parser.add_argument("--eta", type=int, default=3, help="Keep 1/eta per rung.")
+    parser.add_argument("--workers", type=int, default=max(1, os.cpu_count() // 2))
+    parser.add_argument(
+        "--threads", type=int, help="Threads per trial (default: cores / workers)."
+    )
+    parser.add_argument(
+        "--train-size", type=int, help="Train on the first N images only."
+    )
+    args = parser.parse_args()
+    args.threads = args.threads or max(1, os.cpu_count() // args.workers)
+
+    trials = _prepare_trials(args.sweep_dir, sample_configs(args.trials, args.seed))
+    results = successive_halving(args.sweep_dir, trials, args)
+
+    print("Measuring inference latency")  # noqa: T201
+    with _pool(1, args.threads) as executor:
+        for name in results:
+            results[name] |= executor.submit(
+                measure_latency, os.path.join(args.sweep_dir, name)
+            ).result()
+
+    rows = write_leaderboard(
+        os.path.join(args.sweep_dir, "leaderboard.csv"), trials, results
+    )
+    print(f"{'trial':<10}{'epochs':>7}{'val_acc':>9}{'latency':>10}{'params':>10}")  # noqa: T201
+    for row in rows:
+        print(  # noqa: T201
+            f"{row['trial']:<10}{row['epochs']:>7}{row['val_accuracy']:>9.4f}"
+            f"{row['latency_ms']:>8.2f}ms{row['params']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
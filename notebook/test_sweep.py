@@ -0,0 +1,84 @@
+"""Unit tests of the sweep's successive halving, with training stubbed out.
+
+python -m unittest discover notebook
+"""
+
+import contextlib
+import io
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+
+import sweep
+
+
+class SuccessiveHalvingTests(unittest.TestCase):
+    """Rungs, promotions and the epoch cap, without TensorFlow."""
+
+    def setUp(self):
+        self.calls = []
+        for name, replacement in (
+            ("run_trial", self.run_trial),
+            ("_pool", lambda workers, threads: ThreadPoolExecutor(workers)),
+        ):
+            patcher = mock.patch.object(sweep, name, replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_trial(self, trial_dir, config, epochs, train_size=None):
+        self.calls.append((os.path.basename(trial_dir), epochs))
+        return {
+            "epochs": epochs,
+            "val_accuracy": config["quality"] + epochs / 1000,
+            "val_loss": 1 - config["quality"],
+        }
+
+    @staticmethod
+    def halve(count, **options):
+        # trial-00 is the worst configuration, trial-NN the best.
+        trials = {f"trial-{i:02d}": {"quality": i / 100} for i in range(count)}
+        args = SimpleNamespace(**{
+            "workers": 2,
+            "threads": 1,
+            "train_size": None,
+            **options,
+        })
+        with contextlib.redirect_stdout(io.StringIO()):
+            return sweep.successive_halving("sweep", trials, args)
+
+    def rungs(self):
+        rungs = {}
+        for name, epochs in self.calls:
+            rungs.setdefault(epochs, set()).add(name)
+        return rungs
+
+    def test_best_third_is_promoted_each_rung(self):
+        results = self.halve(9, min_epochs=2, max_epochs=18, eta=3)
+        self.assertEqual(
+            self.rungs(),
+            {
+                2: {f"trial-{i:02d}" for i in range(9)},
+                6: {"trial-06", "trial-07", "trial-08"},
+                18: {"trial-08"},
+            },
+        )
+        self.assertEqual(results["trial-08"]["epochs"], 18)
+        self.assertEqual(results["trial-07"]["epochs"], 6)
+        self.assertEqual(results["trial-00"]["epochs"], 2)
+
+    def test_last_rung_is_capped_at_max_epochs(self):
+        self.halve(9, min_epochs=2, max_epochs=5, eta=3)
+        self.assertEqual(
+            {epochs: len(names) for epochs, names in self.rungs().items()},
+            {2: 9, 5: 3},
+        )
+
+    def test_at_least_one_trial_is_promoted(self):
+        self.halve(2, min_epochs=1, max_epochs=9, eta=3)
+        self.assertEqual(self.rungs(), {1: {"trial-00", "trial-01"}, 3: {"trial-01"}})
+
+
+if __name__ == "__main__":
+    unittest.main()
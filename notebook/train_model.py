@@ -1,120 +1,336 @@
-import warnings
+"""Train the CIFAR-10 CNN in a resumable run.
 
+    python train_model.py --run-dir runs/baseline --epochs 100
+
+Everything a run produces goes to its directory: full training state under
+``checkpoint/`` every ``--checkpoint-every`` epochs, one row of metrics per
+epoch in ``history.csv``, ``best_model.keras`` (lowest val_loss) and the
+final ``model.keras``. Running the same command again after an interruption
+continues from the last checkpoint: weights, optimizer state, learning-rate
+schedule, early-stopping state, RNG state and the data order all pick up
+where they were, so the result matches an uninterrupted run.
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import shutil
 
-warnings.filterwarnings(
-    "ignore",
-    category=UserWarning,
-    module="keras.src.trainers.data_adapters.py_dataset_adapter",
-)
 import matplotlib.pyplot as plt
 import numpy as np
 import tensorflow as tf
+from cifar_data import load, prepare
+from cifar_model import build_model
+from input_pipeline import make_dataset, make_training_dataset, steps_per_epoch
 from sklearn.metrics import ConfusionMatrixDisplay, confusion_matrix
-from sklearn.model_selection import train_test_split
-from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint, ReduceLROnPlateau
-from tensorflow.keras.layers import (
-    BatchNormalization,
-    Conv2D,
-    Dense,
-    Dropout,
-    Flatten,
-    Input,
-    MaxPooling2D,
+from tensorflow.keras.callbacks import (
+    Callback,
+    CSVLogger,
+    EarlyStopping,
+    ModelCheckpoint,
+    ReduceLROnPlateau,
 )
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 
 
-# Load CIFAR-10 dataset
-(x_train, y_train), (x_test, y_test) = tf.keras.datasets.cifar10.load_data()
-print("x_train shape:", x_train.shape)
-print("y_train shape:", y_train.shape)
+CLASS_NAMES = [
+    "Airplane",
+    "Automobile",
+    "Bird",
+    "Cat",
+    "Deer",
+    "Dog",
+    "Frog",
+    "Horse",
+    "Ship",
+    "Truck",
+]
 
-# Display a sample image
-plt.imshow(x_train[1])
-plt.show()
+# Callback attributes that Keras resets in on_train_begin and that a resumed
+# run has to carry over
+CALLBACK_STATE = {
+    EarlyStopping: ("wait", "best", "best_epoch", "stopped_epoch"),
+    ReduceLROnPlateau: ("wait", "best", "cooldown_counter"),
+    ModelCheckpoint: ("best",),
+}
 
+RUNS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runs")
 
-# Normalize pixel values
-def normalize(x):
-    x = x.astype("float32") / 255.0
-    return x
+TRAIN_OPTIONS = {
+    "epochs": 100,
+    "batch_size": 32,
+    "seed": 0,
+    "checkpoint_every": 1,
+    "learning_rate": 0.001,
+    # Keyword arguments for build_model()
+    "model": {},
+    "verbose": 1,
+}
 
 
-# Data augmentation
-datagen = ImageDataGenerator(
-    rotation_range=15,
-    width_shift_range=0.1,
-    height_shift_range=0.1,
-    horizontal_flip=True,
-    zoom_range=0.1,
-)
+def load_splits():
+    """Train/val/test images (uint8) and one-hot labels from the local cache."""
+    prepare()
+    splits = {}
+    for split in ("train", "val", "test"):
+        x, y = load(split)
+        splits[split] = (x, tf.keras.utils.to_categorical(y, 10))
+    return splits
 
-# Split test set into test and validation sets
-x_test, x_val, y_test, y_val = train_test_split(
-    x_test, y_test, test_size=0.5, random_state=0
-)
 
-# Normalize data
-x_train = normalize(x_train)
-x_test = normalize(x_test)
-x_val = normalize(x_val)
+def compile_model(model, learning_rate=0.001):
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+        loss="categorical_crossentropy",
+        metrics=["accuracy"],
+    )
+    # Create the optimizer slots now so a checkpoint can be restored into them.
+    model.optimizer.build(model.trainable_variables)
+    return model
 
-# Convert labels to categorical
-y_train = tf.keras.utils.to_categorical(y_train, 10)
-y_test = tf.keras.utils.to_categorical(y_test, 10)
-y_val = tf.keras.utils.to_categorical(y_val, 10)
 
-# Fit data augmentation
-datagen.fit(x_train)
+class TrainingState(Callback):
+    """Save and restore everything needed to continue a run exactly.
 
+    A checkpoint holds every model variable (including dropout seed
+    states) and optimizer variable (slots, step count, learning rate), the
+    state of the other callbacks, early stopping's best weights, and the
+    Python and NumPy RNG states. Each is written to ``epoch-NNNN/`` and
+    ``latest`` is then repointed, so an interruption mid-save leaves the
+    previous checkpoint intact. Keep this callback last in the list so it
+    runs after the callbacks it restores have reset themselves.
+    """
 
-# Function to train and evaluate model
-def results(model, epochs=30):
-    early_stopping = EarlyStopping(
-        monitor="val_loss",
-        patience=5,
-        min_delta=0.001,
-        restore_best_weights=True,
-        verbose=1,
-    )
+    def __init__(self, directory, callbacks, epochs, every=1):
+        super().__init__()
+        self.directory = directory
+        self.callbacks = callbacks
+        self.epochs = epochs
+        self.every = every
+        self._restored = None
+
+    def latest(self):
+        """Return the saved state dict, or None if nothing was saved yet."""
+        try:
+            with open(os.path.join(self.directory, "latest")) as f:
+                path = os.path.join(self.directory, f.read().strip())
+        except FileNotFoundError:
+            return None
+        with open(os.path.join(path, "state.json")) as f:
+            state = json.load(f)
+        state["path"] = path
+        return state
+
+    def restore(self, model):
+        """Load the latest checkpoint into ``model``; return its state or None."""
+        state = self.latest()
+        if state is None:
+            return None
+        with np.load(os.path.join(state["path"], "variables.npz")) as saved:
+            variables = [*model.variables, *model.optimizer.variables]
+            if len(saved.files) != len(variables):
+                raise ValueError(
+                    f"{state['path']} holds {len(saved.files)} variables, "
+                    f"the model has {len(variables)}."
+                )
+            for i, variable in enumerate(variables):
+                variable.assign(saved[f"v{i}"])
+        version, internal, gauss = state["python_rng"]
+        random.setstate((version, tuple(internal), gauss))
+        bit_generator, keys, *rest = state["numpy_rng"]
+        np.random.set_state((bit_generator, np.array(keys, np.uint32), *rest))
+        self._restored = state
+        return state
+
+    def on_train_begin(self, logs=None):
+        if self._restored is None:
+            return
+        for callback in self.callbacks:
+            for name in CALLBACK_STATE.get(type(callback), ()):
+                setattr(
+                    callback,
+                    name,
+                    self._restored["callbacks"][type(callback).__name__][name],
+                )
+            if isinstance(callback, EarlyStopping):
+                best_weights = os.path.join(self._restored["path"], "best_weights.npz")
+                if os.path.exists(best_weights):
+                    with np.load(best_weights) as saved:
+                        callback.best_weights = [
+                            saved[f"w{i}"] for i in range(len(saved.files))
+                        ]
+
+    def on_epoch_end(self, epoch, logs=None):
+        stopped = self.model.stop_training
+        if stopped or epoch + 1 == self.epochs or (epoch + 1) % self.every == 0:
+            self.save(epoch + 1, stopped)
+
+    def save(self, epoch, stopped):
+        name = f"epoch-{epoch:04d}"
+        path = os.path.join(self.directory, name)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        variables = [*self.model.variables, *self.model.optimizer.variables]
+        np.savez(
+            os.path.join(path, "variables.npz"),
+            **{f"v{i}": v.numpy() for i, v in enumerate(variables)},
+        )
+        callbacks = {}
+        for callback in self.callbacks:
+            names = CALLBACK_STATE.get(type(callback), ())
+            callbacks[type(callback).__name__] = {
+                name: _to_json(getattr(callback, name)) for name in names
+            }
+            if isinstance(callback, EarlyStopping) and callback.best_weights:
+                np.savez(
+                    os.path.join(path, "best_weights.npz"),
+                    **{f"w{i}": w for i, w in enumerate(callback.best_weights)},
+                )
+        version, internal, gauss = random.getstate()
+        bit_generator, keys, *rest = np.random.get_state()
+        state = {
+            "epoch": epoch,
+            "stopped": stopped,
+            "callbacks": callbacks,
+            "python_rng": [version, internal, gauss],
+            "numpy_rng": [bit_generator, keys.tolist(), *rest],
+        }
+        with open(os.path.join(path, "state.json"), "w") as f:
+            json.dump(state, f)
+
+        # Repoint ``latest`` in one step, then drop older checkpoints.
+        with open(os.path.join(self.directory, "latest.tmp"), "w") as f:
+            f.write(name)
+        os.replace(
+            os.path.join(self.directory, "latest.tmp"),
+            os.path.join(self.directory, "latest"),
+        )
+        for entry in os.listdir(self.directory):
+            if entry.startswith("epoch-") and entry != name:
+                shutil.rmtree(os.path.join(self.directory, entry))
+
+
+def _to_json(value):
+    return value.item() if isinstance(value, np.generic) else value
 
-    checkpoint = ModelCheckpoint(
-        "best_model.keras", monitor="val_loss", save_best_only=True, verbose=1
-    )
 
-    lr_scheduler = ReduceLROnPlateau(
-        monitor="val_loss", factor=0.5, patience=3, min_lr=1e-6, verbose=1
+def _truncate_history(path, epochs):
+    """Drop rows logged after the checkpoint a run resumes from."""
+    if not os.path.exists(path):
+        return
+    with open(path, newline="") as f:
+        header, *rows = list(csv.reader(f)) or [[]]
+    with open(path, "w", newline="") as f:
+        if header:
+            csv.writer(f).writerows([header, *(r for r in rows if int(r[0]) < epochs)])
+
+
+def make_callbacks(run_dir, verbose=1):
+    """Early stopping, best-model checkpoint, LR schedule and the history log."""
+    return [
+        EarlyStopping(
+            monitor="val_loss",
+            patience=5,
+            min_delta=0.001,
+            restore_best_weights=True,
+            verbose=verbose,
+        ),
+        ModelCheckpoint(
+            os.path.join(run_dir, "best_model.keras"),
+            monitor="val_loss",
+            save_best_only=True,
+            verbose=verbose,
+        ),
+        ReduceLROnPlateau(
+            monitor="val_loss", factor=0.5, patience=3, min_lr=1e-6, verbose=verbose
+        ),
+        CSVLogger(os.path.join(run_dir, "history.csv"), append=True),
+    ]
+
+
+def train(run_dir, splits=None, **options):
+    """Train a fresh model in ``run_dir``, or resume the run already there.
+
+    ``options`` override TRAIN_OPTIONS. ``splits`` replaces the data from
+    load_splits(). Returns the trained model, with early stopping's best
+    weights restored.
+    """
+    unknown = options.keys() - TRAIN_OPTIONS.keys()
+    if unknown:
+        raise TypeError(f"Unknown training options: {', '.join(sorted(unknown))}")
+    options = {**TRAIN_OPTIONS, **options}
+    os.makedirs(run_dir, exist_ok=True)
+    final_path = os.path.join(run_dir, "model.keras")
+    tf.keras.utils.set_random_seed(options["seed"])
+    tf.config.experimental.enable_op_determinism()
+
+    model = compile_model(build_model(**options["model"]), options["learning_rate"])
+    callbacks = make_callbacks(run_dir, min(options["verbose"], 1))
+    training_state = TrainingState(
+        os.path.join(run_dir, "checkpoint"),
+        callbacks,
+        options["epochs"],
+        options["checkpoint_every"],
     )
+    state = training_state.restore(model)
+    initial_epoch, epochs = (state["epoch"] if state else 0), options["epochs"]
+    if state and (state["stopped"] or initial_epoch >= epochs):
+        if os.path.exists(final_path):
+            print(f"{run_dir} already finished after {initial_epoch} epochs.")  # noqa: T201
+            return tf.keras.models.load_model(final_path)
+        # Finished before the final model was written: run no epochs, only
+        # the callbacks' start and end (restoring the best weights).
+        epochs = initial_epoch
+    else:
+        # Any final model is from a shorter run that this one extends.
+        if os.path.exists(final_path):
+            os.remove(final_path)
+        if initial_epoch:
+            print(f"Resuming {run_dir} at epoch {initial_epoch + 1}.")  # noqa: T201
+    _truncate_history(os.path.join(run_dir, "history.csv"), initial_epoch)
 
-    r = model.fit(
-        datagen.flow(x_train, y_train, batch_size=32),
+    splits = splits or load_splits()
+    x_train, y_train = splits["train"]
+    model.fit(
+        make_training_dataset(
+            x_train, y_train, options["batch_size"], options["seed"], initial_epoch
+        ),
+        steps_per_epoch=steps_per_epoch(x_train, options["batch_size"]),
+        initial_epoch=initial_epoch,
         epochs=epochs,
-        validation_data=(x_val, y_val),
-        verbose=1,
-        callbacks=[early_stopping, checkpoint, lr_scheduler],
+        validation_data=make_dataset(*splits["val"], batch_size=256),
+        shuffle=False,
+        verbose=options["verbose"],
+        callbacks=[*callbacks, training_state],
     )
+    model.save(final_path)
+    return model
+
+
+def read_history(run_dir):
+    """The per-epoch metrics of a run as ``{name: [value, ...]}``."""
+    with open(os.path.join(run_dir, "history.csv"), newline="") as f:
+        rows = list(csv.DictReader(f))
+    return {name: [float(row[name]) for row in rows] for name in rows[0]}
 
-    # Evaluate model
-    acc = model.evaluate(x_test, y_test)
-    print("Test set loss:", acc[0])
-    print("Test set accuracy:", acc[1] * 100)
 
-    # Plot accuracy and loss
-    epoch_range = range(1, len(r.history["accuracy"]) + 1)
+def plot_results(history, model, test_data, y_test):
+    """Plot accuracy and loss curves and the test-set confusion matrix."""
+    epoch_range = range(1, len(history["accuracy"]) + 1)
     plt.figure(figsize=(12, 5))
 
     plt.subplot(1, 2, 1)
-    plt.plot(epoch_range, r.history["accuracy"])
-    plt.plot(epoch_range, r.history["val_accuracy"])
+    plt.plot(epoch_range, history["accuracy"])
+    plt.plot(epoch_range, history["val_accuracy"])
     plt.title("Classification Accuracy")
     plt.ylabel("Accuracy")
     plt.xlabel("Epoch")
     plt.legend(["Train", "Val"], loc="lower right")
 
     plt.subplot(1, 2, 2)
-    plt.plot(epoch_range, r.history["loss"])
-    plt.plot(epoch_range, r.history["val_loss"])
+    plt.plot(epoch_range, history["loss"])
+    plt.plot(epoch_range, history["val_loss"])
     plt.title("Model Loss")
     plt.ylabel("Loss")
     plt.xlabel("Epoch")
@@ -124,103 +340,54 @@ def results(model, epochs=30):
     plt.show()
 
     # Confusion matrix
-    y_pred = model.predict(x_test)
+    y_pred = model.predict(test_data)
     y_pred_classes = np.argmax(y_pred, axis=1)
     y_test_classes = np.argmax(y_test, axis=1)
     cm = confusion_matrix(y_test_classes, y_pred_classes)
-    disp = ConfusionMatrixDisplay(
-        confusion_matrix=cm,
-        display_labels=[
-            "Airplane",
-            "Automobile",
-            "Bird",
-            "Cat",
-            "Deer",
-            "Dog",
-            "Frog",
-            "Horse",
-            "Ship",
-            "Truck",
-        ],
-    )
+    disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=CLASS_NAMES)
     plt.figure(figsize=(10, 8))
     disp.plot(cmap="Blues")
     plt.title("Confusion Matrix")
     plt.show()
 
 
-# Define the CNN model
-weight_decay = 1e-4
-model = Sequential([
-    Input(shape=(32, 32, 3)),
-    Conv2D(
-        32,
-        (3, 3),
-        activation="relu",
-        padding="same",
-        kernel_regularizer=tf.keras.regularizers.l2(weight_decay),
-    ),
-    BatchNormalization(),
-    Conv2D(
-        32,
-        (3, 3),
-        activation="relu",
-        padding="same",
-        kernel_regularizer=tf.keras.regularizers.l2(weight_decay),
-    ),
-    BatchNormalization(),
-    MaxPooling2D((2, 2)),
-    Dropout(0.2),
-    Conv2D(
-        64,
-        (3, 3),
-        activation="relu",
-        padding="same",
-        kernel_regularizer=tf.keras.regularizers.l2(weight_decay),
-    ),
-    BatchNormalization(),
-    Conv2D(
-        64,
-        (3, 3),
-        activation="relu",
-        padding="same",
-        kernel_regularizer=tf.keras.regularizers.l2(weight_decay),
-    ),
-    BatchNormalization(),
-    MaxPooling2D((2, 2)),
-    Dropout(0.3),
-    Conv2D(
-        128,
-        (3, 3),
-        activation="relu",
-        padding="same",
-        kernel_regularizer=tf.keras.regularizers.l2(weight_decay),
-    ),
-    BatchNormalization(),
-    Conv2D(
-        128,
-        (3, 3),
-        activation="relu",
-        padding="same",
-        kernel_regularizer=tf.keras.regularizers.l2(weight_decay),
-    ),
-    BatchNormalization(),
-    MaxPooling2D((2, 2)),
-    Dropout(0.3),
-    Flatten(),
-    Dense(128, activation="relu"),
-    Dense(10, activation="softmax"),
-])
-
-# Compile the model
-model.compile(
-    optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
-    loss="categorical_crossentropy",
-    metrics=["accuracy"],
-)
+def main():
+    parser = argparse.ArgumentParser(description="Train the CIFAR-10 CNN.")
+    parser.add_argument("--run-dir", default=os.path.join(RUNS_DIR, "default"))
+    parser.add_argument("--epochs", type=int, default=TRAIN_OPTIONS["epochs"])
+    parser.add_argument("--batch-size", type=int, default=TRAIN_OPTIONS["batch_size"])
+    parser.add_argument("--seed", type=int, default=TRAIN_OPTIONS["seed"])
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=TRAIN_OPTIONS["checkpoint_every"],
+        help="Epochs between checkpoints.",
+    )
+    parser.add_argument(
+        "--plot",
+        action="store_true",
+        help="Show training curves and a confusion matrix.",
+    )
+    args = parser.parse_args()
+
+    splits = load_splits()
+    model = train(
+        args.run_dir,
+        splits,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        seed=args.seed,
+        checkpoint_every=args.checkpoint_every,
+    )
+
+    x_test, y_test = splits["test"]
+    test_data = make_dataset(x_test, y_test, batch_size=256)
+    loss, accuracy = model.evaluate(test_data)
+    print("Test set loss:", loss)  # noqa: T201
+    print("Test set accuracy:", accuracy * 100)  # noqa: T201
+    if args.plot:
+        plot_results(read_history(args.run_dir), model, test_data, y_test)
 
-# Train and evaluate
-results(model, epochs=100)
 
-# Save the final model
-model.save("model.keras")
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
-from .models import Prediction
+from .models import Prediction, PredictionJob
 from django.contrib import admin
+from django.utils.html import format_html
 
 
 # Register your models here.
@@ -9,6 +10,7 @@ class PredictionAdmin(admin.ModelAdmin):
     list_display = (
         "id",
         "submitted_by",
+        "preview",
         "image_file",
         "class_1",
         "prob_1",
@@ -18,18 +20,28 @@ class PredictionAdmin(admin.ModelAdmin):
         "prob_3",
     )
     list_display_links = ("id", "submitted_by")
-    search_fields = (
-        "id",
-        "submitted_by",
-        "image_file",
-        "class_1",
-        "prob_1",
-        "class_2",
-        "prob_2",
-        "class_3",
-        "prob_3",
-    )
+    list_filter = ("label",)
+    search_fields = ("id", "submitted_by__username", "image_file")
     list_per_page = 5
 
+    @admin.display(description="Preview")
+    def preview(self, obj):  # noqa: PLR6301
+        if not obj.thumbnail_url:
+            return "-"
+        return format_html(
+            '<img src="{}" alt="" width="48" height="48" style="object-fit: cover">',
+            obj.thumbnail_url,
+        )
+
 
 admin.site.register(Prediction, PredictionAdmin)
+
+
+class PredictionJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "submitted_by", "status", "created_at", "finished_at")
+    list_display_links = ("id", "submitted_by")
+    list_filter = ("status",)
+    list_per_page = 20
+
+
+admin.site.register(PredictionJob, PredictionJobAdmin)
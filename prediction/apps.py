@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PredictionConfig(AppConfig):
     name = "prediction"
+
+    def ready(self):  # noqa: PLR6301
+        from . import signals  # noqa: F401, PLC0415
+
+        # Loading the model here makes every manage.py command pay for the
+        # TensorFlow import, so it is opt-in for serving processes only.
+        if settings.PREDICTION_WARMUP:
+            from .naive import registry  # noqa: PLC0415
+
+            registry.warm_up()
@@ -0,0 +1,167 @@
+import abc
+import os
+import threading
+
+import numpy as np
+
+
+# Model input shape; the batch dimension stays dynamic so one trace serves all sizes
+INPUT_SHAPE = (32, 32, 3)
+
+
+def import_tensorflow():
+    """Import TensorFlow on demand with its startup logging silenced."""
+    # suppress TensorFlow logs:
+    # 2: Filters out INFO and WARNING messages,
+    # 1: Filters out INFO messages
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    # fully suppress the oneDNN warning message as well as general INFO logs.
+    os.environ.setdefault("TF_ENABLE_ONEDNN_OPTS", "0")
+    import tensorflow as tf  # noqa: PLC0415
+
+    return tf
+
+
+def compile_model(keras_model):
+    """Wrap the model's forward pass in a graph function with a fixed signature.
+
+    ``model.predict`` builds a data adapter, callbacks and a progress bar on
+    every call; calling the traced function skips all of that. The input
+    signature pins dtype and spatial shape so varying batch sizes never
+    trigger a retrace.
+    """
+    tf = import_tensorflow()
+
+    @tf.function(
+        input_signature=[tf.TensorSpec((None, *INPUT_SHAPE), tf.float32)],
+        reduce_retracing=True,
+    )
+    def serve(images):
+        return keras_model(images, training=False)
+
+    # Trace once and run a dummy batch so the first request does not pay for it.
+    serve(tf.zeros((1, *INPUT_SHAPE), tf.float32))
+    return serve
+
+
+def load_tflite_interpreter(path):
+    """Return a TFLite interpreter from the lightest runtime that is installed.
+
+    ``tflite-runtime`` / ``ai-edge-litert`` ship only the interpreter (a few
+    MB); full TensorFlow is used as a last resort so development machines
+    work without an extra install.
+    """
+    try:
+        from tflite_runtime.interpreter import Interpreter  # noqa: PLC0415
+    except ImportError:
+        try:
+            from ai_edge_litert.interpreter import Interpreter  # noqa: PLC0415
+        except ImportError:
+            Interpreter = import_tensorflow().lite.Interpreter  # noqa: N806
+    return Interpreter(model_path=str(path))
+
+
+class InferenceBackend(abc.ABC):
+    """Forward pass over a preprocessed float32 (N, 32, 32, 3) batch.
+
+    Subclasses load their artifact in :meth:`load` and return an (N, 10)
+    array of class probabilities from :meth:`infer`.
+    """
+
+    name = None
+
+    def __init__(self, path):
+        self.path = path
+
+    @abc.abstractmethod
+    def load(self):
+        """Load the model artifact at ``self.path``."""
+
+    @abc.abstractmethod
+    def infer(self, batch):
+        """Return the (N, 10) class probabilities for ``batch``."""
+
+
+class KerasBackend(InferenceBackend):
+    """Serve the ``.keras`` model with full TensorFlow."""
+
+    name = "keras"
+
+    def __init__(self, path, compiled=True):
+        super().__init__(path)
+        self.compiled = compiled
+        self.model = None
+        self._serve = None
+
+    def load(self):
+        import_tensorflow()
+        from tensorflow.keras.models import load_model  # noqa: PLC0415
+
+        self.model = load_model(self.path)
+        self._serve = compile_model(self.model) if self.compiled else None
+
+    def infer(self, batch):
+        if self._serve is not None:
+            return self._serve(batch).numpy()
+        return self.model.predict(batch, verbose=0)
+
+
+class TFLiteBackend(InferenceBackend):
+    """Serve an exported ``.tflite`` flatbuffer with the TFLite interpreter.
+
+    The interpreter is not thread-safe and holds one set of tensor buffers,
+    so calls are serialized and the input is resized only when the batch
+    size changes. Full-integer (int8) models are fed and read back through
+    their tensors' quantization parameters, so callers always see floats.
+    """
+
+    name = "tflite"
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.interpreter = None
+        self._input = None
+        self._output = None
+        self._batch_size = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        self.interpreter = load_tflite_interpreter(self.path)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input["shape"][0])
+
+    def _quantize(self, batch):
+        """Map a float batch onto the input tensor's integer grid, if quantized."""
+        dtype = self._input["dtype"]
+        if dtype == np.float32:
+            return batch
+        scale, zero_point = self._input["quantization"]
+        info = np.iinfo(dtype)
+        return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(
+            dtype
+        )
+
+    def _dequantize(self, output):
+        if self._output["dtype"] == np.float32:
+            return output
+        scale, zero_point = self._output["quantization"]
+        return (output.astype(np.float32) - zero_point) * scale
+
+    def infer(self, batch):
+        batch = self._quantize(np.asarray(batch, dtype=np.float32))
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(
+                    self._input["index"], batch.shape, strict=False
+                )
+                self.interpreter.allocate_tensors()
+                self._batch_size = batch.shape[0]
+            self.interpreter.set_tensor(self._input["index"], batch)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output["index"]).copy()
+        return self._dequantize(output)
+
+
+BACKENDS = {backend.name: backend for backend in (KerasBackend, TFLiteBackend)}
@@ -0,0 +1,148 @@
+import logging
+import os
+import uuid
+import zipfile
+from collections import Counter
+from functools import partial
+from itertools import batched
+
+from .dashboard import update_rollups
+from .fetcher import fetch_many
+from .models import Prediction
+from .naive import allowed_file
+from .utils import (
+    MAX_FILE_SIZE,
+    UploadedImage,
+    build_prediction,
+    compress_image,
+    predict_many_cached,
+    save_uploaded_image,
+)
+from django.core.files.base import ContentFile
+
+
+logger = logging.getLogger(__name__)
+
+
+class BatchSource:
+    """One image of a batch submission, read only when its chunk is processed.
+
+    Link sources carry a ``url`` and get their ``read`` (or an ``error``)
+    when the chunk's links are fetched.
+    """
+
+    def __init__(self, name, size, read, url=None):
+        self.name = name
+        self.filename = name
+        self.size = size
+        self.read = read
+        self.url = url
+        self.error = None
+
+
+def collect_sources(files, archives, limit, links=()):
+    """List the images in uploaded ``files``, ZIP ``archives`` and image ``links``.
+
+    Archives are indexed from their central directory only; member data is
+    decompressed lazily, one chunk at a time, so a large archive never sits
+    fully extracted in memory. Links are likewise only downloaded with their
+    chunk. Raises ValueError for unreadable archives or submissions over
+    ``limit`` images.
+    """
+    sources = [BatchSource(f.name, f.size, f.read) for f in files]
+    for archive in archives:
+        try:
+            zf = zipfile.ZipFile(archive)
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"{archive.name} is not a valid ZIP archive.") from e
+        sources.extend(
+            BatchSource(info.filename, info.file_size, partial(zf.read, info))
+            for info in zf.infolist()
+            if not info.is_dir() and not os.path.basename(info.filename).startswith(".")
+        )
+    sources.extend(BatchSource(link, 0, None, url=link) for link in links)
+    if not sources:
+        raise ValueError("No images provided.")
+    if len(sources) > limit:
+        raise ValueError(f"A batch can contain at most {limit} images.")
+    return sources
+
+
+def _fetch_links(chunk):
+    """Download the links of a chunk concurrently, before it is decoded."""
+    links = [source for source in chunk if source.url]
+    if not links:
+        return
+    results = fetch_many([source.url for source in links], MAX_FILE_SIZE)
+    for source, (fetched, error) in zip(links, results, strict=True):
+        if error:
+            source.error = error
+            continue
+        source.filename = f"link.{fetched.extension}"
+        source.size = len(fetched.content)
+        source.read = lambda content=fetched.content: content
+
+
+def _load(source, user):
+    """Decode one source into an UploadedImage, or return an error message."""
+    if source.error:
+        return None, source.error
+    if not allowed_file(source.filename):
+        return None, "Invalid file format. Only JPG, JPEG, and PNG are allowed."
+    if source.size > MAX_FILE_SIZE:
+        return None, "File size exceeds 10MB limit."
+    basename = os.path.basename(source.filename)
+    img, content = compress_image(ContentFile(source.read(), name=basename))
+    if content is None:
+        return None, "Error processing uploaded image."
+    file_ext = basename.rsplit(".", 1)[1].lower()
+    img_name = f"{user.username}_{user.id}_{uuid.uuid4().hex[:6]}.{file_ext}"
+    return UploadedImage(img_name, img, content), None
+
+
+def classify_batch(sources, user, chunk_size=32):
+    """Classify ``sources`` chunk by chunk, yielding progress then a summary.
+
+    Each chunk is decoded, run through the model in a single forward pass
+    and stored with one ``bulk_create``.
+    """
+    total = len(sources)
+    done = created = 0
+    failed = []
+    top_classes = Counter()
+
+    for chunk in batched(sources, chunk_size):
+        _fetch_links(chunk)
+        uploads = []
+        for source in chunk:
+            try:
+                upload, error = _load(source, user)
+            except Exception as e:
+                logger.error(f"Error reading {source.name} for user {user.id}: {e}")
+                upload, error = None, "Error processing uploaded image."
+            if error:
+                failed.append({"name": source.name, "error": error})
+            else:
+                uploads.append(upload)
+
+        results = predict_many_cached([upload.image for upload in uploads])
+        predictions = []
+        for upload, probabilities in zip(uploads, results, strict=True):
+            save_uploaded_image(upload)
+            prediction = build_prediction(user, upload, probabilities)
+            predictions.append(prediction)
+            top_classes[prediction.class_1] += 1
+        Prediction.objects.bulk_create(predictions)
+        update_rollups(added=predictions)
+
+        done += len(chunk)
+        created += len(predictions)
+        yield {"type": "progress", "done": done, "total": total, "created": created}
+
+    yield {
+        "type": "summary",
+        "total": total,
+        "created": created,
+        "failed": failed,
+        "top_classes": dict(top_classes.most_common()),
+    }
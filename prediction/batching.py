@@ -0,0 +1,124 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Gather concurrent inference requests into batches for one forward pass.
+
+    Callers submit a single preprocessed image of shape (1, H, W, C) and get
+    back a future resolving to that image's probability row. A background
+    worker drains the queue, waiting at most ``max_wait_ms`` after the first
+    request for others to arrive, and never batches more than
+    ``max_batch_size`` images together.
+    """
+
+    def __init__(self, infer, max_batch_size=16, max_wait_ms=5):
+        self._infer = infer
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._requests = 0
+        self._max_queue_depth = 0
+        self._closed = False
+        self._worker = threading.Thread(
+            target=self._run, name="prediction-batcher", daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, img):
+        """Queue one image for inference and return a future for its result."""
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed.")
+        future = Future()
+        self._queue.put((img, future))
+        with self._lock:
+            self._requests += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+        return future
+
+    def predict(self, img, timeout=None):
+        """Blocking helper: submit ``img`` and wait for its probability row."""
+        return self.submit(img).result(timeout=timeout)
+
+    def _collect(self):
+        """Block for the first request, then fill the batch until full or stale."""
+        batch = [self._queue.get()]
+        if batch[0] is None:
+            return []
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = (
+                    self._queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the sentinel back so the loop exits after this batch.
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                return
+            images = [img for img, _ in batch]
+            futures = [future for _, future in batch]
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+            try:
+                results = self._infer(np.concatenate(images, axis=0))
+                if len(results) != len(futures):
+                    raise ValueError(
+                        f"Expected {len(futures)} results, got {len(results)}."
+                    )
+                for future, row in zip(futures, results, strict=True):
+                    future.set_result(row)
+            except Exception as e:
+                logger.error(f"Batched inference failed for {len(batch)} images: {e}")
+                # Fail every waiter still pending, so none of them blocks forever.
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def stats(self):
+        """Return queue depth and batch-size distribution counters."""
+        with self._lock:
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+            requests = self._requests
+            max_queue_depth = self._max_queue_depth
+        batches = sum(batch_sizes.values())
+        batched = sum(size * count for size, count in batch_sizes.items())
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": max_queue_depth,
+            "requests": requests,
+            "batches": batches,
+            "avg_batch_size": round(batched / batches, 2) if batches else 0,
+            "batch_sizes": batch_sizes,
+        }
+
+    def close(self, timeout=None):
+        """Stop accepting work and let the worker finish queued requests."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join(timeout)
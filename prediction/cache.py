@@ -0,0 +1,149 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from .models import CachedPrediction, pack_probabilities, unpack_probabilities
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+
+def image_cache_key(img, model_version):
+    """Hash the decoded pixels of ``img`` together with the model version.
+
+    Hashing pixels rather than file bytes means the same picture matches
+    regardless of file name, and re-encoded copies still miss safely.
+    """
+    img = img.convert("RGB")
+    digest = hashlib.sha256()
+    digest.update(model_version.encode())
+    digest.update(f"{img.width}x{img.height}".encode())
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """Two-tier cache of class probabilities keyed by :func:`image_cache_key`.
+
+    The first tier is a size-bounded in-process LRU; the second is the
+    ``CachedPrediction`` table, which survives restarts and is shared by all
+    workers. Database hits are promoted into the LRU. Rows older than
+    ``max_age`` are ignored; :func:`delete_old_cache_entries` removes them.
+    """
+
+    def __init__(self, max_entries=1024, persistent=True, max_age=None):
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached probability vector for ``key`` or None."""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+        if self.persistent:
+            entries = CachedPrediction.objects.filter(key=key)
+            if self.max_age is not None:
+                entries = entries.filter(created_at__gte=timezone.now() - self.max_age)
+            entry = entries.first()
+            if entry is not None:
+                result = unpack_probabilities(entry.probabilities)
+                self._remember(key, result)
+                with self._lock:
+                    self.hits += 1
+                    self.persistent_hits += 1
+                return result
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, result):
+        self._remember(key, result)
+        if self.persistent:
+            # update_or_create tolerates another worker storing the same image
+            # first, and renews an entry that expired.
+            CachedPrediction.objects.update_or_create(
+                key=key,
+                defaults={
+                    "probabilities": pack_probabilities(result),
+                    "created_at": timezone.now(),
+                },
+            )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+    """Return the process-wide prediction cache, or None when disabled."""
+    global _cache
+    if not settings.PREDICTION_CACHE:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache(
+                    max_entries=settings.PREDICTION_CACHE_SIZE,
+                    persistent=settings.PREDICTION_CACHE_PERSISTENT,
+                    max_age=timedelta(days=settings.PREDICTION_CACHE_MAX_AGE_DAYS),
+                )
+    return _cache
+
+
+def delete_old_cache_entries(older_than, max_rows):
+    """Trim the persistent tier; return the number of rows deleted.
+
+    Rows created more than ``older_than`` ago go first, then the oldest of
+    the rest until at most ``max_rows`` remain.
+    """
+    deleted, _ = CachedPrediction.objects.filter(
+        created_at__lt=timezone.now() - older_than
+    ).delete()
+    # The newest row past the cap; it and everything older are removed.
+    boundary = (
+        CachedPrediction.objects.order_by("-created_at", "-key")
+        .values_list("created_at", "key")[max_rows : max_rows + 1]
+        .first()
+    )
+    if boundary is not None:
+        created_at, key = boundary
+        excess, _ = CachedPrediction.objects.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, key__lte=key)
+        ).delete()
+        deleted += excess
+    return deleted
@@ -0,0 +1,147 @@
+from collections import Counter
+from datetime import timedelta
+
+from .models import DailyPredictionCount, Prediction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.utils import timezone
+
+
+# A cache every worker process shares, so invalidating it takes effect everywhere.
+DASHBOARD_CACHE_ALIAS = "dashboard"
+DASHBOARD_CACHE_KEY = "prediction:dashboard"
+
+
+def rollup_key(prediction):
+    """The ``(date, user id, label)`` rollup row a prediction is counted in."""
+    return (
+        timezone.localtime(prediction.uploaded_at).date(),
+        prediction.submitted_by_id,
+        prediction.get_label_display() or "",
+    )
+
+
+def _adjust(date, user_id, label, delta):
+    rows = DailyPredictionCount.objects.filter(
+        date=date, submitted_by_id=user_id, label=label
+    )
+    if delta < 0:
+        rows.filter(count__gte=-delta).update(count=F("count") + delta)
+        return
+    if rows.update(count=F("count") + delta):
+        return
+    try:
+        with transaction.atomic():
+            DailyPredictionCount.objects.create(
+                date=date, submitted_by_id=user_id, label=label, count=delta
+            )
+    except IntegrityError:
+        # Another writer created the row first.
+        rows.update(count=F("count") + delta)
+
+
+def update_rollups(added=(), removed=()):
+    """Count ``added`` and uncount ``removed`` predictions in the daily rollups.
+
+    Saves and deletes are tracked by signals; call this directly after
+    ``bulk_create``, which sends none.
+    """
+    changes = Counter(rollup_key(p) for p in added)
+    changes.subtract(rollup_key(p) for p in removed)
+    for (date, user_id, label), delta in changes.items():
+        if delta:
+            _adjust(date, user_id, label, delta)
+    invalidate_dashboard()
+
+
+def invalidate_dashboard():
+    transaction.on_commit(
+        lambda: caches[DASHBOARD_CACHE_ALIAS].delete(DASHBOARD_CACHE_KEY)
+    )
+
+
+def _compute_dashboard(days=7):
+    today = timezone.localdate()
+    start_date = today - timedelta(days=days)
+
+    users = User.objects.aggregate(
+        total=Count("id"),
+        recent=Count("id", filter=Q(date_joined__gte=timezone.now() - timedelta(days))),
+    )
+    rollups = DailyPredictionCount.objects.filter(count__gt=0)
+    totals = rollups.aggregate(
+        predictions=Sum("count"),
+        active_users=Count("submitted_by", distinct=True),
+    )
+    total_predictions = totals["predictions"] or 0
+    most_predicted = (
+        rollups.exclude(label="")
+        .values("label")
+        .annotate(total=Sum("count"))
+        .order_by("-total")
+        .first()
+    )
+    date_counts = dict(
+        rollups.filter(date__gte=start_date)
+        .values("date")
+        .annotate(total=Sum("count"))
+        .values_list("date", "total")
+    )
+    top_active_users = list(
+        rollups.exclude(submitted_by=None)
+        .values("submitted_by")
+        .annotate(
+            id=F("submitted_by"),
+            username=F("submitted_by__username"),
+            prediction_count=Sum("count"),
+        )
+        .order_by("-prediction_count")
+        .values("id", "username", "prediction_count")[:5]
+    )
+    # Exact times come from the (user, uploaded_at) index, for these five only.
+    last_predictions = dict(
+        Prediction.objects.filter(
+            submitted_by__in=[user["id"] for user in top_active_users]
+        )
+        .values("submitted_by")
+        .annotate(last=Max("uploaded_at"))
+        .values_list("submitted_by", "last")
+    )
+    for user in top_active_users:
+        user["last_prediction"] = last_predictions.get(user["id"])
+    recent_predictions = list(
+        Prediction.objects.select_related("submitted_by").order_by("-uploaded_at")[:5]
+    )
+
+    dates = [start_date + timedelta(days=i) for i in range(days + 1)]
+    return {
+        "total_users": users["total"],
+        "total_predictions": total_predictions,
+        "avg_predictions_per_user": (
+            round(total_predictions / totals["active_users"], 2)
+            if totals["active_users"]
+            else 0
+        ),
+        "most_predicted_class": most_predicted["label"] if most_predicted else "N/A",
+        "recent_predictions": recent_predictions,
+        "has_predictions": total_predictions > 0,
+        "chart_labels": [date.strftime("%Y-%m-%d") for date in dates],
+        "chart_data": [date_counts.get(date, 0) for date in dates],
+        "recent_users": users["recent"],
+        "top_active_users": top_active_users,
+    }
+
+
+def get_dashboard_context():
+    """Dashboard metrics, served from the cache until a prediction changes."""
+    cache = caches[DASHBOARD_CACHE_ALIAS]
+    context = cache.get(DASHBOARD_CACHE_KEY)
+    if context is None:
+        context = _compute_dashboard()
+        cache.set(
+            DASHBOARD_CACHE_KEY, context, settings.PREDICTION_DASHBOARD_CACHE_SECONDS
+        )
+    return context
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from .backends import import_tensorflow
+
+
+def convert_to_tflite(keras_model, representative_images=None):
+    """Convert a Keras model to a TFLite flatbuffer.
+
+    Weights are frozen into the flatbuffer and the batch dimension stays
+    dynamic, so the interpreter can be resized per request. Passing
+    ``representative_images`` (preprocessed float32 samples) produces a
+    full-integer int8 model calibrated on those samples instead.
+    """
+    tf = import_tensorflow()
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if representative_images is not None:
+
+        def representative_dataset():
+            for image in representative_images:
+                yield [image[None, ...].astype("float32")]
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    return converter.convert()
+
+
+def export_tflite(keras_path, output_path, representative_images=None):
+    """Convert the ``.keras`` model at ``keras_path`` and write it to ``output_path``."""
+    import_tensorflow()
+    from tensorflow.keras.models import load_model  # noqa: PLC0415
+
+    flatbuffer = convert_to_tflite(load_model(keras_path), representative_images)
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_bytes(flatbuffer)
+    return output_path
@@ -0,0 +1,182 @@
+import logging
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+
+from .models import PdfExport, Prediction, PredictionJob
+from django.core.files import File
+from django.utils import timezone
+from reportlab import rl_config
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per query while rendering; keeps memory flat for long histories
+EXPORT_CHUNK_SIZE = 500
+
+
+def filter_predictions(user, start_date=None, end_date=None):
+    """The user's predictions, newest first, optionally within a date range."""
+    predictions = Prediction.objects.filter(submitted_by=user)
+    if start_date:
+        predictions = predictions.filter(uploaded_at__date__gte=start_date)
+    if end_date:
+        predictions = predictions.filter(uploaded_at__date__lte=end_date)
+    return predictions.order_by("-uploaded_at")
+
+
+_rl_config_lock = threading.Lock()
+_binary_renders = 0
+_saved_use_a85 = None
+
+
+@contextmanager
+def binary_streams():
+    """Write image and page streams as binary Flate data while drawing.
+
+    ASCII85 armouring makes files a quarter larger and, without ReportLab's
+    C accelerator, dominated the render time of long histories. ReportLab
+    has no per-canvas switch and reads ``rl_config.useA85`` as it draws and
+    saves, so the first of any concurrent renders turns it off and the last
+    one restores it. The lock covers only those flips, not the renders.
+    """
+    global _binary_renders, _saved_use_a85
+    with _rl_config_lock:
+        if not _binary_renders:
+            _saved_use_a85 = rl_config.useA85
+            rl_config.useA85 = 0
+        _binary_renders += 1
+    try:
+        yield
+    finally:
+        with _rl_config_lock:
+            _binary_renders -= 1
+            if not _binary_renders:
+                rl_config.useA85 = _saved_use_a85
+
+
+def render_predictions_pdf(predictions, output):
+    """Draw ``predictions`` as the history table into the file object ``output``.
+
+    Rows are streamed from the database in chunks and each row's stored
+    thumbnail is embedded as-is, so neither the queryset nor decoded images
+    are held in memory. Returns the number of rows drawn.
+    """
+    with binary_streams():
+        return _draw_predictions(predictions, output)
+
+
+def _draw_predictions(predictions, output):
+    pdf = canvas.Canvas(output, pagesize=letter, pageCompression=1)
+    _, letter_height = letter
+
+    def setup_pdf_canvas():
+        pdf.setTitle("Prediction History")
+        pdf.setFont("Helvetica-Bold", 16)
+        pdf.drawString(230, letter_height - 50, "Prediction History")
+
+    def draw_table_headers(y_pos):
+        pdf.setFont("Helvetica-Bold", 12)
+        pdf.drawString(20, y_pos, "S.N")
+        pdf.drawString(95, y_pos, "Image")
+        pdf.drawString(225, y_pos, "Class A")
+        pdf.drawString(325, y_pos, "Probability A")
+        pdf.drawString(425, y_pos, "Class B")
+        pdf.drawString(525, y_pos, "Probability B")
+        pdf.drawString(625, y_pos, "Class C")
+        pdf.drawString(725, y_pos, "Probability C")
+
+    def draw_prediction_row(index, prediction, y_pos):
+        pdf.drawString(20, y_pos, str(index))
+        if prediction.image_file:
+            try:
+                # Thumbnails are written with the upload; rows from before
+                # then use the original until `manage.py backfill_thumbnails`.
+                image = prediction.thumbnail or prediction.image_file
+                # Passing the JPEG path lets ReportLab embed it without decoding.
+                pdf.drawImage(image.path, 95, y_pos - 20, width=50, height=50)
+            except Exception as e:
+                pdf.drawString(95, y_pos, "[Error: Img]")
+                logger.warning(
+                    f"Error loading image for prediction {prediction.id}: {e}"
+                )
+        pdf.drawString(225, y_pos, prediction.class_1 or "")
+        pdf.drawString(325, y_pos, f"{prediction.prob_1}%" if prediction.prob_1 else "")
+        pdf.drawString(425, y_pos, prediction.class_2 or "")
+        pdf.drawString(525, y_pos, f"{prediction.prob_2}%" if prediction.prob_2 else "")
+        pdf.drawString(625, y_pos, prediction.class_3 or "")
+        pdf.drawString(725, y_pos, f"{prediction.prob_3}%" if prediction.prob_3 else "")
+
+    setup_pdf_canvas()
+    y_position = letter_height - 100
+    draw_table_headers(y_position)
+    pdf.setFont("Helvetica", 12)
+    y_position -= 50
+
+    rows = 0
+    columns = (
+        "id",
+        "image_file",
+        "thumbnail",
+        "label",
+        "probabilities",
+    )
+    for index, p in enumerate(
+        predictions.only(*columns).iterator(chunk_size=EXPORT_CHUNK_SIZE), start=1
+    ):
+        if y_position < 100:
+            pdf.showPage()
+            pdf.setFont("Helvetica", 12)
+            y_position = letter_height - 50
+            draw_table_headers(y_position)
+            y_position -= 50
+        draw_prediction_row(index, p, y_position)
+        y_position -= 60
+        rows = index
+
+    pdf.showPage()
+    pdf.save()
+    return rows
+
+
+def run_export(export_id):
+    """Render a claimed PdfExport to storage and record the outcome."""
+    export = PdfExport.objects.select_related("submitted_by").get(id=export_id)
+    try:
+        predictions = filter_predictions(
+            export.submitted_by, export.start_date, export.end_date
+        )
+        with tempfile.TemporaryFile() as output:
+            export.row_count = render_predictions_pdf(predictions, output)
+            output.seek(0)
+            # A random name, so exports cannot be found by counting ids.
+            export.file.save(f"{uuid.uuid4().hex}.pdf", File(output), save=False)
+        export.status = PredictionJob.Status.DONE
+    except Exception as e:
+        logger.error(f"Error exporting PDF {export.id}: {e}")
+        export.status = PredictionJob.Status.FAILED
+        export.error = "An error occurred while generating the PDF."
+    export.finished_at = timezone.now()
+    export.save()
+    return export
+
+
+def delete_old_exports(older_than):
+    """Delete finished exports created more than ``older_than`` ago.
+
+    Their files are removed with them; returns the number of exports deleted.
+    """
+    exports = PdfExport.objects.filter(
+        created_at__lt=timezone.now() - older_than,
+        status__in=[PredictionJob.Status.DONE, PredictionJob.Status.FAILED],
+    )
+    deleted = 0
+    for export in exports.iterator():
+        if export.file:
+            export.file.delete(save=False)
+        export.delete()
+        deleted += 1
+    return deleted
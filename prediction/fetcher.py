@@ -0,0 +1,100 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Content types accepted from links, mapped to the extension they are saved as
+CONTENT_TYPES = {
+    "image/jpeg": "jpg",
+    "image/jpg": "jpg",
+    "image/pjpeg": "jpg",
+    "image/png": "png",
+}
+FETCH_TIMEOUT = 5
+FETCH_WORKERS = 8
+CHUNK_SIZE = 64 * 1024
+
+
+class FetchError(Exception):
+    """A link could not be fetched; the message is safe to show to users."""
+
+
+class FetchedImage:
+    """The raw bytes of an image downloaded from a link."""
+
+    def __init__(self, url, content, content_type):
+        self.url = url
+        self.content = content
+        self.content_type = content_type
+
+    @property
+    def extension(self):
+        return CONTENT_TYPES[self.content_type]
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide session, reusing connections across fetches."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=FETCH_WORKERS, pool_maxsize=FETCH_WORKERS
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["Accept"] = ", ".join(CONTENT_TYPES)
+                _session = session
+    return _session
+
+
+def fetch_image(url, max_bytes, timeout=FETCH_TIMEOUT):
+    """Download an image link, refusing non-images and bodies over ``max_bytes``.
+
+    The body is streamed and the download is abandoned as soon as it
+    exceeds the limit, whether or not the server sent a Content-Length.
+    Raises FetchError.
+    """
+    if urlparse(url).scheme not in {"http", "https"}:
+        raise FetchError("Only HTTP or HTTPS URLs are allowed.")
+
+    try:
+        with get_session().get(url, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            content_type = (
+                response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            )
+            if content_type not in CONTENT_TYPES:
+                raise FetchError("The link does not point to a JPG or PNG image.")
+            if int(response.headers.get("Content-Length") or 0) > max_bytes:
+                raise FetchError("File size exceeds 10MB limit.")
+
+            content = bytearray()
+            for chunk in response.iter_content(CHUNK_SIZE):
+                content.extend(chunk)
+                if len(content) > max_bytes:
+                    raise FetchError("File size exceeds 10MB limit.")
+    except requests.RequestException as e:
+        raise FetchError(f"Error fetching image: {e}") from e
+    return FetchedImage(url, bytes(content), content_type)
+
+
+def fetch_many(urls, max_bytes, workers=FETCH_WORKERS):
+    """Fetch links concurrently; return ``(FetchedImage, error)`` pairs in order."""
+
+    def fetch(url):
+        try:
+            return fetch_image(url, max_bytes), None
+        except FetchError as e:
+            return None, str(e)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fetch, urls))
@@ -0,0 +1,173 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .exports import run_export
+from .models import PdfExport, PredictionJob
+from .utils import UploadedImage, get_image_from_link, process_and_save_prediction
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+
+def _claim_next(model):
+    """Atomically move the oldest pending ``model`` row to running; return its id.
+
+    The conditional UPDATE is the lock: if another worker claimed the row
+    first, zero rows change and we move on to the next candidate. This works
+    on SQLite as well as server databases without ``select_for_update``.
+    """
+    while True:
+        row_id = (
+            model.objects.filter(status=PredictionJob.Status.PENDING)
+            .order_by("created_at", "id")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if row_id is None:
+            return None
+        claimed = model.objects.filter(
+            id=row_id, status=PredictionJob.Status.PENDING
+        ).update(status=PredictionJob.Status.RUNNING, started_at=timezone.now())
+        if claimed:
+            return row_id
+
+
+def claim_next_job():
+    """Claim the oldest pending prediction job and return it, or None."""
+    job_id = _claim_next(PredictionJob)
+    if job_id is None:
+        return None
+    return PredictionJob.objects.select_related("submitted_by").get(id=job_id)
+
+
+def run_job(job):
+    """Run inference for a claimed job and record the outcome on the row.
+
+    Link jobs download the image here, off the request path, and keep the
+    name it is stored under.
+    """
+    try:
+        if job.source_url:
+            upload, error = get_image_from_link(job.source_url, job.image_name)
+        else:
+            upload, error = UploadedImage.from_storage(job.image_name), None
+        prediction = None
+        if not error:
+            prediction, error = process_and_save_prediction(upload, job.submitted_by)
+            job.image_name = upload.name
+    except FileNotFoundError:
+        prediction, error = None, "The image file was not found."
+    except Exception as e:
+        logger.error(f"Error processing prediction job {job.id}: {e}")
+        prediction, error = None, "An error occurred while processing the image."
+
+    job.prediction = prediction
+    job.error = error or ""
+    job.status = PredictionJob.Status.FAILED if error else PredictionJob.Status.DONE
+    job.finished_at = timezone.now()
+    job.save(
+        update_fields=["image_name", "prediction", "error", "status", "finished_at"]
+    )
+    return job
+
+
+def process_pending_jobs(limit=None):
+    """Claim and run pending jobs until the queue is empty; return the count.
+
+    Predictions go first; PDF exports are rendered once none are waiting.
+    """
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next_job()
+        if job is not None:
+            run_job(job)
+        else:
+            export_id = _claim_next(PdfExport)
+            if export_id is None:
+                break
+            run_export(export_id)
+        processed += 1
+    return processed
+
+
+def requeue_stale_jobs(older_than):
+    """Return jobs and exports stuck in running (e.g. after a crash) to pending."""
+    return sum(
+        model.objects.filter(
+            status=PredictionJob.Status.RUNNING,
+            started_at__lt=timezone.now() - older_than,
+        ).update(status=PredictionJob.Status.PENDING, started_at=None)
+        for model in (PredictionJob, PdfExport)
+    )
+
+
+class JobWorkerPool:
+    """In-process threads that drain the DB-backed job queue.
+
+    Each :meth:`wake` schedules one drain pass; passes run on at most
+    ``workers`` threads and exit when no pending job is left, so idle
+    processes hold no busy threads.
+    """
+
+    def __init__(self, workers):
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="prediction-job"
+        )
+
+    def wake(self):
+        self._executor.submit(self._drain)
+
+    @staticmethod
+    def _drain():
+        try:
+            process_pending_jobs()
+        except Exception as e:
+            logger.error(f"Prediction job worker failed: {e}")
+        finally:
+            connections.close_all()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool():
+    """Return the process-wide worker pool, or None when workers are disabled."""
+    global _pool
+    if settings.PREDICTION_JOB_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = JobWorkerPool(settings.PREDICTION_JOB_WORKERS)
+    return _pool
+
+
+def enqueue_prediction(img, user, source_url=""):
+    """Queue ``img`` (a file under MEDIA_ROOT/images) for prediction.
+
+    With ``source_url`` the worker downloads the image itself and ``img`` is
+    the name to store it under, without an extension.
+    """
+    job = PredictionJob.objects.create(
+        submitted_by=user, image_name=img, source_url=source_url
+    )
+    pool = get_worker_pool()
+    if pool is not None:
+        transaction.on_commit(pool.wake)
+    return job
+
+
+def enqueue_export(user, start_date=None, end_date=None):
+    """Queue a PDF export of ``user``'s history for the job workers."""
+    export = PdfExport.objects.create(
+        submitted_by=user, start_date=start_date, end_date=end_date
+    )
+    pool = get_worker_pool()
+    if pool is not None:
+        transaction.on_commit(pool.wake)
+    return export
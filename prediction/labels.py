@@ -0,0 +1,24 @@
+import numpy as np
+
+
+# Class labels, in model output order
+CLASSES = [
+    "airplane",
+    "automobile",
+    "bird",
+    "cat",
+    "deer",
+    "dog",
+    "frog",
+    "horse",
+    "ship",
+    "truck",
+]
+
+
+def top_k(predictions, k=4):
+    """Return the top ``k`` class names and percentage probabilities."""
+    top_indices = np.argsort(predictions)[::-1][:k]  # Get top k predictions
+    top_classes = [CLASSES[i] for i in top_indices]
+    top_probs = [float(f"{predictions[i] * 100:.2f}") for i in top_indices]
+    return top_classes, top_probs
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from prediction.models import Prediction
+from prediction.thumbnails import delete_thumbnail, ensure_thumbnail
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnails for predictions stored before thumbnails existed."
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument(
+            "--force", action="store_true", help="Regenerate existing thumbnails too."
+        )
+
+    def handle(self, *args, **options):
+        predictions = Prediction.objects.exclude(
+            Q(image_file="") | Q(image_file__isnull=True)
+        )
+        if not options["force"]:
+            predictions = predictions.filter(
+                Q(thumbnail="") | Q(thumbnail__isnull=True)
+            )
+
+        created = failed = 0
+        for prediction in predictions.only("id", "image_file", "thumbnail").iterator(
+            chunk_size=500
+        ):
+            if options["force"]:
+                delete_thumbnail(prediction)
+                prediction.thumbnail = None
+            if ensure_thumbnail(prediction) is None:
+                failed += 1
+            else:
+                created += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Created {created} thumbnails."))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{failed} images could not be read."))
@@ -0,0 +1,170 @@
+import argparse
+import io
+import json
+import os
+import subprocess  # noqa: S404
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from prediction.naive import registry
+
+
+def upload_payload():
+    pixels = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    output = io.BytesIO()
+    Image.fromarray(pixels).save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive addpredict and the history page from parallel clients. On SQLite "
+        "the default and tuned modes are compared on a scratch database; with "
+        "DATABASE_URL set to a server the configured database is measured."
+    )
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument("--clients", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=40, help="Per client.")
+        parser.add_argument(
+            "--write-ratio",
+            type=float,
+            default=0.25,
+            help="Share of requests that are uploads; the rest view history.",
+        )
+        parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+
+    @staticmethod
+    def _run_clients(clients, requests, write_ratio):
+        """Run the load in this process and return latency and error stats."""
+        payload = upload_payload()
+        registry.warm_up()  # keep the one-off model load out of the latencies
+        users = [
+            User.objects.create_user(username=f"concurrency-benchmark-{i}")
+            for i in range(clients)
+        ]
+        latencies = {"upload": [], "history": []}
+        errors = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(clients)
+
+        def client_loop(index):
+            client = Client(raise_request_exception=False, SERVER_NAME="localhost")
+            client.force_login(users[index])
+            rng = np.random.default_rng(index)
+            barrier.wait()
+            try:
+                for _ in range(requests):
+                    kind = "upload" if rng.random() < write_ratio else "history"
+                    start = time.perf_counter()
+                    if kind == "upload":
+                        response = client.post(
+                            reverse("addpredict"),
+                            {"file": SimpleUploadedFile("bench.jpg", payload)},
+                        )
+                    else:
+                        response = client.get(reverse("prediction_history"))
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        latencies[kind].append(elapsed)
+                        if response.status_code >= 400:
+                            errors.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=client_loop, args=(i,)) for i in range(clients)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        User.objects.filter(id__in=[u.id for u in users]).delete()
+        total = sum(len(v) for v in latencies.values())
+        return {
+            "throughput": total / wall,
+            "errors": len(errors),
+            **{
+                f"{kind}_p{q}": float(np.percentile(values, q) * 1000)
+                for kind, values in latencies.items()
+                if values
+                for q in (50, 95)
+            },
+        }
+
+    @staticmethod
+    def _spawn(database_url, tuned, options):
+        env = {
+            **os.environ,
+            "DATABASE_URL": database_url,
+            "SQLITE_TUNED": str(tuned),
+        }
+        result = subprocess.run(  # noqa: S603
+            [
+                sys.executable,
+                "manage.py",
+                "benchmark_concurrency",
+                "--worker",
+                f"--clients={options['clients']}",
+                f"--requests={options['requests']}",
+                f"--write-ratio={options['write_ratio']}",
+            ],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def _report(self, label, stats):
+        self.stdout.write(
+            f"{label:>16}: {stats['throughput']:6.1f} req/s, "
+            f"{stats['errors']} errors, "
+            f"upload p50/p95 {stats.get('upload_p50', 0):.0f}/"
+            f"{stats.get('upload_p95', 0):.0f} ms, "
+            f"history p50/p95 {stats.get('history_p50', 0):.0f}/"
+            f"{stats.get('history_p95', 0):.0f} ms"
+        )
+
+    def handle(self, *args, **options):
+        load = (options["clients"], options["requests"], options["write_ratio"])
+        if options["worker"]:
+            with tempfile.TemporaryDirectory() as media_root:
+                with override_settings(MEDIA_ROOT=media_root):
+                    call_command("migrate", verbosity=0)
+                    stats = self._run_clients(*load)
+            self.stdout.write(json.dumps(stats))
+            return
+
+        self.stdout.write(
+            f"{options['clients']} clients x {options['requests']} requests, "
+            f"{options['write_ratio']:.0%} uploads"
+        )
+        engine = settings.DATABASES["default"]["ENGINE"]
+        if not engine.endswith("sqlite3"):
+            with tempfile.TemporaryDirectory() as media_root:
+                with override_settings(MEDIA_ROOT=media_root):
+                    self._report(engine.rsplit(".", 1)[-1], self._run_clients(*load))
+            return
+
+        for label, tuned in (("sqlite default", False), ("sqlite tuned", True)):
+            with tempfile.TemporaryDirectory() as tmpdir:
+                url = f"sqlite:///{os.path.join(tmpdir, 'benchmark.sqlite3')}"
+                self._report(label, self._spawn(url, tuned, options))
@@ -0,0 +1,77 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from prediction.models import Prediction, pack_probabilities
+from prediction.pagination import encode_cursor, history_page
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the prediction history query at growing depths: the old "
+        "load-everything query, OFFSET pages and keyset pages. Rows are created "
+        "in a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument("--rows", type=int, default=50000)
+        parser.add_argument("--page-size", type=int, default=25)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    @staticmethod
+    def _time(query, repeat):
+        query()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            query()
+        return (time.perf_counter() - start) * 1000 / repeat
+
+    def handle(self, *args, **options):
+        rows, page_size = options["rows"], options["page_size"]
+        with transaction.atomic():
+            user = User.objects.create_user(username="history-benchmark")
+            now = timezone.now()
+            probabilities = pack_probabilities([0.1] * 10)
+            Prediction.objects.bulk_create(
+                (
+                    Prediction(
+                        submitted_by=user,
+                        uploaded_at=now - timedelta(seconds=i),
+                        image_file=f"images/{i}.jpg",
+                        thumbnail=f"thumbnails/{i}.jpg",
+                        label=0,
+                        probabilities=probabilities,
+                    )
+                    for i in range(rows)
+                ),
+                batch_size=2000,
+            )
+            ordered = Prediction.objects.filter(submitted_by=user).order_by(
+                "-uploaded_at", "-id"
+            )
+            everything = self._time(lambda: list(ordered.all()), 1)
+            self.stdout.write(
+                f"{rows} rows; loading the whole history: {everything:.1f} ms"
+            )
+            self.stdout.write(f"{'depth':>8} {'offset page':>12} {'keyset page':>12}")
+            for depth in (0, rows // 10, rows // 2, rows - page_size):
+                cursor = None
+                if depth:
+                    anchor = ordered.only("id", "uploaded_at")[depth - 1]
+                    cursor = encode_cursor(anchor, depth)
+                offset_ms = self._time(
+                    lambda depth=depth: list(ordered.all()[depth : depth + page_size]),
+                    options["repeat"],
+                )
+                keyset_ms = self._time(
+                    lambda cursor=cursor: history_page(user, cursor, page_size),
+                    options["repeat"],
+                )
+                self.stdout.write(
+                    f"{depth:>8} {offset_ms:>9.2f} ms {keyset_ms:>9.2f} ms"
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,60 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from prediction.backends import INPUT_SHAPE, KerasBackend, compile_model
+from prediction.naive import MODEL_PATH
+
+
+class Command(BaseCommand):
+    help = "Compare per-image latency of model.predict against the compiled path."
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument(
+            "--iterations", type=int, default=200, help="Timed calls per path."
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1, help="Images per call."
+        )
+        parser.add_argument(
+            "--warmup", type=int, default=10, help="Untimed calls before timing."
+        )
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        batch_size = options["batch_size"]
+        rng = np.random.default_rng(0)
+        batch = rng.random((batch_size, *INPUT_SHAPE), dtype=np.float32)
+
+        backend = KerasBackend(MODEL_PATH, compiled=False)
+        backend.load()
+        model = backend.model
+        compiled = compile_model(model)
+        paths = {
+            "model.predict": lambda: model.predict(batch, verbose=0),
+            "compiled": lambda: compiled(batch).numpy(),
+        }
+
+        self.stdout.write(
+            f"{iterations} iterations, batch size {batch_size}, input {batch.shape[1:]}"
+        )
+        results = {}
+        for name, run in paths.items():
+            for _ in range(options["warmup"]):
+                run()
+            timings = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+            per_image = np.array(timings) * 1000 / batch_size
+            results[name] = float(np.median(per_image))
+            self.stdout.write(
+                f"{name:>14}: p50 {np.percentile(per_image, 50):.3f} ms/img, "
+                f"p95 {np.percentile(per_image, 95):.3f} ms/img, "
+                f"mean {per_image.mean():.3f} ms/img"
+            )
+
+        speedup = results["model.predict"] / results["compiled"]
+        self.stdout.write(self.style.SUCCESS(f"Compiled path is {speedup:.1f}x faster"))
@@ -0,0 +1,141 @@
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from PIL import Image
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from prediction.exports import filter_predictions, render_predictions_pdf
+from prediction.models import Prediction, pack_probabilities
+from prediction.thumbnails import render_thumbnail, thumbnail_path
+
+
+def render_in_memory(predictions, media_root):
+    """The original export: whole queryset, full-size decode and PNG re-encode
+    per row, BytesIO response."""
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    _, letter_height = letter
+    y_position = letter_height - 150
+    for index, p in enumerate(list(predictions), start=1):
+        if y_position < 100:
+            pdf.showPage()
+            y_position = letter_height - 100
+        pdf.drawString(20, y_position, str(index))
+        with Image.open(os.path.join(media_root, str(p.image_file))) as img:
+            img.thumbnail((50, 50))
+            img_buffer = io.BytesIO()
+            img.save(img_buffer, format="PNG")
+            img_buffer.seek(0)
+            pdf.drawImage(
+                ImageReader(img_buffer), 95, y_position - 20, width=50, height=50
+            )
+        pdf.drawString(225, y_position, p.class_1)
+        pdf.drawString(325, y_position, f"{p.prob_1}%")
+        y_position -= 60
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the in-memory PDF export against the streamed export on a "
+        "synthetic history. Rows are created in a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument(
+            "--images",
+            type=int,
+            default=50,
+            help="Distinct image files shared by rows.",
+        )
+
+    def _measure(self, name, render):
+        tracemalloc.start()
+        start = time.perf_counter()
+        size = render()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f"{name:>10}: {elapsed:.2f} s, peak {peak / 1024 / 1024:.1f} MB, "
+            f"PDF {size / 1024 / 1024:.1f} MB"
+        )
+        return elapsed, peak
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        with tempfile.TemporaryDirectory() as media_root, transaction.atomic():
+            os.makedirs(os.path.join(media_root, "images"))
+            os.makedirs(os.path.join(media_root, "thumbnails"))
+            names = []
+            for i in range(options["images"]):
+                pixels = rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+                name = f"images/bench_{i}.jpg"
+                image = Image.fromarray(pixels)
+                image.save(os.path.join(media_root, name))
+                thumbnail = thumbnail_path(name)
+                with open(os.path.join(media_root, thumbnail), "wb") as f:
+                    f.write(render_thumbnail(image).read())
+                names.append((name, thumbnail))
+
+            user = User.objects.create_user(username="pdf-benchmark")
+            probabilities = [
+                0.005,
+                0.005,
+                0.005,
+                0.915,
+                0.005,
+                0.0525,
+                0.015,
+                0.0,
+                0.0,
+                0.0,
+            ]
+            Prediction.objects.bulk_create(
+                (
+                    Prediction(
+                        submitted_by=user,
+                        image_file=names[i % len(names)][0],
+                        thumbnail=names[i % len(names)][1],
+                        label=int(np.argmax(probabilities)),
+                        probabilities=pack_probabilities(probabilities),
+                    )
+                    for i in range(options["rows"])
+                ),
+                batch_size=1000,
+            )
+            predictions = filter_predictions(user)
+            self.stdout.write(f"{options['rows']} rows, {len(names)} images")
+
+            def streamed():
+                with tempfile.TemporaryFile() as output:
+                    render_predictions_pdf(predictions, output)
+                    return output.tell()
+
+            with override_settings(MEDIA_ROOT=media_root):
+                before = self._measure(
+                    "in-memory",
+                    lambda: len(render_in_memory(predictions, media_root)),
+                )
+                after = self._measure("streamed", streamed)
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{before[0] / after[0]:.2f}x faster, "
+                f"{before[1] / after[1]:.1f}x lower peak memory"
+            )
+        )
@@ -0,0 +1,148 @@
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from prediction.labels import CLASSES, top_k
+from prediction.models import Prediction, pack_probabilities
+
+
+LEGACY_TABLE = """
+CREATE TEMPORARY TABLE legacy_prediction (
+    id integer PRIMARY KEY,
+    submitted_by_id integer,
+    uploaded_at timestamp NOT NULL,
+    image_file varchar(100),
+    class_1 varchar(255), prob_1 real,
+    class_2 varchar(255), prob_2 real,
+    class_3 varchar(255), prob_3 real,
+    class_4 varchar(255), prob_4 real
+)
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare history and per-class queries on the old top-4 column layout "
+        "against the indexed label/probabilities layout. Rows are created in a "
+        "rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument("--rows", type=int, default=100000)
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def _time(self, name, query, repeat):
+        query()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            query()
+        elapsed = (time.perf_counter() - start) * 1000 / repeat
+        self.stdout.write(f"{name:>28}: {elapsed:8.3f} ms")
+        return elapsed
+
+    @staticmethod
+    def _populate(rows, users):
+        rng = np.random.default_rng(0)
+        user_ids = [
+            User.objects.create_user(username=f"query-benchmark-{i}").id
+            for i in range(users)
+        ]
+        owners = rng.choice(user_ids, size=rows)
+        now = timezone.now()
+        offsets = rng.integers(0, 365 * 24 * 3600, size=rows)
+        probabilities = rng.dirichlet(np.ones(len(CLASSES)), size=rows)
+
+        legacy = []
+        predictions = []
+        for i in range(rows):
+            uploaded_at = now - timedelta(seconds=int(offsets[i]))
+            classes, probs = top_k(probabilities[i], k=4)
+            legacy.append((
+                i + 1,
+                int(owners[i]),
+                uploaded_at,
+                f"images/{i}.jpg",
+                *(v for pair in zip(classes, probs, strict=True) for v in pair),
+            ))
+            predictions.append(
+                Prediction(
+                    submitted_by_id=int(owners[i]),
+                    uploaded_at=uploaded_at,
+                    image_file=f"images/{i}.jpg",
+                    label=int(np.argmax(probabilities[i])),
+                    probabilities=pack_probabilities(probabilities[i]),
+                )
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(LEGACY_TABLE)
+            cursor.executemany(
+                "INSERT INTO legacy_prediction VALUES "
+                "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                legacy,
+            )
+        Prediction.objects.bulk_create(predictions, batch_size=2000)
+        return user_ids
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        with transaction.atomic():
+            user_ids = self._populate(options["rows"], options["users"])
+            user_id = user_ids[len(user_ids) // 2]
+            self.stdout.write(f"{options['rows']} rows, {len(user_ids)} users")
+
+            def legacy_history():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT * FROM legacy_prediction WHERE submitted_by_id = %s "
+                        "ORDER BY uploaded_at DESC LIMIT 50",
+                        [user_id],
+                    )
+                    return cursor.fetchall()
+
+            def legacy_classes():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT class_1, COUNT(*) FROM legacy_prediction "
+                        "GROUP BY class_1"
+                    )
+                    return cursor.fetchall()
+
+            def history():
+                return list(
+                    Prediction.objects.filter(submitted_by_id=user_id).order_by(
+                        "-uploaded_at"
+                    )[:50]
+                )
+
+            def classes():
+                return list(
+                    Prediction.objects.values("label")
+                    .annotate(count=Count("id"))
+                    .order_by()
+                )
+
+            results = [
+                (
+                    "history page",
+                    self._time("history (old layout)", legacy_history, repeat),
+                    self._time("history (indexed)", history, repeat),
+                ),
+                (
+                    "per-class counts",
+                    self._time("class counts (old layout)", legacy_classes, repeat),
+                    self._time("class counts (label)", classes, repeat),
+                ),
+            ]
+            transaction.set_rollback(True)
+
+        for name, before, after in results:
+            self.stdout.write(
+                self.style.SUCCESS(f"{name}: {before / after:.1f}x faster")
+            )
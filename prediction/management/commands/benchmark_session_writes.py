@@ -0,0 +1,84 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+WRITES = ("INSERT", "UPDATE", "DELETE")
+
+# The settings before cache-backed sessions: every request saved the session
+LEGACY_SESSIONS = {
+    "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+    "SESSION_SAVE_EVERY_REQUEST": True,
+    "MIDDLEWARE": [
+        name
+        for name in settings.MIDDLEWARE
+        if name != "imgpredict.middleware.SessionRefreshMiddleware"
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Count database writes per request for a logged-in user browsing pages "
+        "and an anonymous visitor starting Google sign-in, with the old "
+        "save-every-request sessions and the configured ones. Rows are created "
+        "in a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument("--requests", type=int, default=50)
+
+    @staticmethod
+    def _browse(user, requests):
+        """Return (writes, session writes, ms) per page view and the OAuth state."""
+        client = Client(SERVER_NAME="localhost")
+        client.force_login(user)
+        pages = [reverse("homepage"), reverse("blogs"), reverse("prediction_history")]
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for i in range(requests):
+                client.get(pages[i % len(pages)])
+            elapsed = (time.perf_counter() - start) * 1000
+        writes = [q["sql"] for q in queries if q["sql"].lstrip().startswith(WRITES)]
+        session_writes = [sql for sql in writes if "django_session" in sql]
+
+        # Starting the OAuth flow must still persist the state for the callback.
+        visitor = Client(SERVER_NAME="localhost")
+        visitor.post(reverse("social:begin", args=["google-oauth2"]))
+        state = visitor.session.get("google-oauth2_state")
+        return (
+            len(writes) / requests,
+            len(session_writes) / requests,
+            elapsed / requests,
+            state is not None,
+        )
+
+    def handle(self, *args, **options):
+        requests = options["requests"]
+        self.stdout.write(
+            f"{requests} page views per mode, session refresh threshold "
+            f"{settings.SESSION_REFRESH_THRESHOLD}s"
+        )
+        with transaction.atomic():
+            user = User.objects.create_user(username="session-benchmark")
+            results = {}
+            with override_settings(**LEGACY_SESSIONS):
+                results["save every"] = self._browse(user, requests)
+            results["configured"] = self._browse(user, requests)
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"{'sessions':>10} {'writes/req':>11} {'session/req':>12} "
+            f"{'ms/req':>8} {'oauth state':>12}"
+        )
+        for name, (writes, session_writes, ms, state) in results.items():
+            self.stdout.write(
+                f"{name:>10} {writes:>11.2f} {session_writes:>12.2f} "
+                f"{ms:>8.2f} {'kept' if state else 'LOST':>12}"
+            )
@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess  # noqa: S404
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+# Runs in a fresh interpreter so module caches from this process do not leak in.
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+import prediction.views
+ready = time.perf_counter() - start
+first = None
+if {predict}:
+    import numpy as np
+    from prediction import naive
+    t = time.perf_counter()
+    naive.predict_batch(np.zeros((1, 32, 32, 3), dtype=np.float32))
+    first = time.perf_counter() - t
+print(json.dumps({{
+    "ready": ready,
+    "first_prediction": first,
+    "tensorflow_imported": "tensorflow" in sys.modules,
+}}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Measure process startup time with lazy and warm-started model loading."
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument(
+            "--runs", type=int, default=3, help="Fresh processes per mode."
+        )
+
+    @staticmethod
+    def _probe(warmup, predict):
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": os.environ.get(
+                "DJANGO_SETTINGS_MODULE", "imgpredict.settings"
+            ),
+            "PREDICTION_WARMUP": str(warmup),
+        }
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, "-c", PROBE.format(predict=predict)],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        modes = [
+            ("lazy, no prediction", False, False),
+            ("lazy + first prediction", False, True),
+            ("warm-up in ready()", True, False),
+            ("warm-up + first prediction", True, True),
+        ]
+        for label, warmup, predict in modes:
+            runs = [self._probe(warmup, predict) for _ in range(options["runs"])]
+            ready = min(r["ready"] for r in runs)
+            line = f"{label:>28}: startup {ready:.2f}s"
+            if predict:
+                first = min(r["first_prediction"] for r in runs)
+                line += f", first prediction {first * 1000:.1f} ms"
+            line += f", tensorflow imported: {runs[0]['tensorflow_imported']}"
+            self.stdout.write(line)
@@ -0,0 +1,84 @@
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from prediction.naive import preprocess_image
+from prediction.utils import compress_image
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the per-request cost of preprocessing from disk against "
+        "preprocessing the in-memory upload."
+    )
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument("--requests", type=int, default=100)
+        parser.add_argument(
+            "--size", type=int, nargs=2, default=(1600, 1200), help="Upload WxH."
+        )
+
+    @staticmethod
+    def _upload(size):
+        rng = np.random.default_rng(0)
+        pixels = rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+        output = io.BytesIO()
+        Image.fromarray(pixels).save(output, format="JPEG", quality=95)
+        return output.getvalue()
+
+    def _run(self, name, step, requests):
+        # Warm up imports and caches so the first timed request is representative.
+        step(0)
+        wall, cpu = time.perf_counter(), time.process_time()
+        bytes_read = 0
+        for i in range(1, requests + 1):
+            bytes_read += step(i)
+        wall = (time.perf_counter() - wall) * 1000 / requests
+        cpu = (time.process_time() - cpu) * 1000 / requests
+        self.stdout.write(
+            f"{name:>10}: {wall:.2f} ms wall, {cpu:.2f} ms CPU, "
+            f"{bytes_read / requests / 1024:.1f} KB read back per request"
+        )
+        return wall
+
+    def handle(self, *args, **options):
+        payload = self._upload(options["size"])
+        requests = options["requests"]
+        self.stdout.write(
+            f"{requests} requests, {options['size'][0]}x{options['size'][1]} "
+            f"JPEG upload ({len(payload) / 1024:.0f} KB)"
+        )
+
+        with tempfile.TemporaryDirectory() as media_root:
+            storage = FileSystemStorage(location=media_root)
+
+            def disk_roundtrip(i):
+                # compress -> save -> exists -> load_img from disk
+                _, content = compress_image(ContentFile(payload, name="upload.jpg"))
+                name = storage.save(f"disk/{i}.jpg", content)
+                path = storage.path(name)
+                if not os.path.exists(path):
+                    raise FileNotFoundError(path)
+                preprocess_image(path)
+                return os.path.getsize(path)
+
+            def in_memory(i):
+                # compress -> preprocess the decoded image -> save
+                img, content = compress_image(ContentFile(payload, name="upload.jpg"))
+                preprocess_image(img)
+                storage.save(f"memory/{i}.jpg", content)
+                return 0
+
+            before = self._run("disk", disk_roundtrip, requests)
+            after = self._run("in-memory", in_memory, requests)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Saved {before - after:.2f} ms per request")
+        )
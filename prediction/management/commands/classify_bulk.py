@@ -0,0 +1,409 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+import uuid
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import batched, repeat
+
+import django
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from PIL import Image
+
+from prediction.dashboard import update_rollups
+from prediction.labels import CLASSES
+from prediction.models import Prediction
+from prediction.naive import allowed_file, model_version, predict_batch
+from prediction.preprocessing import normalize, resize_image
+from prediction.thumbnails import render_thumbnail
+from prediction.utils import UploadedImage, build_prediction, compress_image
+
+
+# Uploads are downscaled to this before preprocessing (see compress_image)
+UPLOAD_SIZE = (800, 800)
+PROGRESS_INTERVAL = 5
+
+_archives = {}
+
+
+def list_images(source):
+    """Relative names of the images in a directory tree or ZIP, in a fixed order."""
+    if os.path.isdir(source):
+        names = []
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            names.extend(
+                os.path.relpath(os.path.join(root, name), source)
+                for name in sorted(files)
+                if allowed_file(name) and not name.startswith(".")
+            )
+        return names
+    with zipfile.ZipFile(source) as archive:
+        return sorted(
+            info.filename
+            for info in archive.infolist()
+            if not info.is_dir()
+            and allowed_file(info.filename)
+            and not os.path.basename(info.filename).startswith(".")
+        )
+
+
+def read_image(source, name):
+    if os.path.isdir(source):
+        with open(os.path.join(source, name), "rb") as f:
+            return f.read()
+    # Each worker process opens the archive once.
+    archive = _archives.get(source)
+    if archive is None:
+        archive = _archives[source] = zipfile.ZipFile(source)
+    return archive.read(name)
+
+
+def load_image(source, name, prefix, run):
+    """Decode and preprocess one image in a worker process.
+
+    Returns ``(name, uint8 pixels, stored, error)``. With a ``prefix``,
+    ``stored`` is the ``(upload, thumbnail)`` to write once the image is
+    classified, encoded exactly as for images submitted through the site.
+    The upload is named after the run and ``name``, so a resumed run gives
+    an image the same name again.
+    """
+    try:
+        data = read_image(source, name)
+        if prefix is None:
+            img = Image.open(io.BytesIO(data))
+            img.thumbnail(UPLOAD_SIZE)
+            stored = None
+        else:
+            basename = os.path.basename(name)
+            img, content = compress_image(ContentFile(data, name=basename))
+            if content is None:
+                return name, None, None, "Error processing image."
+            file_ext = basename.rsplit(".", 1)[1].lower()
+            digest = hashlib.sha256(f"{run}/{name}".encode()).hexdigest()[:12]
+            # Only the encoded files go back to the parent process.
+            upload = UploadedImage(f"{prefix}_{digest}.{file_ext}", None, content)
+            stored = upload, render_thumbnail(img)
+        return name, np.asarray(resize_image(img), dtype=np.uint8), stored, None
+    except Exception as e:
+        return name, None, None, str(e)
+
+
+def store_upload(upload, thumbnail):
+    """Write an upload and its thumbnail, replacing copies an earlier attempt left."""
+    for path, content in (
+        (upload.storage_path, upload.content),
+        (upload.thumbnail_path, thumbnail),
+    ):
+        if default_storage.exists(path):
+            default_storage.delete(path)
+        default_storage.save(path, content)
+
+
+def delete_upload(upload):
+    default_storage.delete(upload.storage_path)
+    default_storage.delete(upload.thumbnail_path)
+
+
+class CsvOutput:
+    """Rows appended to a CSV file; resuming truncates to the last checkpoint."""
+
+    def __init__(self, path, state):
+        offset = state.get("offset")
+        if offset is None:
+            self.file = open(path, "w", newline="")
+            csv.writer(self.file).writerow(["path", "label", "confidence", *CLASSES])
+        else:
+            self.file = open(path, "r+", newline="")
+            self.file.truncate(offset)
+            self.file.seek(offset)
+        self.writer = csv.writer(self.file)
+
+    def write(self, rows, done):
+        self.writer.writerows(
+            [
+                name,
+                CLASSES[int(np.argmax(probabilities))],
+                f"{probabilities.max():.6f}",
+                *(f"{p:.6f}" for p in probabilities),
+            ]
+            for name, _, probabilities in rows
+        )
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {"offset": self.file.tell()}
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetOutput:
+    """A directory of Parquet part files, one per batch, named by position."""
+
+    def __init__(self, path, state):
+        try:
+            import pyarrow as pa  # noqa: PLC0415
+            import pyarrow.parquet as pq  # noqa: PLC0415
+        except ImportError as e:
+            raise CommandError("Parquet output requires pyarrow.") from e
+        self.pa, self.pq = pa, pq
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, rows, done):
+        if not rows:
+            return {}
+        probabilities = np.stack([row[2] for row in rows])
+        columns = {
+            "path": [row[0] for row in rows],
+            "label": [CLASSES[i] for i in probabilities.argmax(axis=1)],
+            "confidence": probabilities.max(axis=1),
+            **{name: probabilities[:, i] for i, name in enumerate(CLASSES)},
+        }
+        # Rewriting a part after an interruption replaces it, never duplicates it.
+        self.pq.write_table(
+            self.pa.table(columns), os.path.join(self.path, f"part-{done:09d}.parquet")
+        )
+        return {}
+
+    def close(self):
+        pass
+
+
+class DatabaseOutput:
+    """Prediction rows for ``user``, stored with one bulk_create per batch.
+
+    The image files of a batch are written just before its rows and deleted
+    again if the rows are not stored. A batch replayed after a crash between
+    its commit and the checkpoint finds its rows by their image names and
+    skips them.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    def write(self, rows, done):
+        paths = [upload.storage_path for _, (upload, _), _ in rows]
+        stored = set(
+            Prediction.objects.filter(
+                submitted_by=self.user, image_file__in=paths
+            ).values_list("image_file", flat=True)
+        )
+        new = [
+            (upload, thumbnail, probabilities)
+            for _, (upload, thumbnail), probabilities in rows
+            if upload.storage_path not in stored
+        ]
+        try:
+            for upload, thumbnail, _ in new:
+                store_upload(upload, thumbnail)
+            predictions = [
+                build_prediction(self.user, upload, probabilities)
+                for upload, _, probabilities in new
+            ]
+            with transaction.atomic():
+                Prediction.objects.bulk_create(predictions, batch_size=500)
+                update_rollups(added=predictions)
+        except BaseException:
+            for upload, _, _ in new:
+                delete_upload(upload)
+            raise
+        return {}
+
+    def close(self):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Classify every image in a directory or ZIP archive. Images are decoded "
+        "in a process pool and classified in batches; results go to Prediction "
+        "rows for --user, or to a CSV or Parquet --output. Progress is "
+        "checkpointed after each batch so an interrupted run can be resumed "
+        "by running the same command again."
+    )
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument("source", help="Directory or ZIP archive of images.")
+        parser.add_argument("--user", help="Store Prediction rows for this username.")
+        parser.add_argument(
+            "--output", help="Write a .csv file or a .parquet directory instead."
+        )
+        parser.add_argument("--batch-size", type=int, default=256)
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument(
+            "--checkpoint", help="Checkpoint file (default: <source>.checkpoint.json)."
+        )
+        parser.add_argument(
+            "--restart", action="store_true", help="Ignore an existing checkpoint."
+        )
+
+    @staticmethod
+    def _load_state(path, identity, restart):
+        if restart or not os.path.exists(path):
+            return {
+                **identity,
+                "run": uuid.uuid4().hex,
+                "done": 0,
+                "classified": 0,
+                "failed": 0,
+            }
+        with open(path) as f:
+            state = json.load(f)
+        for key, value in identity.items():
+            if state.get(key) != value:
+                raise CommandError(
+                    f"{path} was written for {key}={state.get(key)!r}; "
+                    f"use --restart to start over."
+                )
+        return state
+
+    @staticmethod
+    def _save_state(path, state):
+        # Replace the file in one step so a crash never leaves half a checkpoint.
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _open_output(self, options, state):
+        output = options["output"]
+        if output is None:
+            return DatabaseOutput(self.user)
+        if output.endswith(".csv"):
+            return CsvOutput(output, state)
+        if output.endswith(".parquet"):
+            return ParquetOutput(output, state)
+        raise CommandError("--output must end in .csv or .parquet.")
+
+    def _resolve_user(self, username):
+        """Look up the --user account; return the prefix of its stored images."""
+        if username is None:
+            return None
+        try:
+            self.user = User.objects.get(username=username)
+        except User.DoesNotExist as e:
+            raise CommandError(f"No user named {username!r}.") from e
+        return f"{self.user.username}_{self.user.id}"
+
+    def handle(self, *args, **options):
+        source = os.path.abspath(options["source"])
+        if not os.path.isdir(source) and not zipfile.is_zipfile(source):
+            raise CommandError(f"{source} is not a directory or ZIP archive.")
+        if (options["user"] is None) == (options["output"] is None):
+            raise CommandError("Pass exactly one of --user and --output.")
+
+        self.source = source
+        self.prefix = self._resolve_user(options["user"])
+        self.checkpoint = options["checkpoint"] or f"{source}.checkpoint.json"
+        identity = {
+            "source": source,
+            "target": options["output"] or f"user:{options['user']}",
+            "model": model_version(),
+        }
+        state = self._load_state(self.checkpoint, identity, options["restart"])
+        self.run = state.setdefault("run", uuid.uuid4().hex)
+        names = list_images(source)
+        state["total"] = len(names)
+        remaining = names[state["done"] :]
+        if state["done"]:
+            self.stdout.write(f"Resuming after {state['done']} of {len(names)} images.")
+        if not remaining:
+            self.stdout.write(self.style.SUCCESS("Nothing left to classify."))
+            return
+
+        # Stored image names depend on the run, so it is recorded up front.
+        self._save_state(self.checkpoint, state)
+        self.output = self._open_output(options, state)
+        # Forked workers must not inherit open database connections.
+        connections.close_all()
+        start = time.perf_counter()
+        try:
+            processed = self._classify_all(remaining, state, options)
+        except KeyboardInterrupt:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Interrupted after {state['done']} images; run again to resume."
+                )
+            )
+            return
+        finally:
+            self.output.close()
+
+        self._report(state, processed, start)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Classified {state['classified']} images, {state['failed']} failed."
+            )
+        )
+
+    def _classify_all(self, names, state, options):
+        """Decode ``names`` in a process pool and classify them batch by batch."""
+        start = last_report = time.perf_counter()
+        processed = 0
+        batch_size, workers = options["batch_size"], options["workers"]
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=django.setup
+        ) as executor:
+            # Keep the next batch decoding while the current one is classified.
+            in_flight = deque()
+            for chunk in batched(names, batch_size):
+                in_flight.append(
+                    executor.map(
+                        load_image,
+                        repeat(self.source),
+                        chunk,
+                        repeat(self.prefix),
+                        repeat(self.run),
+                        chunksize=max(1, batch_size // (4 * workers)),
+                    )
+                )
+                if len(in_flight) < 2:
+                    continue
+                processed += self._classify(in_flight.popleft(), state)
+                self._save_state(self.checkpoint, state)
+                if time.perf_counter() - last_report > PROGRESS_INTERVAL:
+                    last_report = time.perf_counter()
+                    self._report(state, processed, start)
+            while in_flight:
+                processed += self._classify(in_flight.popleft(), state)
+                self._save_state(self.checkpoint, state)
+        return processed
+
+    def _classify(self, results, state):
+        """Run one decoded batch through the model and write its rows."""
+        names, pixels, stored = [], [], []
+        count = 0
+        for name, image_pixels, stored_name, error in results:
+            count += 1
+            if error:
+                self.stderr.write(f"{name}: {error}")
+                state["failed"] += 1
+                continue
+            names.append(name)
+            pixels.append(image_pixels)
+            stored.append(stored_name)
+
+        rows = []
+        if pixels:
+            probabilities = predict_batch(normalize(np.stack(pixels)))
+            rows = list(zip(names, stored, probabilities, strict=True))
+        state["done"] += count
+        state.update(self.output.write(rows, state["done"]))
+        state["classified"] += len(rows)
+        return count
+
+    def _report(self, state, processed, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{state['done']}/{state['total']} images, "
+            f"{processed / elapsed:.1f} images/s"
+        )
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from prediction.exports import delete_old_exports
+
+
+class Command(BaseCommand):
+    help = "Delete background PDF exports older than PREDICTION_EXPORT_MAX_AGE_HOURS."
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=settings.PREDICTION_EXPORT_MAX_AGE_HOURS,
+            help="Delete exports created more than this many hours ago.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = delete_old_exports(timedelta(hours=options["hours"]))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} exports."))
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from prediction.cache import delete_old_cache_entries
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete cached predictions older than PREDICTION_CACHE_MAX_AGE_DAYS and "
+        "keep at most PREDICTION_CACHE_MAX_ROWS of the newest."
+    )
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.PREDICTION_CACHE_MAX_AGE_DAYS,
+            help="Delete entries created more than this many days ago.",
+        )
+        parser.add_argument(
+            "--max-rows",
+            type=int,
+            default=settings.PREDICTION_CACHE_MAX_ROWS,
+            help="Keep at most this many of the newest entries.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = delete_old_cache_entries(
+            timedelta(days=options["days"]), options["max_rows"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} cached predictions."))
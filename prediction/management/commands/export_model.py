@@ -0,0 +1,27 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from prediction.export import export_tflite
+from prediction.naive import MODEL_PATH, TFLITE_MODEL_PATH
+
+
+class Command(BaseCommand):
+    help = "Export the served Keras model to TFLite for the lightweight backend."
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument("--source", default=MODEL_PATH, help="Keras model path.")
+        parser.add_argument(
+            "--output", default=TFLITE_MODEL_PATH, help="Destination .tflite path."
+        )
+
+    def handle(self, *args, **options):
+        output = export_tflite(options["source"], options["output"])
+        size_kb = os.path.getsize(options["source"]) / 1024
+        tflite_kb = output.stat().st_size / 1024
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {output} ({tflite_kb:.0f} KB, source {size_kb:.0f} KB). "
+                "Set PREDICTION_BACKEND=tflite to serve it."
+            )
+        )
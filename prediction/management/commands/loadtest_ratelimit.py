@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess  # noqa: S404
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+
+LOCAL_MEMORY = "django.core.cache.backends.locmem.LocMemCache"
+
+# Rate-limited endpoint -> (path, POST data); the rates are set on the views
+ENDPOINTS = {
+    "login": ("/account/login/", {"username": "loadtest", "password": "wrong"}),
+    "addpredict": ("/prediction/", {}),
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def client_loop(servers, path, data, session_cookie, requests_per_client):
+    """POST to ``path`` round-robin across ``servers``; count the status codes."""
+    session = requests.Session()
+    if session_cookie:
+        session.cookies.set(settings.SESSION_COOKIE_NAME, session_cookie)
+    statuses = Counter()
+    try:
+        page = session.get(servers[0] + path, timeout=30)
+        match = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page.text)
+        data = {**data, "csrfmiddlewaretoken": match.group(1) if match else ""}
+        for i in range(requests_per_client):
+            url = servers[i % len(servers)] + path
+            statuses[session.post(url, data=data, timeout=30).status_code] += 1
+    except requests.RequestException:
+        statuses["error"] += 1
+    return statuses
+
+
+class Command(BaseCommand):
+    help = (
+        "Start several server processes on a scratch database and send "
+        "rate-limited POSTs to them from parallel client processes. With a "
+        "shared counter store the number of accepted requests matches the "
+        "limit whatever the number of servers; --compare also runs the old "
+        "per-process local-memory counters."
+    )
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument("--servers", type=int, default=4)
+        parser.add_argument("--clients", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=10, help="Per client.")
+        parser.add_argument("--endpoint", choices=ENDPOINTS, default="login")
+        parser.add_argument("--compare", action="store_true")
+        parser.add_argument("--setup", action="store_true", help=argparse.SUPPRESS)
+
+    def _setup(self):
+        """Migrate the scratch database and print a signed-in session cookie."""
+        call_command("migrate", verbosity=0)
+        user = User.objects.create_user(username="loadtest")
+        client = Client()
+        client.force_login(user)
+        cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.stdout.write(json.dumps({"session": cookie}))
+
+    @staticmethod
+    def _start_servers(count, env):
+        servers, processes = [], []
+        for _ in range(count):
+            port = free_port()
+            processes.append(
+                subprocess.Popen(  # noqa: S603
+                    [
+                        sys.executable,
+                        "manage.py",
+                        "runserver",
+                        "--noreload",
+                        f"127.0.0.1:{port}",
+                    ],
+                    cwd=settings.BASE_DIR,
+                    env=env,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+            )
+            servers.append(f"http://127.0.0.1:{port}")
+
+        deadline = time.monotonic() + 60
+        for server in servers:
+            while True:
+                try:
+                    requests.get(server + "/account/login/", timeout=5)
+                    break
+                except requests.ConnectionError:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.2)
+        return servers, processes
+
+    def _run(self, backend, options):
+        path, data = ENDPOINTS[options["endpoint"]]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            env = {
+                **os.environ,
+                "DATABASE_URL": f"sqlite:///{os.path.join(tmpdir, 'load.sqlite3')}",
+                "RATELIMIT_CACHE_BACKEND": backend,
+                "SESSION_CACHE_DIR": os.path.join(tmpdir, "sessions"),
+            }
+            setup = subprocess.run(  # noqa: S603
+                [sys.executable, "manage.py", "loadtest_ratelimit", "--setup"],
+                cwd=settings.BASE_DIR,
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            session = json.loads(setup.stdout.strip().splitlines()[-1])["session"]
+            cookie = session if options["endpoint"] == "addpredict" else None
+
+            servers, processes = self._start_servers(options["servers"], env)
+            try:
+                start = time.perf_counter()
+                with ProcessPoolExecutor(max_workers=options["clients"]) as pool:
+                    futures = [
+                        pool.submit(
+                            client_loop,
+                            servers,
+                            path,
+                            data,
+                            cookie,
+                            options["requests"],
+                        )
+                        for _ in range(options["clients"])
+                    ]
+                    statuses = sum((f.result() for f in futures), Counter())
+                wall = time.perf_counter() - start
+            finally:
+                for process in processes:
+                    process.terminate()
+                for process in processes:
+                    process.wait()
+
+        limited = statuses.pop(429, 0)
+        errors = statuses.pop("error", 0)
+        errors += sum(n for status, n in statuses.items() if status >= 500)
+        accepted = sum(n for status, n in statuses.items() if status < 500)
+        self.stdout.write(
+            f"{backend.rsplit('.', 1)[-1]:>14}: {accepted:4d} accepted, "
+            f"{limited:4d} limited, {errors} errors, "
+            f"{(accepted + limited) / wall:.1f} req/s"
+        )
+
+    def handle(self, *args, **options):
+        if options["setup"]:
+            self._setup()
+            return
+
+        rate = {
+            "login": "5/m per IP",
+            "addpredict": f"{settings.PREDICTION_RATE_LIMIT} per user",
+        }
+        self.stdout.write(
+            f"{options['clients']} client processes x {options['requests']} POSTs "
+            f"to {options['endpoint']} across {options['servers']} servers, "
+            f"limit {rate[options['endpoint']]}"
+        )
+        backends = [settings.RATELIMIT_CACHE_BACKEND]
+        if options["compare"]:
+            backends.insert(0, LOCAL_MEMORY)
+        for backend in backends:
+            self._run(backend, options)
@@ -0,0 +1,134 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from prediction.backends import KerasBackend, TFLiteBackend, import_tensorflow
+from prediction.export import export_tflite
+from prediction.naive import BASE_DIR, INT8_MODEL_PATH, MODEL_PATH
+
+
+# Written by notebook/cifar_data.py
+CIFAR10_DIR = os.path.join(BASE_DIR, "notebook", "data", "cifar10")
+
+
+def load_cifar10():
+    """Return CIFAR-10 train images and the test/val split used in training.
+
+    Reads the memory-mapped arrays written by ``notebook/cifar_data.py``
+    when they exist. Otherwise the dataset comes from Keras, and the
+    ``train_test_split(test_size=0.5, random_state=0)`` halving of the
+    official test set is reproduced so the reported accuracy is comparable.
+    """
+    if all(
+        os.path.exists(os.path.join(CIFAR10_DIR, f"{kind}_{split}.npy"))
+        for split in ("train", "val", "test")
+        for kind in ("x", "y")
+    ):
+        x_train = np.load(os.path.join(CIFAR10_DIR, "x_train.npy"), mmap_mode="r")
+        splits = {
+            split: tuple(
+                np.load(os.path.join(CIFAR10_DIR, f"{kind}_{split}.npy"), mmap_mode="r")
+                for kind in ("x", "y")
+            )
+            for split in ("test", "val")
+        }
+        return x_train, splits
+
+    tf = import_tensorflow()
+    (x_train, _), (x_test, y_test) = tf.keras.datasets.cifar10.load_data()
+    permutation = np.random.RandomState(0).permutation(len(x_test))
+    n_val = int(np.ceil(0.5 * len(x_test)))
+    val_idx, test_idx = permutation[:n_val], permutation[n_val:]
+    splits = {
+        "test": (x_test[test_idx], y_test[test_idx].ravel()),
+        "val": (x_test[val_idx], y_test[val_idx].ravel()),
+    }
+    return x_train, splits
+
+
+def normalize(images):
+    return images.astype(np.float32) / 255.0
+
+
+class Command(BaseCommand):
+    help = "Quantize the served model to int8 and report accuracy, latency and size."
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument("--source", default=MODEL_PATH, help="Keras model path.")
+        parser.add_argument(
+            "--output", default=INT8_MODEL_PATH, help="Destination .tflite path."
+        )
+        parser.add_argument(
+            "--calibration-samples",
+            type=int,
+            default=500,
+            help="Training images used to calibrate activation ranges.",
+        )
+        parser.add_argument(
+            "--latency-iterations",
+            type=int,
+            default=200,
+            help="Single-image calls timed per model.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    @staticmethod
+    def _accuracy(backend, images, labels, batch_size=256):
+        correct = 0
+        for start in range(0, len(images), batch_size):
+            batch = normalize(images[start : start + batch_size])
+            predicted = np.argmax(backend.infer(batch), axis=1)
+            correct += int((predicted == labels[start : start + batch_size]).sum())
+        return correct / len(images) * 100
+
+    @staticmethod
+    def _latency_ms(backend, image, iterations):
+        backend.infer(image)
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            backend.infer(image)
+            timings.append(time.perf_counter() - start)
+        return float(np.median(timings) * 1000)
+
+    def handle(self, *args, **options):
+        x_train, splits = load_cifar10()
+        rng = np.random.default_rng(options["seed"])
+        sample = rng.choice(
+            len(x_train), size=options["calibration_samples"], replace=False
+        )
+        calibration = normalize(x_train[sample])
+
+        output = export_tflite(options["source"], options["output"], calibration)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {output}"))
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            float_path = export_tflite(
+                options["source"], os.path.join(tmpdir, "float.tflite")
+            )
+            candidates = [
+                KerasBackend(options["source"]),
+                TFLiteBackend(float_path),
+                TFLiteBackend(output),
+            ]
+            labels = ["keras (float32)", "tflite (float32)", "tflite (int8)"]
+            image = normalize(splits["test"][0][:1])
+            self.stdout.write(
+                f"{'model':>16} {'test acc':>9} {'val acc':>9} "
+                f"{'latency':>11} {'size':>9}"
+            )
+            for label, backend in zip(labels, candidates, strict=True):
+                backend.load()
+                test_acc = self._accuracy(backend, *splits["test"])
+                val_acc = self._accuracy(backend, *splits["val"])
+                latency = self._latency_ms(
+                    backend, image, options["latency_iterations"]
+                )
+                size_kb = os.path.getsize(backend.path) / 1024
+                self.stdout.write(
+                    f"{label:>16} {test_acc:>8.2f}% {val_acc:>8.2f}% "
+                    f"{latency:>8.3f} ms {size_kb:>6.0f} KB"
+                )
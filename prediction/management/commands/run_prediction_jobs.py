@@ -0,0 +1,40 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from prediction.jobs import process_pending_jobs, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued prediction jobs from the database queue."
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument(
+            "--once", action="store_true", help="Drain the queue once and exit."
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep when the queue is empty.",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=600,
+            help="Requeue jobs left running for this many seconds (crashed workers).",
+        )
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(timedelta(seconds=options["stale_after"]))
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale jobs.")
+
+        while True:
+            processed = process_pending_jobs()
+            if processed:
+                self.stdout.write(f"Processed {processed} jobs.")
+            if options["once"]:
+                break
+            time.sleep(options["poll_interval"])
@@ -0,0 +1,171 @@
+import bisect
+import random
+import threading
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+
+
+# Upper bounds in seconds, growing by about 1.5x from 0.25 ms to 30 s
+BUCKETS = tuple(round(0.00025 * 1.5**i, 6) for i in range(30))
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Counts of observed durations in fixed buckets, plus their sum.
+
+    Quantiles are estimated by interpolating inside the bucket they fall
+    in, the way Prometheus' ``histogram_quantile`` does, so they are exact
+    to within one bucket (about 50%).
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        seconds = float(seconds)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += seconds
+
+    def snapshot(self):
+        """Return ``(per-bucket counts, sum)``; the last count is over the top bound."""
+        with self._lock:
+            return list(self._counts), self._sum
+
+    def quantile(self, q, counts=None):
+        counts = counts if counts is not None else self.snapshot()[0]
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def summary(self):
+        counts, total = self.snapshot()
+        count = sum(counts)
+        return {
+            "count": count,
+            "mean": total / count if count else 0.0,
+            **{f"p{round(q * 100)}": self.quantile(q, counts) for q in QUANTILES},
+        }
+
+
+class StageTimings:
+    """Per-stage duration histograms of the prediction pipeline in this process."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram())
+        histogram.observe(seconds)
+
+    def histograms(self):
+        with self._lock:
+            return dict(sorted(self._histograms.items()))
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+timings = StageTimings()
+
+
+def sampled():
+    """Whether to time this call, per PREDICTION_METRICS_SAMPLE_RATE."""
+    rate = settings.PREDICTION_METRICS_SAMPLE_RATE
+    return rate >= 1 or (rate > 0 and random.random() < rate)  # noqa: S311
+
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        timings.observe(self.stage, time.perf_counter() - self.start)
+
+
+_NOT_SAMPLED = nullcontext()
+
+
+def timed(stage):
+    """Context manager recording how long its block takes under ``stage``.
+
+    Calls that are not sampled get a shared no-op context, so disabled
+    timing costs one settings lookup.
+    """
+    return _Timer(stage) if sampled() else _NOT_SAMPLED
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def render_prometheus(cache_stats=None, batcher_stats=None):
+    """Render the stage histograms and counters in Prometheus text format."""
+    lines = [
+        "# HELP prediction_stage_seconds Time spent in each prediction stage.",
+        "# TYPE prediction_stage_seconds histogram",
+    ]
+    for stage, histogram in timings.histograms().items():
+        counts, total = histogram.snapshot()
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, counts, strict=False):
+            cumulative += count
+            lines.append(
+                f"prediction_stage_seconds_bucket{_labels(stage=stage, le=bound)} "
+                f"{cumulative}"
+            )
+        cumulative += counts[-1]
+        lines.extend((
+            f"prediction_stage_seconds_bucket{_labels(stage=stage, le='+Inf')} "
+            f"{cumulative}",
+            f"prediction_stage_seconds_sum{_labels(stage=stage)} {total}",
+            f"prediction_stage_seconds_count{_labels(stage=stage)} {cumulative}",
+        ))
+
+    if cache_stats:
+        lines.extend((
+            "# TYPE prediction_cache_lookups_total counter",
+            *(
+                f"prediction_cache_lookups_total{_labels(result=result)} "
+                f"{cache_stats[result]}"
+                for result in ("hits", "persistent_hits", "misses")
+            ),
+            "# TYPE prediction_cache_entries gauge",
+            f"prediction_cache_entries {cache_stats['entries']}",
+        ))
+    if batcher_stats:
+        lines.extend((
+            "# TYPE prediction_batcher_requests_total counter",
+            f"prediction_batcher_requests_total {batcher_stats['requests']}",
+            "# TYPE prediction_batcher_batches_total counter",
+            f"prediction_batcher_batches_total {batcher_stats['batches']}",
+            "# TYPE prediction_batcher_queue_depth gauge",
+            f"prediction_batcher_queue_depth {batcher_stats['queue_depth']}",
+        ))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-18 00:11
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0002_predictionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CachedPrediction',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('classes', models.JSONField()),
+                ('probabilities', models.JSONField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
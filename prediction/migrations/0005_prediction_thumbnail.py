@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-18 00:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0004_pdfexport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prediction',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='thumbnails/'),
+        ),
+    ]
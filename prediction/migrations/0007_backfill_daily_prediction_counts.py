@@ -0,0 +1,40 @@
+from django.db import migrations
+from django.db.models import Count, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def backfill_daily_counts(apps, schema_editor):
+    Prediction = apps.get_model("prediction", "Prediction")
+    DailyPredictionCount = apps.get_model("prediction", "DailyPredictionCount")
+    rows = (
+        Prediction.objects
+        .annotate(date=TruncDate("uploaded_at"), label=Coalesce("class_1", Value("")))
+        .values("date", "submitted_by", "label")
+        .annotate(count=Count("id"))
+    )
+    DailyPredictionCount.objects.bulk_create(
+        (
+            DailyPredictionCount(
+                date=row["date"],
+                submitted_by_id=row["submitted_by"],
+                label=row["label"],
+                count=row["count"],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+def clear_daily_counts(apps, schema_editor):
+    apps.get_model("prediction", "DailyPredictionCount").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("prediction", "0006_dailypredictioncount"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_counts, clear_daily_counts),
+    ]
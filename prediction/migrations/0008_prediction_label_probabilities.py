@@ -0,0 +1,29 @@
+# Generated by Django 6.1.2 on 2026-10-18 00:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0007_backfill_daily_prediction_counts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prediction',
+            name='label',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(0, 'airplane'), (1, 'automobile'), (2, 'bird'), (3, 'cat'), (4, 'deer'), (5, 'dog'), (6, 'frog'), (7, 'horse'), (8, 'ship'), (9, 'truck')], db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='prediction',
+            name='probabilities',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='prediction',
+            index=models.Index(fields=['submitted_by', '-uploaded_at'], name='prediction_user_recent'),
+        ),
+    ]
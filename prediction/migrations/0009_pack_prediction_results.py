@@ -0,0 +1,96 @@
+import struct
+
+from django.db import migrations
+
+
+# CIFAR-10 labels in model output order, frozen for this migration
+CLASSES = [
+    "airplane",
+    "automobile",
+    "bird",
+    "cat",
+    "deer",
+    "dog",
+    "frog",
+    "horse",
+    "ship",
+    "truck",
+]
+RANKED_FIELDS = [
+    ("class_1", "prob_1"),
+    ("class_2", "prob_2"),
+    ("class_3", "prob_3"),
+    ("class_4", "prob_4"),
+]
+
+
+def pack(vector):
+    return struct.pack(f"<{len(vector)}f", *vector)
+
+
+def to_vector(prediction):
+    """Rebuild a probability vector from the stored top-4 results.
+
+    Only the top four probabilities were kept, so the remaining mass is
+    spread evenly over the other classes.
+    """
+    vector = [None] * len(CLASSES)
+    for class_field, prob_field in RANKED_FIELDS:
+        name = getattr(prediction, class_field)
+        if name in CLASSES:
+            vector[CLASSES.index(name)] = (getattr(prediction, prob_field) or 0) / 100
+    rest = [i for i, value in enumerate(vector) if value is None]
+    remainder = max(0.0, 1 - sum(value for value in vector if value is not None))
+    for i in rest:
+        vector[i] = remainder / len(rest)
+    return vector
+
+
+def pack_results(apps, schema_editor):
+    Prediction = apps.get_model("prediction", "Prediction")
+    batch = []
+    predictions = Prediction.objects.filter(class_1__in=CLASSES).only(
+        "id", *(field for pair in RANKED_FIELDS for field in pair)
+    )
+    for prediction in predictions.iterator(chunk_size=1000):
+        prediction.label = CLASSES.index(prediction.class_1)
+        prediction.probabilities = pack(to_vector(prediction))
+        batch.append(prediction)
+        if len(batch) == 1000:
+            Prediction.objects.bulk_update(batch, ["label", "probabilities"])
+            batch = []
+    Prediction.objects.bulk_update(batch, ["label", "probabilities"])
+
+
+def unpack_results(apps, schema_editor):
+    Prediction = apps.get_model("prediction", "Prediction")
+    batch = []
+    predictions = Prediction.objects.exclude(probabilities=None).only(
+        "id", "probabilities"
+    )
+    for prediction in predictions.iterator(chunk_size=1000):
+        data = bytes(prediction.probabilities)
+        vector = struct.unpack(f"<{len(data) // 4}f", data)
+        ranked = sorted(range(len(vector)), key=vector.__getitem__, reverse=True)
+        for (class_field, prob_field), i in zip(RANKED_FIELDS, ranked, strict=False):
+            setattr(prediction, class_field, CLASSES[i])
+            setattr(prediction, prob_field, round(vector[i] * 100, 2))
+        batch.append(prediction)
+        if len(batch) == 1000:
+            Prediction.objects.bulk_update(
+                batch, [field for pair in RANKED_FIELDS for field in pair]
+            )
+            batch = []
+    Prediction.objects.bulk_update(
+        batch, [field for pair in RANKED_FIELDS for field in pair]
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("prediction", "0008_prediction_label_probabilities"),
+    ]
+
+    operations = [
+        migrations.RunPython(pack_results, unpack_results),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 6.1.2 on 2026-10-18 00:27
+
+from django.db import migrations, models
+
+
+def clear_prediction_cache(apps, schema_editor):
+    # Cached entries hold top-4 lists; they are refilled as probability vectors.
+    apps.get_model("prediction", "CachedPrediction").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0009_pack_prediction_results'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_prediction_cache, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='cachedprediction',
+            name='classes',
+        ),
+        migrations.RemoveField(
+            model_name='prediction',
+            name='class_1',
+        ),
+        migrations.RemoveField(
+            model_name='prediction',
+            name='class_2',
+        ),
+        migrations.RemoveField(
+            model_name='prediction',
+            name='class_3',
+        ),
+        migrations.RemoveField(
+            model_name='prediction',
+            name='class_4',
+        ),
+        migrations.RemoveField(
+            model_name='prediction',
+            name='prob_1',
+        ),
+        migrations.RemoveField(
+            model_name='prediction',
+            name='prob_2',
+        ),
+        migrations.RemoveField(
+            model_name='prediction',
+            name='prob_3',
+        ),
+        migrations.RemoveField(
+            model_name='prediction',
+            name='prob_4',
+        ),
+        # Recreated rather than altered: PostgreSQL cannot cast jsonb to
+        # bytea, and the table was emptied above.
+        migrations.RemoveField(
+            model_name='cachedprediction',
+            name='probabilities',
+        ),
+        migrations.AddField(
+            model_name='cachedprediction',
+            name='probabilities',
+            field=models.BinaryField(default=b''),
+            preserve_default=False,
+        ),
+    ]
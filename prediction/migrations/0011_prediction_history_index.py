@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-18 00:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0010_remove_prediction_top4_columns'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='prediction',
+            name='prediction_user_recent',
+        ),
+        migrations.AddIndex(
+            model_name='prediction',
+            index=models.Index(fields=['submitted_by', '-uploaded_at', '-id'], name='prediction_user_recent'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.1.2 on 2026-10-18 01:37
+
+import prediction.models
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def delete_public_exports(apps, schema_editor):
+    # Earlier exports sit under MEDIA_ROOT/exports with guessable names;
+    # remove them rather than leave them downloadable.
+    PdfExport = apps.get_model("prediction", "PdfExport")
+    exports = PdfExport.objects.exclude(file="").exclude(file__isnull=True)
+    for name in exports.values_list("file", flat=True).iterator():
+        default_storage.delete(name)
+    exports.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0011_prediction_history_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_public_exports, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='pdfexport',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=prediction.models.export_storage, upload_to=''),
+        ),
+    ]
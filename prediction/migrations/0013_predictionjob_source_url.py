@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-18 01:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0012_pdfexport_private_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionjob',
+            name='source_url',
+            field=models.URLField(blank=True, default='', max_length=2048),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.1.2 on 2026-10-18 01:57
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0013_predictionjob_source_url'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cachedprediction',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
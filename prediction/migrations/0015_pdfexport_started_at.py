@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-18 01:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0014_cachedprediction_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfexport',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,6 +1,29 @@
+import numpy as np
+from .labels import CLASSES, top_k
 from django.contrib.auth.models import User
+from django.core.files.storage import storages
 from django.db import models
 from django.utils import timezone
+from django.utils.functional import cached_property
+
+
+def pack_probabilities(probabilities):
+    """Pack a class-probability vector as little-endian float32 bytes."""
+    return np.asarray(probabilities, dtype="<f4").tobytes()
+
+
+def unpack_probabilities(data):
+    return np.frombuffer(data, dtype="<f4")
+
+
+def _ranked(part, rank):
+    """A read-only view of one top-4 class name (part 0) or probability (part 1)."""
+
+    def value(self):
+        results = self.top_results[part]
+        return results[rank] if rank < len(results) else None
+
+    return property(value)
 
 
 class Prediction(models.Model):
@@ -8,16 +31,141 @@ class Prediction(models.Model):
     submitted_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
     uploaded_at = models.DateTimeField(default=timezone.now, blank=True)
     image_file = models.ImageField(upload_to="images/", null=True, blank=True)
-    # Fields for storing prediction classes and probabilities
-    class_1 = models.CharField(max_length=255, null=True, blank=True)
-    prob_1 = models.FloatField(null=True, blank=True)
-    class_2 = models.CharField(max_length=255, null=True, blank=True)
-    prob_2 = models.FloatField(null=True, blank=True)
-    class_3 = models.CharField(max_length=255, null=True, blank=True)
-    prob_3 = models.FloatField(null=True, blank=True)
-    class_4 = models.CharField(max_length=255, null=True, blank=True)
-    prob_4 = models.FloatField(null=True, blank=True)
+    thumbnail = models.ImageField(upload_to="thumbnails/", null=True, blank=True)
+    # Top class as an index into CLASSES, and the full softmax output packed
+    # with pack_probabilities (40 bytes for 10 classes)
+    label = models.PositiveSmallIntegerField(
+        choices=list(enumerate(CLASSES)), null=True, blank=True, db_index=True
+    )
+    probabilities = models.BinaryField(null=True, blank=True)
+
+    class Meta:
+        indexes = [  # noqa: RUF012
+            models.Index(
+                fields=["submitted_by", "-uploaded_at", "-id"],
+                name="prediction_user_recent",
+            )
+        ]
 
     def __str__(self):
         submitted_by = self.submitted_by.username if self.submitted_by else "Anonymous"
         return f"Prediction by {submitted_by} on {self.uploaded_at.strftime('%Y-%m-%d %H:%M:%S')}"
+
+    def set_probabilities(self, probabilities):
+        """Store a model output vector and its top class."""
+        self.probabilities = pack_probabilities(probabilities)
+        self.label = int(np.argmax(probabilities))
+        self.__dict__.pop("top_results", None)
+
+    @cached_property
+    def top_results(self):
+        """Top-4 ``(classes, percent probabilities)``, empty without a result."""
+        if self.probabilities is None:
+            return [], []
+        return top_k(unpack_probabilities(self.probabilities), k=4)
+
+    class_1 = _ranked(0, 0)
+    prob_1 = _ranked(1, 0)
+    class_2 = _ranked(0, 1)
+    prob_2 = _ranked(1, 1)
+    class_3 = _ranked(0, 2)
+    prob_3 = _ranked(1, 2)
+    class_4 = _ranked(0, 3)
+    prob_4 = _ranked(1, 3)
+
+    @property
+    def thumbnail_url(self):
+        """URL of the small preview, falling back to the original image."""
+        image = self.thumbnail or self.image_file
+        return image.url if image else ""
+
+
+class PredictionJob(models.Model):
+    """A queued prediction processed outside the request by a worker."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    id = models.BigAutoField(primary_key=True)
+    submitted_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
+    image_name = models.CharField(max_length=255)
+    # An image link still to be downloaded by the worker; blank for uploads
+    source_url = models.URLField(max_length=2048, blank=True, default="")
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING, db_index=True
+    )
+    prediction = models.OneToOneField(
+        Prediction, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Prediction job {self.id} ({self.status})"
+
+
+class CachedPrediction(models.Model):
+    """Persistent tier of the prediction cache, keyed by image and model hash."""
+
+    key = models.CharField(max_length=64, primary_key=True)
+    probabilities = models.BinaryField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Cached prediction {self.key[:12]}"
+
+
+def export_storage():
+    return storages["exports"]
+
+
+class PdfExport(models.Model):
+    """A prediction-history PDF rendered by the job workers, see prediction.jobs."""
+
+    id = models.BigAutoField(primary_key=True)
+    submitted_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    status = models.CharField(
+        max_length=10,
+        choices=PredictionJob.Status.choices,
+        default=PredictionJob.Status.PENDING,
+    )
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
+    # Stored under a random name in private storage; see views.pdf_export
+    file = models.FileField(storage=export_storage, null=True, blank=True)
+    row_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"PDF export {self.id} ({self.status})"
+
+
+class DailyPredictionCount(models.Model):
+    """Predictions per day, user and top class, kept current by signals.
+
+    The admin dashboard aggregates this small table instead of scanning
+    every prediction.
+    """
+
+    date = models.DateField()
+    submitted_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
+    label = models.CharField(max_length=255, blank=True, default="")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [  # noqa: RUF012
+            models.UniqueConstraint(
+                fields=["date", "submitted_by", "label"], name="unique_daily_count"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.label or 'N/A'}: {self.count}"
@@ -1,63 +1,107 @@
+import functools
+import hashlib
 import os
-
-
-# suppress TensorFlow logs:
-# 2: Filters out INFO and WARNING messages,
-# 1: Filters out INFO messages
-os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"
-# fully suppress the oneDNN warning message as well as general INFO logs.
-os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
+import threading
 
 import numpy as np
-from tensorflow.keras.applications.efficientnet import preprocess_input
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing.image import img_to_array, load_img
+from .backends import KerasBackend, TFLiteBackend
+from .batching import MicroBatcher
+from .labels import CLASSES, top_k
+from .metrics import timed
+from .preprocessing import to_batch
+from .registry import ModelRegistry
+from django.conf import settings
 
 
-# Define the base directory and load the model once
+# Define the base directory; the model itself is loaded lazily on first use
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MODEL_PATH = os.path.join(BASE_DIR, "notebook", "model_100.keras")
-model = load_model(MODEL_PATH)
+TFLITE_MODEL_PATH = os.path.join(BASE_DIR, "notebook", "model_100.tflite")
+INT8_MODEL_PATH = os.path.join(BASE_DIR, "notebook", "model_100_int8.tflite")
+
+
+def create_backend(name):
+    """Build the inference backend selected by ``PREDICTION_BACKEND``."""
+    if name == "keras":
+        return KerasBackend(MODEL_PATH, compiled=settings.PREDICTION_COMPILED)
+    if name == "tflite":
+        return TFLiteBackend(TFLITE_MODEL_PATH)
+    if name == "tflite_int8":
+        return TFLiteBackend(INT8_MODEL_PATH)
+    raise ValueError(f"Unknown prediction backend: {name!r}")
+
+
+registry = ModelRegistry(create_backend(settings.PREDICTION_BACKEND))
 
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "jfif"}
 
-# Class labels
-CLASSES = [
-    "airplane",
-    "automobile",
-    "bird",
-    "cat",
-    "deer",
-    "dog",
-    "frog",
-    "horse",
-    "ship",
-    "truck",
-]
-
 
 def allowed_file(filename):
     """Check if the filename has an allowed extension."""
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def preprocess_image(filename):
-    """Load and preprocess the image for model prediction."""
-    img = load_img(filename, target_size=(32, 32))  # Resize to 32x32
-    img = img_to_array(img) / 255.0  # Normalize pixel values
-    img = preprocess_input(img)  # EfficientNet-specific preprocessing
-    return np.expand_dims(img, axis=0)  # Reshape for model input
+@functools.cache
+def model_version():
+    """Identify the served artifact; cached results are only valid for it."""
+    backend = registry.backend
+    with open(backend.path, "rb") as f:
+        digest = hashlib.file_digest(f, "sha256").hexdigest()
+    return f"{backend.name}:{digest[:16]}"
+
+
+def preprocess_image(image):
+    """Preprocess one image (a path or a decoded PIL image) for the model."""
+    return to_batch([image])  # Resized, normalized (1, 32, 32, 3) batch
+
+
+def predict_batch(batch):
+    """Run one forward pass over a preprocessed (N, 32, 32, 3) batch."""
+    return registry.infer(batch)
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """Return the process-wide micro-batcher, starting it on first use."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(
+                    predict_batch,
+                    max_batch_size=settings.PREDICTION_BATCH_MAX_SIZE,
+                    max_wait_ms=settings.PREDICTION_BATCH_MAX_WAIT_MS,
+                )
+    return _batcher
+
+
+def predict_proba(image):
+    """Return the class probabilities for the given image path or PIL image."""
+    with timed("preprocess"):
+        img = preprocess_image(image)
+    # With batching this includes the wait for the batch to fill.
+    with timed("inference"):
+        if settings.PREDICTION_BATCHING:
+            return get_batcher().predict(img, timeout=settings.PREDICTION_BATCH_TIMEOUT)
+        return predict_batch(img)[0]  # Get the first result from batch
+
+
+def predict_many_proba(images):
+    """Return an (N, 10) array of class probabilities in one forward pass."""
+    if not images:
+        return np.empty((0, len(CLASSES)), dtype=np.float32)
+    return predict_batch(to_batch(images))
+
 
+def predict(image):
+    """Predict the top 4 classes for the given image path or PIL image."""
+    return top_k(predict_proba(image), k=4)
 
-def predict(filename):
-    """Predict the top 4 classes for the given image."""
-    img = preprocess_image(filename)
-    predictions = model.predict(img)[0]  # Get the first result from batch
 
-    # Get top 4 predictions
-    top_indices = np.argsort(predictions)[::-1][:4]  # Get top 4 predictions
-    # top_indices = np.argsort(predictions)[-4:][::-1]  # Sort and get top 4 indices
-    top_classes = [CLASSES[i] for i in top_indices]
-    top_probs = [float(f"{predictions[i] * 100:.2f}") for i in top_indices]
-    return top_classes, top_probs
+def predict_many(images, k=4):
+    """Predict the top ``k`` classes for many images in one forward pass."""
+    return [top_k(row, k=k) for row in predict_many_proba(images)]
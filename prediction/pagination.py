@@ -0,0 +1,62 @@
+import base64
+from datetime import datetime
+
+from .models import Prediction
+from django.db.models import Q
+
+
+# Columns the history page reads: thumbnails, full image link and results
+HISTORY_COLUMNS = (
+    "id",
+    "uploaded_at",
+    "image_file",
+    "thumbnail",
+    "label",
+    "probabilities",
+)
+
+
+def encode_cursor(prediction, position):
+    """Opaque token for the page after ``prediction``, the ``position``-th row."""
+    raw = f"{prediction.uploaded_at.isoformat()}|{prediction.id}|{position}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(token):
+    """Return ``(uploaded_at, id, position)``; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token.encode()).decode()
+        uploaded_at, prediction_id, position = raw.split("|")
+        return datetime.fromisoformat(uploaded_at), int(prediction_id), int(position)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor.") from e
+
+
+def history_page(user, cursor=None, page_size=25):
+    """One page of a user's predictions, newest first, seeking past ``cursor``.
+
+    Seeking on ``(uploaded_at, id)`` walks the (submitted_by, uploaded_at,
+    id) index from the cursor instead of counting past an OFFSET, so deep
+    pages cost the same as the first. Returns ``(predictions, offset,
+    next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    predictions = Prediction.objects.filter(submitted_by=user)
+    offset = 0
+    if cursor:
+        uploaded_at, prediction_id, offset = decode_cursor(cursor)
+        # The plain range on uploaded_at is what lets the planner seek the
+        # index; the OR only breaks ties between rows with equal timestamps.
+        predictions = predictions.filter(uploaded_at__lte=uploaded_at).filter(
+            Q(uploaded_at__lt=uploaded_at)
+            | Q(uploaded_at=uploaded_at, id__lt=prediction_id)
+        )
+    page = list(
+        predictions.order_by("-uploaded_at", "-id").only(*HISTORY_COLUMNS)[
+            : page_size + 1
+        ]
+    )
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        next_cursor = encode_cursor(page[-1], offset + page_size)
+    return page, offset, next_cursor
@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+from .backends import INPUT_SHAPE
+from PIL import Image
+
+
+def load_image(image):
+    """Return a decoded PIL image from a path or an already decoded image."""
+    if isinstance(image, str | os.PathLike):
+        with Image.open(image) as img:
+            img.load()
+            return img
+    return image
+
+
+def resize_image(image, size=INPUT_SHAPE[:2]):
+    """Convert to RGB and resize with nearest-neighbour sampling.
+
+    This is exactly what ``keras.preprocessing.image.load_img(...,
+    target_size=...)`` does, so arrays match the ones the model was served
+    with before.
+    """
+    img = load_image(image)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    width_height = (size[1], size[0])
+    if img.size != width_height:
+        img = img.resize(width_height, Image.NEAREST)
+    return img
+
+
+def to_batch(images, size=INPUT_SHAPE[:2]):
+    """Build a contiguous float32 (N, H, W, 3) model input from ``images``.
+
+    Each image (a path or PIL image) is resized once into a shared uint8
+    buffer; normalization then runs over the whole batch at once. The
+    model expects pixels scaled to [0, 1]; EfficientNet's
+    ``preprocess_input`` used previously is an identity function, so
+    dividing by 255 is the complete normalization.
+    """
+    images = list(images)
+    pixels = np.empty((len(images), *size, 3), dtype=np.uint8)
+    for i, image in enumerate(images):
+        pixels[i] = np.asarray(resize_image(image, size), dtype=np.uint8)
+    return normalize(pixels)
+
+
+def normalize(pixels):
+    """Scale a uint8 (N, H, W, 3) batch to the float32 [0, 1] model input."""
+    batch = pixels.astype(np.float32)
+    batch /= 255.0
+    return batch
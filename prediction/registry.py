@@ -0,0 +1,52 @@
+import logging
+import threading
+import time
+
+import numpy as np
+from .backends import INPUT_SHAPE
+
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Load the served model on first use instead of at import time.
+
+    Importing ``prediction`` therefore never pulls in TensorFlow; only the
+    first call to :meth:`infer` (or an explicit :meth:`warm_up`) pays for the
+    runtime import, model deserialization and graph tracing. Loading is
+    guarded by a lock so concurrent first requests share one load.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.load_seconds = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def load(self):
+        """Load the backend's artifact once and return the backend."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    start = time.perf_counter()
+                    self.backend.load()
+                    self.load_seconds = time.perf_counter() - start
+                    self._loaded = True
+                    logger.info(
+                        f"Loaded {self.backend.name} model {self.backend.path} "
+                        f"in {self.load_seconds:.2f}s"
+                    )
+        return self.backend
+
+    def warm_up(self):
+        """Load the model ahead of the first request and run a dummy batch."""
+        self.infer(np.zeros((1, *INPUT_SHAPE), dtype=np.float32))
+
+    def infer(self, batch):
+        """Run one forward pass over a preprocessed (N, 32, 32, 3) batch."""
+        return self.load().infer(batch)
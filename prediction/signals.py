@@ -0,0 +1,43 @@
+from .dashboard import invalidate_dashboard, rollup_key, update_rollups
+from .models import Prediction
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+
+@receiver(pre_save, sender=Prediction)
+def remember_rollup_key(sender, instance, **kwargs):
+    # Edits can move a prediction to another day, user or class.
+    instance._previous = None
+    if not instance._state.adding:
+        instance._previous = (
+            Prediction.objects.filter(pk=instance.pk)
+            .only("uploaded_at", "submitted_by", "label")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Prediction)
+def count_saved_prediction(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous", None)
+    if created:
+        update_rollups(added=[instance])
+    elif previous is not None and rollup_key(previous) != rollup_key(instance):
+        update_rollups(added=[instance], removed=[previous])
+
+
+@receiver(post_delete, sender=Prediction)
+def uncount_deleted_prediction(sender, instance, **kwargs):
+    update_rollups(removed=[instance])
+
+
+@receiver(post_save, sender=User)
+def refresh_user_totals(sender, created, **kwargs):
+    # Logins save the user too; only sign-ups change the dashboard.
+    if created:
+        invalidate_dashboard()
+
+
+@receiver(post_delete, sender=User)
+def refresh_user_totals_on_delete(sender, **kwargs):
+    invalidate_dashboard()
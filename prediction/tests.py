@@ -1 +1,1454 @@
-# Create your tests here.
+import csv
+import importlib
+import importlib.util
+import io
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import ClassVar
+from unittest import mock
+
+import numpy as np
+from . import utils
+from .backends import KerasBackend, TFLiteBackend
+from .batch import classify_batch, collect_sources
+from .batching import MicroBatcher
+from .cache import PredictionCache, delete_old_cache_entries, image_cache_key
+from .dashboard import (
+    DASHBOARD_CACHE_ALIAS,
+    DASHBOARD_CACHE_KEY,
+    get_dashboard_context,
+)
+from .exports import binary_streams, delete_old_exports, run_export
+from .fetcher import FetchedImage, FetchError, fetch_image, fetch_many
+from .jobs import process_pending_jobs, requeue_stale_jobs, run_job
+from .labels import top_k
+from .management.commands.classify_bulk import Command as ClassifyBulkCommand
+from .management.commands.classify_bulk import DatabaseOutput
+from .metrics import BUCKETS, Histogram, StageTimings, render_prometheus
+from .models import (
+    CachedPrediction,
+    DailyPredictionCount,
+    PdfExport,
+    Prediction,
+    PredictionJob,
+    pack_probabilities,
+    unpack_probabilities,
+)
+from .pagination import decode_cursor, encode_cursor, history_page
+from .preprocessing import to_batch
+from .thumbnails import render_thumbnail
+from .utils import (
+    UploadedImage,
+    build_prediction,
+    compress_image,
+    get_image_from_request,
+    predict_cached,
+    process_and_save_prediction,
+    save_uploaded_image,
+    save_uploaded_image_later,
+)
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Sum
+from django.test import (
+    Client,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from reportlab import rl_config
+
+from account.ratelimit import CounterCache
+
+
+HAS_TENSORFLOW = importlib.util.find_spec("tensorflow") is not None
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def legacy_preprocess_image(filename):
+    """The Keras-helper preprocessing the model was originally served with."""
+    from tensorflow.keras.applications.efficientnet import (  # noqa: PLC0415
+        preprocess_input,
+    )
+    from tensorflow.keras.preprocessing.image import (  # noqa: PLC0415
+        img_to_array,
+        load_img,
+    )
+
+    img = load_img(filename, target_size=(32, 32))
+    img = img_to_array(img) / 255.0
+    img = preprocess_input(img)
+    return np.expand_dims(img, axis=0)
+
+
+@unittest.skipUnless(HAS_TENSORFLOW, "TensorFlow is not installed")
+class PreprocessingParityTests(SimpleTestCase):
+    """to_batch must produce exactly what the Keras helpers produced."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        pixels = rng.integers(0, 256, (97, 131, 4), dtype=np.uint8)
+        images = {
+            "rgb.jpg": Image.fromarray(pixels[..., :3]),
+            "rgba.png": Image.fromarray(pixels, mode="RGBA"),
+            "gray.png": Image.fromarray(pixels[..., 0]),
+            "palette.png": Image.fromarray(pixels[..., :3]).convert("P"),
+            "exact.png": Image.fromarray(pixels[:32, :32, :3]),
+        }
+        cls.paths = []
+        for name, img in images.items():
+            path = os.path.join(cls.tmpdir.name, name)
+            img.save(path)
+            cls.paths.append(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def test_matches_keras_helpers_for_paths(self):
+        expected = np.concatenate([legacy_preprocess_image(p) for p in self.paths])
+        np.testing.assert_array_equal(to_batch(self.paths), expected)
+
+    def test_matches_keras_helpers_for_decoded_images(self):
+        images = [Image.open(p) for p in self.paths]
+        expected = np.concatenate([legacy_preprocess_image(p) for p in self.paths])
+        np.testing.assert_array_equal(to_batch(images), expected)
+
+    def test_batch_layout(self):
+        batch = to_batch(self.paths)
+        self.assertEqual(batch.shape, (len(self.paths), 32, 32, 3))
+        self.assertEqual(batch.dtype, np.float32)
+        self.assertTrue(batch.flags.c_contiguous)
+
+
+def save_tiny_model(path):
+    """Save a small, randomly initialised CIFAR-10 shaped CNN to ``path``."""
+    import tensorflow as tf  # noqa: PLC0415
+
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(32, 32, 3)),
+        tf.keras.layers.Conv2D(8, (3, 3), activation="relu", padding="same"),
+        tf.keras.layers.BatchNormalization(),
+        tf.keras.layers.MaxPooling2D((4, 4)),
+        tf.keras.layers.Flatten(),
+        tf.keras.layers.Dense(10, activation="softmax"),
+    ])
+    model.save(path)
+    return path
+
+
+@unittest.skipUnless(HAS_TENSORFLOW, "TensorFlow is not installed")
+class BackendParityTests(SimpleTestCase):
+    """The TFLite export must rank and score images like the Keras model."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from .export import export_tflite  # noqa: PLC0415
+
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        keras_path = save_tiny_model(os.path.join(cls.tmpdir.name, "model.keras"))
+        tflite_path = export_tflite(
+            keras_path, os.path.join(cls.tmpdir.name, "model.tflite")
+        )
+        cls.keras = KerasBackend(keras_path)
+        cls.keras.load()
+        cls.tflite = TFLiteBackend(tflite_path)
+        cls.tflite.load()
+        cls.batch = np.random.default_rng(0).random((8, 32, 32, 3), dtype=np.float32)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def test_top4_classes_and_probabilities_match(self):
+        keras_out = self.keras.infer(self.batch)
+        tflite_out = self.tflite.infer(self.batch)
+        for keras_row, tflite_row in zip(keras_out, tflite_out, strict=True):
+            keras_classes, keras_probs = top_k(keras_row, k=4)
+            tflite_classes, tflite_probs = top_k(tflite_row, k=4)
+            self.assertEqual(keras_classes, tflite_classes)
+            np.testing.assert_allclose(keras_probs, tflite_probs, atol=0.05)
+
+    def test_batch_size_changes_are_handled(self):
+        single = self.tflite.infer(self.batch[:1])
+        full = self.tflite.infer(self.batch)
+        np.testing.assert_allclose(single[0], full[0], atol=1e-5)
+
+
+def png_bytes(size=(40, 30)):
+    output = io.BytesIO()
+    Image.new("RGB", size, "red").save(output, format="PNG")
+    return output.getvalue()
+
+
+class ImageServerHandler(BaseHTTPRequestHandler):
+    """Serves canned responses for the fetcher tests."""
+
+    protocol_version = "HTTP/1.1"
+    routes: ClassVar[dict] = {}
+    client_ports: ClassVar[set] = set()
+
+    def do_GET(self):  # noqa: N802
+        self.client_ports.add(self.client_address[1])
+        status, content_type, body, send_length = self.routes.get(
+            self.path, (404, "text/plain", b"missing", True)
+        )
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if send_length:
+            self.send_header("Content-Length", str(len(body)))
+        else:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FetcherTests(SimpleTestCase):
+    """Link downloads against a local stand-in HTTP server."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        ImageServerHandler.routes = {
+            "/cat.png": (200, "image/png", png_bytes(), True),
+            "/page.html": (200, "text/html; charset=utf-8", b"<html></html>", True),
+            "/fake.png": (200, "image/png", b"not really a png", True),
+            "/big.jpg": (200, "image/jpeg", b"x" * 2048, True),
+            "/big-stream.jpg": (200, "image/jpeg", b"x" * 2048, False),
+        }
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), ImageServerHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def url(self, path):
+        return self.base_url + path
+
+    def test_fetches_image(self):
+        fetched = fetch_image(self.url("/cat.png"), max_bytes=1024 * 1024)
+        self.assertEqual(fetched.extension, "png")
+        self.assertEqual(fetched.content, png_bytes())
+
+    def test_rejects_non_image_content_type(self):
+        with self.assertRaisesMessage(FetchError, "JPG or PNG"):
+            fetch_image(self.url("/page.html"), max_bytes=1024)
+
+    def test_rejects_declared_oversized_body(self):
+        with self.assertRaisesMessage(FetchError, "exceeds"):
+            fetch_image(self.url("/big.jpg"), max_bytes=1024)
+
+    def test_cuts_off_streamed_oversized_body(self):
+        with self.assertRaisesMessage(FetchError, "exceeds"):
+            fetch_image(self.url("/big-stream.jpg"), max_bytes=1024)
+
+    def test_http_errors_and_schemes(self):
+        with self.assertRaisesMessage(FetchError, "Error fetching image"):
+            fetch_image(self.url("/missing.png"), max_bytes=1024)
+        with self.assertRaisesMessage(FetchError, "HTTP or HTTPS"):
+            fetch_image("file:///etc/passwd", max_bytes=1024)
+
+    def test_connections_are_reused(self):
+        ImageServerHandler.client_ports.clear()
+        for _ in range(3):
+            fetch_image(self.url("/cat.png"), max_bytes=1024 * 1024)
+        self.assertEqual(len(ImageServerHandler.client_ports), 1)
+
+    def test_fetch_many_keeps_order(self):
+        paths = ["/cat.png", "/page.html", "/cat.png", "/missing.png"]
+        results = fetch_many([self.url(p) for p in paths], max_bytes=1024 * 1024)
+        self.assertEqual(
+            [error is None for _, error in results], [True, False, True, False]
+        )
+        self.assertEqual(results[2][0].content, png_bytes())
+
+    def test_link_upload_is_decoded_and_compressed(self):
+        def submit(path):
+            request = RequestFactory().post("/", {"link": self.url(path)})
+            return get_image_from_request(request, {"unique_filename": "user_1_abc"})
+
+        upload, error = submit("/cat.png")
+        self.assertIsNone(error)
+        self.assertEqual(upload.name, "user_1_abc.png")
+        self.assertEqual(upload.image.size, (40, 30))
+
+        upload, error = submit("/fake.png")
+        self.assertIsNone(upload)
+        self.assertEqual(error, "The link does not point to a valid image.")
+
+
+class MicroBatcherTests(SimpleTestCase):
+    """Batch assembly and failure handling of the inference micro-batcher."""
+
+    def make_batcher(self, infer, **options):
+        batcher = MicroBatcher(infer, **options)
+        self.addCleanup(batcher.close, 1)
+        return batcher
+
+    @staticmethod
+    def image(value):
+        return np.full((1, 2), value, dtype=np.float32)
+
+    def test_full_batches_run_in_one_pass(self):
+        batches = []
+
+        def infer(batch):
+            batches.append(len(batch))
+            return batch * 2
+
+        batcher = self.make_batcher(infer, max_batch_size=3, max_wait_ms=10_000)
+        futures = [batcher.submit(self.image(i)) for i in range(3)]
+        rows = [future.result(timeout=5) for future in futures]
+        self.assertEqual(batches, [3])
+        np.testing.assert_array_equal(rows, [[0, 0], [2, 2], [4, 4]])
+        self.assertEqual(batcher.stats()["batch_sizes"], {3: 1})
+
+    def test_partial_batch_runs_after_max_wait(self):
+        batcher = self.make_batcher(lambda batch: batch, max_wait_ms=20)
+        row = batcher.predict(self.image(7), timeout=5)
+        np.testing.assert_array_equal(row, [7, 7])
+        self.assertEqual(batcher.stats()["batch_sizes"], {1: 1})
+
+    def test_inference_errors_reach_every_waiter(self):
+        def infer(batch):
+            raise RuntimeError("model exploded")
+
+        batcher = self.make_batcher(infer, max_batch_size=2, max_wait_ms=10_000)
+        futures = [batcher.submit(self.image(i)) for i in range(2)]
+        for future in futures:
+            with self.assertRaisesMessage(RuntimeError, "model exploded"):
+                future.result(timeout=5)
+
+    def test_short_results_fail_waiters_instead_of_hanging(self):
+        batcher = self.make_batcher(
+            lambda batch: batch[:1], max_batch_size=2, max_wait_ms=500
+        )
+        futures = [batcher.submit(self.image(i)) for i in range(2)]
+        for future in futures:
+            with self.assertRaisesMessage(ValueError, "Expected 2 results"):
+                future.result(timeout=5)
+        # The worker survives and keeps serving.
+        np.testing.assert_array_equal(
+            batcher.submit(self.image(3)).result(timeout=5), [3, 3]
+        )
+
+    def test_predict_times_out(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def infer(batch):
+            release.wait(5)
+            return batch
+
+        batcher = self.make_batcher(infer, max_wait_ms=0)
+        with self.assertRaises(TimeoutError):
+            batcher.predict(self.image(1), timeout=0.05)
+
+
+class MetricsTests(SimpleTestCase):
+    """Stage histograms and their Prometheus rendering."""
+
+    def test_quantile_interpolates_inside_buckets(self):
+        histogram = Histogram(buckets=(1, 2, 4))
+        self.assertEqual(histogram.quantile(0.5), 0.0)
+        for seconds in (0.5, 0.5, 1.5, 2):
+            histogram.observe(seconds)
+        # Bounds are inclusive, as with Prometheus' le.
+        self.assertEqual(histogram.snapshot(), ([2, 2, 0, 0], 4.5))
+        self.assertEqual(histogram.quantile(0.25), 0.5)
+        self.assertEqual(histogram.quantile(0.5), 1.0)
+        self.assertEqual(histogram.quantile(0.75), 1.5)
+        self.assertEqual(histogram.quantile(1), 2.0)
+
+    def test_quantile_above_the_top_bucket_is_the_top_bound(self):
+        histogram = Histogram(buckets=(1, 2, 4))
+        histogram.observe(3)
+        histogram.observe(10)
+        self.assertEqual(histogram.quantile(0.99), 4)
+        self.assertEqual(
+            histogram.summary(),
+            {"count": 2, "mean": 6.5, "p50": 4.0, "p95": 4, "p99": 4},
+        )
+
+    def test_render_prometheus(self):
+        stage_timings = StageTimings()
+        stage_timings.observe("inference", 0.0003)
+        stage_timings.observe("inference", 60)
+        with mock.patch("prediction.metrics.timings", stage_timings):
+            text = render_prometheus(
+                cache_stats={
+                    "hits": 3,
+                    "persistent_hits": 1,
+                    "misses": 2,
+                    "entries": 4,
+                },
+                batcher_stats={"requests": 5, "batches": 2, "queue_depth": 0},
+            )
+        lines = text.splitlines()
+        self.assertTrue(text.endswith("\n"))
+        self.assertEqual(lines[1], "# TYPE prediction_stage_seconds histogram")
+        for line in (
+            'prediction_stage_seconds_bucket{stage="inference",le="0.00025"} 0',
+            'prediction_stage_seconds_bucket{stage="inference",le="0.000375"} 1',
+            'prediction_stage_seconds_bucket{stage="inference",le="+Inf"} 2',
+            'prediction_stage_seconds_sum{stage="inference"} 60.0003',
+            'prediction_stage_seconds_count{stage="inference"} 2',
+            'prediction_cache_lookups_total{result="persistent_hits"} 1',
+            "prediction_cache_entries 4",
+            "prediction_batcher_requests_total 5",
+            "prediction_batcher_queue_depth 0",
+        ):
+            self.assertIn(line, lines)
+        # Buckets are cumulative: the last finite one still excludes 60 s.
+        self.assertIn(
+            f'prediction_stage_seconds_bucket{{stage="inference",le="{BUCKETS[-1]}"}} 1',
+            lines,
+        )
+
+    def test_render_prometheus_without_data(self):
+        with mock.patch("prediction.metrics.timings", StageTimings()):
+            self.assertEqual(
+                render_prometheus(),
+                "# HELP prediction_stage_seconds Time spent in each prediction stage.\n"
+                "# TYPE prediction_stage_seconds histogram\n",
+            )
+
+
+class PredictionJobViewTests(TestCase):
+    """The waiting page and status endpoint of queued predictions."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner")
+        cls.other = User.objects.create_user("other")
+
+    def setUp(self):
+        self.client = Client(SERVER_NAME="localhost")
+        self.client.force_login(self.user)
+
+    def make_job(self, status=PredictionJob.Status.PENDING, **fields):
+        return PredictionJob.objects.create(
+            submitted_by=self.user, image_name="images/cat.png", status=status, **fields
+        )
+
+    def test_pending_job_shows_waiting_page(self):
+        job = self.make_job()
+        response = self.client.get(reverse("prediction_job", args=[job.id]))
+        self.assertTemplateUsed(response, "predictionform/job_status.html")
+
+    def test_done_job_shows_result(self):
+        prediction = Prediction(submitted_by=self.user, image_file="images/cat.png")
+        prediction.set_probabilities(np.eye(10)[3])
+        prediction.save()
+        job = self.make_job(PredictionJob.Status.DONE, prediction=prediction)
+        response = self.client.get(reverse("prediction_job", args=[job.id]))
+        self.assertTemplateUsed(response, "predictionform/success.html")
+        self.assertContains(response, "cat")
+
+    def test_done_job_with_deleted_prediction_redirects_to_history(self):
+        prediction = Prediction.objects.create(submitted_by=self.user)
+        job = self.make_job(PredictionJob.Status.DONE, prediction=prediction)
+        prediction.delete()
+        response = self.client.get(reverse("prediction_job", args=[job.id]))
+        self.assertRedirects(
+            response, reverse("prediction_history"), fetch_redirect_response=False
+        )
+
+    def test_failed_job_shows_error(self):
+        job = self.make_job(PredictionJob.Status.FAILED, error="Bad image.")
+        response = self.client.get(reverse("prediction_job", args=[job.id]))
+        self.assertTemplateUsed(response, "predictionform/form.html")
+        self.assertContains(response, "Bad image.")
+
+    def test_status_endpoint(self):
+        job = self.make_job(PredictionJob.Status.RUNNING)
+        response = self.client.get(reverse("prediction_job_status", args=[job.id]))
+        self.assertEqual(
+            response.json(),
+            {"id": job.id, "status": "running", "error": "", "prediction_id": None},
+        )
+
+    def test_jobs_of_other_users_are_hidden(self):
+        job = self.make_job()
+        self.client.force_login(self.other)
+        for name in ("prediction_job", "prediction_job_status"):
+            response = self.client.get(reverse(name, args=[job.id]))
+            self.assertEqual(response.status_code, 404)
+
+
+class PredictionCacheTests(TestCase):
+    """The two-tier prediction cache and its model-version key."""
+
+    def setUp(self):
+        self.image = Image.new("RGB", (8, 8), "red")
+        self.row = np.linspace(0, 1, 10, dtype=np.float32)
+
+    def test_key_depends_on_pixels_and_model_version(self):
+        key = image_cache_key(self.image, "keras:abc")
+        self.assertEqual(key, image_cache_key(self.image.convert("RGBA"), "keras:abc"))
+        self.assertNotEqual(key, image_cache_key(self.image, "tflite:abc"))
+        self.assertNotEqual(
+            key, image_cache_key(Image.new("RGB", (8, 8), "blue"), "keras:abc")
+        )
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = PredictionCache(max_entries=2, persistent=False)
+        cache.set("a", self.row)
+        cache.set("b", self.row)
+        cache.get("a")
+        cache.set("c", self.row)
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(
+            {k: cache.stats()[k] for k in ("entries", "hits", "misses")},
+            {"entries": 2, "hits": 2, "misses": 1},
+        )
+
+    def test_database_tier_survives_a_new_process(self):
+        PredictionCache().set("key", self.row)
+        cache = PredictionCache()
+        np.testing.assert_array_equal(cache.get("key"), self.row)
+        self.assertEqual(cache.stats()["persistent_hits"], 1)
+        # Promoted into the LRU: the next hit does not touch the database.
+        with self.assertNumQueries(0):
+            cache.get("key")
+
+    def test_expired_database_entries_are_ignored_and_renewed(self):
+        PredictionCache().set("key", self.row)
+        CachedPrediction.objects.update(created_at=timezone.now() - timedelta(days=31))
+        cache = PredictionCache(max_age=timedelta(days=30))
+        self.assertIsNone(cache.get("key"))
+        cache.set("key", self.row)
+        self.assertIsNotNone(PredictionCache(max_age=timedelta(days=30)).get("key"))
+
+    def test_cleanup_deletes_old_entries_and_caps_the_table(self):
+        now = timezone.now()
+        for i in range(5):
+            CachedPrediction.objects.create(
+                key=f"k{i}", probabilities=b"", created_at=now - timedelta(days=i)
+            )
+        CachedPrediction.objects.create(
+            key="old", probabilities=b"", created_at=now - timedelta(days=60)
+        )
+        self.assertEqual(delete_old_cache_entries(timedelta(days=30), 3), 3)
+        self.assertEqual(
+            sorted(CachedPrediction.objects.values_list("key", flat=True)),
+            ["k0", "k1", "k2"],
+        )
+        call_command(
+            "cleanup_prediction_cache", days=30, max_rows=1, stdout=io.StringIO()
+        )
+        self.assertEqual(
+            list(CachedPrediction.objects.values_list("key", flat=True)), ["k0"]
+        )
+
+    def test_predict_cached_runs_inference_once_per_model_version(self):
+        cache = PredictionCache()
+        with (
+            mock.patch("prediction.utils.get_prediction_cache", return_value=cache),
+            mock.patch(
+                "prediction.utils.predict_proba", return_value=self.row
+            ) as infer,
+            mock.patch("prediction.utils.model_version", return_value="keras:v1"),
+        ):
+            predict_cached(self.image)
+            predict_cached(self.image)
+            self.assertEqual(infer.call_count, 1)
+            with mock.patch("prediction.utils.model_version", return_value="keras:v2"):
+                predict_cached(self.image)
+            self.assertEqual(infer.call_count, 2)
+
+
+class ProbabilityPackingTests(SimpleTestCase):
+    """The packed float32 probability vector stored on each prediction."""
+
+    def test_round_trip_is_little_endian_float32(self):
+        row = np.linspace(0, 1, 10)
+        data = pack_probabilities(row)
+        self.assertEqual(len(data), 40)
+        self.assertEqual(data[4:8], struct.pack("<f", row[1]))
+        np.testing.assert_array_equal(
+            unpack_probabilities(data), row.astype(np.float32)
+        )
+
+    def test_set_probabilities_updates_label_and_top_results(self):
+        prediction = Prediction()
+        self.assertEqual(prediction.top_results, ([], []))
+        self.assertIsNone(prediction.class_1)
+        prediction.set_probabilities([0.05, 0.1, 0.0, 0.6, 0.0, 0.2, 0, 0, 0, 0.05])
+        self.assertEqual(prediction.label, 3)
+        self.assertEqual(
+            prediction.top_results,
+            (["cat", "dog", "automobile", "truck"], [60.0, 20.0, 10.0, 5.0]),
+        )
+        self.assertEqual((prediction.class_1, prediction.prob_1), ("cat", 60.0))
+        # A new vector replaces the cached ranking.
+        prediction.set_probabilities(np.eye(10)[9])
+        self.assertEqual(prediction.class_1, "truck")
+
+
+class PackResultsMigrationTests(TransactionTestCase):
+    """0009 moves the top-4 columns into the packed vector and back."""
+
+    before = ("prediction", "0008_prediction_label_probabilities")
+    after = ("prediction", "0009_pack_prediction_results")
+    migration = importlib.import_module(
+        "prediction.migrations.0009_pack_prediction_results"
+    )
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.addCleanup(self.migrate, self.executor.loader.graph.leaf_nodes())
+        self.migrate([self.before])
+
+    def migrate(self, targets):
+        self.executor.loader.build_graph()
+        self.executor.migrate(targets)
+        return self.executor.loader.project_state(targets).apps
+
+    def test_to_vector_spreads_the_remainder_over_unranked_classes(self):
+        row = SimpleNamespace(
+            class_1="cat",
+            prob_1=70.0,
+            class_2="dog",
+            prob_2=20.0,
+            class_3="bird",
+            prob_3=4.0,
+            class_4="frog",
+            prob_4=None,
+        )
+        vector = self.migration.to_vector(row)
+        self.assertAlmostEqual(vector[3], 0.7)
+        self.assertAlmostEqual(vector[5], 0.2)
+        self.assertAlmostEqual(vector[2], 0.04)
+        self.assertEqual(vector[6], 0)
+        for i in (0, 1, 4, 7, 8, 9):
+            self.assertAlmostEqual(vector[i], 0.01)
+
+    def test_pack_and_unpack_results(self):
+        apps = self.executor.loader.project_state([self.before]).apps
+        old_model = apps.get_model("prediction", "Prediction")
+        ranked = old_model.objects.create(
+            class_1="ship",
+            prob_1=80.0,
+            class_2="airplane",
+            prob_2=15.0,
+            class_3="truck",
+            prob_3=3.0,
+            class_4="bird",
+            prob_4=1.0,
+        )
+        empty = old_model.objects.create()
+
+        apps = self.migrate([self.after])
+        new_model = apps.get_model("prediction", "Prediction")
+        packed = new_model.objects.get(pk=ranked.pk)
+        self.assertEqual(packed.label, 8)
+        vector = unpack_probabilities(bytes(packed.probabilities))
+        self.assertAlmostEqual(float(vector[8]), 0.8, places=6)
+        self.assertAlmostEqual(float(vector[0]), 0.15, places=6)
+        self.assertAlmostEqual(float(vector[4]), 0.01 / 6, places=6)
+        self.assertIsNone(new_model.objects.get(pk=empty.pk).probabilities)
+
+        apps = self.migrate([self.before])
+        unpacked = apps.get_model("prediction", "Prediction").objects.get(pk=ranked.pk)
+        self.assertEqual(
+            [(unpacked.class_1, unpacked.prob_1), (unpacked.class_4, unpacked.prob_4)],
+            [("ship", 80.0), ("bird", 1.0)],
+        )
+
+
+class TemporaryMediaMixin:
+    """Point default_storage at a throwaway MEDIA_ROOT for each test."""
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    @staticmethod
+    def make_upload(name="user_1_abc.png"):
+        img, content = compress_image(ContentFile(png_bytes(), name=name))
+        return UploadedImage(name, img, content)
+
+
+class DeferredStorageTests(TemporaryMediaMixin, TransactionTestCase):
+    """Uploads written after responding, when PREDICTION_DEFER_STORAGE is set."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("deferred")
+        patcher = mock.patch(
+            "prediction.utils.predict_cached", return_value=np.eye(10)[1]
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.finished = threading.Event()
+        save_and_relink = utils._save_and_relink
+
+        def tracked(*args):
+            try:
+                save_and_relink(*args)
+            finally:
+                self.finished.set()
+
+        patcher = mock.patch("prediction.utils._save_and_relink", side_effect=tracked)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(PREDICTION_DEFER_STORAGE=True)
+    def test_write_happens_after_the_row_is_saved(self):
+        upload = self.make_upload()
+        release = threading.Event()
+
+        def slow_save(upload):
+            release.wait(5)
+            save_uploaded_image(upload)
+
+        with mock.patch("prediction.utils.save_uploaded_image", side_effect=slow_save):
+            prediction, _ = process_and_save_prediction(upload, self.user)
+            self.assertTrue(Prediction.objects.filter(id=prediction.id).exists())
+            self.assertFalse(default_storage.exists(upload.storage_path))
+            release.set()
+            self.assertTrue(self.finished.wait(5))
+        prediction.refresh_from_db()
+        self.assertTrue(default_storage.exists(prediction.image_file.name))
+        self.assertTrue(default_storage.exists(prediction.thumbnail.name))
+
+    @override_settings(PREDICTION_DEFER_STORAGE=True)
+    def test_row_follows_names_chosen_by_storage(self):
+        upload = self.make_upload()
+        default_storage.save(upload.storage_path, ContentFile(b"someone else's"))
+        prediction, _ = process_and_save_prediction(upload, self.user)
+        self.assertTrue(self.finished.wait(5))
+        prediction.refresh_from_db()
+        self.assertNotEqual(prediction.image_file.name, "images/user_1_abc.png")
+        self.assertEqual(prediction.image_file.name, upload.storage_path)
+        with default_storage.open(prediction.image_file.name) as f:
+            self.assertEqual(Image.open(f).size, (40, 30))
+
+    def test_write_errors_are_logged(self):
+        def broken_save(upload):
+            raise OSError("disk full")
+
+        with (
+            mock.patch("prediction.utils.save_uploaded_image", side_effect=broken_save),
+            self.assertLogs("prediction.utils", "ERROR") as logs,
+        ):
+            save_uploaded_image_later(self.make_upload(), Prediction(id=1))
+            self.assertTrue(self.finished.wait(5))
+            # The done callback runs right after the task; give it a moment.
+            for _ in range(50):
+                if logs.records:
+                    break
+                time.sleep(0.01)
+        self.assertIn("disk full", logs.output[0])
+
+
+def zip_bytes(members):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return output.getvalue()
+
+
+@override_settings(PREDICTION_ASYNC_JOBS=True, PREDICTION_JOB_WORKERS=0)
+class LinkJobTests(TemporaryMediaMixin, TestCase):
+    """Queued image links are downloaded by the worker, not the request."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("linker")
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client(SERVER_NAME="localhost")
+        self.client.force_login(self.user)
+        patcher = mock.patch(
+            "prediction.utils.predict_cached", return_value=np.eye(10)[5]
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def queue_link(self):
+        with mock.patch("prediction.utils.fetch_image") as fetch:
+            response = self.client.post(
+                reverse("addpredict"), {"link": "https://example.com/dog.png"}
+            )
+        fetch.assert_not_called()
+        job = PredictionJob.objects.get(submitted_by=self.user)
+        self.assertRedirects(
+            response,
+            reverse("prediction_job", args=[job.id]),
+            fetch_redirect_response=False,
+        )
+        return job
+
+    def test_worker_fetches_and_stores_the_link(self):
+        job = self.queue_link()
+        self.assertEqual(job.source_url, "https://example.com/dog.png")
+        fetched = FetchedImage(job.source_url, png_bytes(), "image/png")
+        with mock.patch("prediction.utils.fetch_image", return_value=fetched):
+            job = run_job(job)
+        self.assertEqual(job.status, PredictionJob.Status.DONE)
+        self.assertEqual(job.prediction.class_1, "dog")
+        self.assertEqual(job.prediction.image_file.name, f"images/{job.image_name}")
+        self.assertTrue(job.image_name.endswith(".png"))
+        self.assertTrue(default_storage.exists(job.prediction.image_file.name))
+
+    def test_failed_download_fails_the_job(self):
+        job = self.queue_link()
+        with mock.patch(
+            "prediction.utils.fetch_image", side_effect=FetchError("Link timed out.")
+        ):
+            job = run_job(job)
+        self.assertEqual(job.status, PredictionJob.Status.FAILED)
+        self.assertEqual(job.error, "Link timed out.")
+        self.assertFalse(Prediction.objects.exists())
+
+
+class CollectSourcesTests(SimpleTestCase):
+    """Listing the images of a batch submission."""
+
+    def test_files_archive_members_and_links(self):
+        archive = SimpleUploadedFile(
+            "photos.zip",
+            zip_bytes({
+                "a.png": png_bytes(),
+                "nested/b.png": png_bytes(),
+                "nested/": b"",
+                "__MACOSX/.c.png": b"",
+            }),
+        )
+        upload = SimpleUploadedFile("single.png", png_bytes())
+        sources = collect_sources(
+            [upload], [archive], limit=10, links=["http://example.com/d.png"]
+        )
+        self.assertEqual(
+            [source.name for source in sources],
+            ["single.png", "a.png", "nested/b.png", "http://example.com/d.png"],
+        )
+        self.assertEqual(sources[2].read(), png_bytes())
+        self.assertIsNone(sources[3].read)
+
+    def test_rejects_bad_archives_empty_and_oversized_batches(self):
+        with self.assertRaisesMessage(ValueError, "not a valid ZIP"):
+            collect_sources([], [SimpleUploadedFile("x.zip", b"nope")], limit=10)
+        with self.assertRaisesMessage(ValueError, "No images provided."):
+            collect_sources([], [], limit=10)
+        files = [SimpleUploadedFile(f"{i}.png", png_bytes()) for i in range(3)]
+        with self.assertRaisesMessage(ValueError, "at most 2 images"):
+            collect_sources(files, [], limit=2)
+
+
+class BatchPredictTests(TemporaryMediaMixin, TestCase):
+    """ZIP intake through the batch endpoint, with inference stubbed out."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("batcher")
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client(SERVER_NAME="localhost")
+        self.client.force_login(self.user)
+
+    def post(self, data):
+        def infer(images):
+            return [np.eye(10, dtype=np.float32)[3] for _ in images]
+
+        with mock.patch("prediction.batch.predict_many_cached", side_effect=infer):
+            response = self.client.post(reverse("batch_predict"), data)
+            if not response.streaming:
+                return response, []
+            events = b"".join(response.streaming_content).decode().splitlines()
+        return response, [json.loads(event) for event in events]
+
+    def test_zip_upload_is_classified_and_stored(self):
+        archive = SimpleUploadedFile(
+            "photos.zip",
+            zip_bytes({"a.png": png_bytes(), "b.png": png_bytes(), "notes.txt": b"hi"}),
+        )
+        response, events = self.post({"archive": archive})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        summary = events[-1]
+        self.assertEqual(summary["type"], "summary")
+        self.assertEqual((summary["total"], summary["created"]), (3, 2))
+        self.assertEqual(summary["failed"][0]["name"], "notes.txt")
+        self.assertEqual(summary["top_classes"], {"cat": 2})
+        predictions = Prediction.objects.filter(submitted_by=self.user)
+        self.assertEqual(predictions.count(), 2)
+        for prediction in predictions:
+            self.assertTrue(default_storage.exists(prediction.image_file.name))
+
+    def test_invalid_archive_is_rejected(self):
+        response, _ = self.post({"archive": SimpleUploadedFile("x.zip", b"nope")})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["type"], "error")
+
+    @override_settings(PREDICTION_RATE_LIMIT="3/h")
+    def test_each_image_counts_against_the_upload_rate(self):
+        def files():
+            return {
+                "files": [
+                    SimpleUploadedFile(f"{i}.png", png_bytes(), "image/png")
+                    for i in range(2)
+                ]
+            }
+
+        response, _ = self.post(files())
+        self.assertEqual(response.status_code, 200)
+        response, _ = self.post(files())
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(Prediction.objects.filter(submitted_by=self.user).count(), 2)
+
+    @override_settings(PREDICTION_RATE_LIMIT="10/h")
+    def test_batch_is_charged_in_one_increment(self):
+        archive = SimpleUploadedFile(
+            "photos.zip", zip_bytes({f"{i}.png": png_bytes() for i in range(3)})
+        )
+        with mock.patch.object(
+            CounterCache, "incr", autospec=True, side_effect=CounterCache.incr
+        ) as incr:
+            response, _ = self.post({"archive": archive})
+        self.assertEqual(response.status_code, 200)
+        incr.assert_called_once()
+        self.assertEqual(incr.call_args.args[2], 3)
+
+    @override_settings(PREDICTION_RATE_LIMIT="1/h")
+    def test_exhausted_budget_is_checked_before_reading_archives(self):
+        upload = SimpleUploadedFile("a.png", png_bytes(), "image/png")
+        response, _ = self.post({"files": [upload]})
+        self.assertEqual(response.status_code, 200)
+        archive = SimpleUploadedFile("photos.zip", zip_bytes({"b.png": png_bytes()}))
+        with mock.patch("prediction.views.collect_sources") as collect:
+            response, _ = self.post({"archive": archive})
+        self.assertEqual(response.status_code, 429)
+        collect.assert_not_called()
+
+
+class PdfExportTests(TemporaryMediaMixin, TestCase):
+    """Background exports are private, owner-only and cleaned up."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("exporter")
+        cls.other = User.objects.create_user("snooper")
+        prediction = Prediction(submitted_by=cls.user)
+        prediction.set_probabilities(np.eye(10)[0])
+        prediction.save()
+
+    def setUp(self):
+        super().setUp()
+        exports = tempfile.TemporaryDirectory()
+        self.addCleanup(exports.cleanup)
+        self.storage = FileSystemStorage(location=exports.name)
+        storage_patch = mock.patch.object(
+            PdfExport._meta.get_field("file"), "storage", self.storage
+        )
+        storage_patch.start()
+        self.addCleanup(storage_patch.stop)
+        self.client = Client(SERVER_NAME="localhost")
+
+    @override_settings(PREDICTION_EXPORT_RATE_LIMIT="1/h")
+    def test_exports_are_rate_limited(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("export_pdf")).status_code, 302)
+        self.assertEqual(self.client.get(reverse("export_pdf")).status_code, 429)
+
+    @override_settings(PREDICTION_JOB_WORKERS=0)
+    def test_exports_go_through_the_job_queue(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("export_pdf"))
+        export = PdfExport.objects.get()
+        self.assertRedirects(
+            response,
+            reverse("pdf_export", args=[export.id]),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(export.status, PredictionJob.Status.PENDING)
+        self.assertEqual(process_pending_jobs(), 1)
+        export.refresh_from_db()
+        self.assertEqual(export.status, PredictionJob.Status.DONE)
+        self.assertIsNotNone(export.started_at)
+        self.assertTrue(self.storage.exists(export.file.name))
+
+    def test_stale_exports_are_requeued(self):
+        export = PdfExport.objects.create(
+            submitted_by=self.user,
+            status=PredictionJob.Status.RUNNING,
+            started_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=10)), 1)
+        export.refresh_from_db()
+        self.assertEqual(export.status, PredictionJob.Status.PENDING)
+
+    def test_export_gets_a_random_private_name(self):
+        export = run_export(PdfExport.objects.create(submitted_by=self.user).id)
+        self.assertEqual(export.status, PredictionJob.Status.DONE)
+        self.assertEqual(export.row_count, 1)
+        self.assertRegex(export.file.name, r"^[0-9a-f]{32}\.pdf$")
+        self.assertTrue(self.storage.exists(export.file.name))
+        self.assertEqual(default_storage.listdir("")[0], [])
+
+    def test_only_the_owner_can_download(self):
+        export = run_export(PdfExport.objects.create(submitted_by=self.user).id)
+        url = reverse("pdf_export", args=[export.id]) + "?download=1"
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(self.user)
+        response = self.client.get(url)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+    def test_old_exports_are_deleted_with_their_files(self):
+        old = run_export(PdfExport.objects.create(submitted_by=self.user).id)
+        PdfExport.objects.filter(id=old.id).update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+        recent = run_export(PdfExport.objects.create(submitted_by=self.user).id)
+        self.assertEqual(delete_old_exports(timedelta(days=1)), 1)
+        self.assertFalse(self.storage.exists(old.file.name))
+        self.assertEqual(
+            list(PdfExport.objects.values_list("id", flat=True)), [recent.id]
+        )
+
+    def test_ascii85_setting_is_restored(self):
+        with binary_streams():
+            self.assertEqual(rl_config.useA85, 0)
+        self.assertEqual(rl_config.useA85, 1)
+
+    def test_concurrent_renders_do_not_wait_for_each_other(self):
+        entered = threading.Event()
+        with binary_streams():
+            # A second render starts and finishes while the first is running.
+            def render():
+                with binary_streams():
+                    entered.set()
+
+            thread = threading.Thread(target=render)
+            thread.start()
+            self.assertTrue(entered.wait(5))
+            thread.join()
+            self.assertEqual(rl_config.useA85, 0)
+        self.assertEqual(rl_config.useA85, 1)
+
+
+class ThumbnailTests(TemporaryMediaMixin, TestCase):
+    """Thumbnails are written with the upload, under the names storage picks."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("thumbs")
+
+    def test_render_thumbnail(self):
+        img = Image.new("RGBA", (400, 200))
+        thumbnail = Image.open(render_thumbnail(img))
+        self.assertEqual((thumbnail.format, thumbnail.mode), ("JPEG", "RGB"))
+        self.assertEqual(thumbnail.size, (128, 64))
+        self.assertEqual(img.size, (400, 200))
+
+    def test_upload_and_thumbnail_are_saved_once(self):
+        upload = self.make_upload()
+        save_uploaded_image(upload)
+        self.assertEqual(upload.storage_path, "images/user_1_abc.png")
+        self.assertEqual(upload.thumbnail_path, "thumbnails/user_1_abc.jpg")
+        self.assertIsNone(upload.content)
+        save_uploaded_image(upload)
+        self.assertEqual(default_storage.listdir("images")[1], ["user_1_abc.png"])
+        self.assertEqual(default_storage.listdir("thumbnails")[1], ["user_1_abc.jpg"])
+
+    def test_taken_names_are_not_overwritten(self):
+        default_storage.save("images/user_1_abc.png", ContentFile(b"a"))
+        default_storage.save("thumbnails/user_1_abc.jpg", ContentFile(b"b"))
+        upload = self.make_upload()
+        save_uploaded_image(upload)
+        self.assertNotEqual(upload.storage_path, "images/user_1_abc.png")
+        self.assertEqual(upload.name, os.path.basename(upload.storage_path))
+        self.assertNotEqual(upload.thumbnail_path, "thumbnails/user_1_abc.jpg")
+        prediction = build_prediction(self.user, upload, np.eye(10)[0])
+        self.assertEqual(prediction.image_file.name, upload.storage_path)
+        self.assertEqual(prediction.thumbnail.name, upload.thumbnail_path)
+        self.assertTrue(default_storage.exists(upload.thumbnail_path))
+
+    def test_queued_upload_gets_its_thumbnail_from_the_worker(self):
+        upload = self.make_upload()
+        save_uploaded_image(upload, thumbnail=False)
+        self.assertFalse(default_storage.exists("thumbnails"))
+        stored = UploadedImage.from_storage(upload.name)
+        save_uploaded_image(stored)
+        self.assertEqual(default_storage.listdir("images")[1], [upload.name])
+        self.assertTrue(default_storage.exists(stored.thumbnail_path))
+
+    def test_history_does_not_write_thumbnails(self):
+        upload = self.make_upload()
+        save_uploaded_image(upload, thumbnail=False)
+        Prediction.objects.create(
+            submitted_by=self.user, image_file=upload.storage_path
+        )
+        client = Client(SERVER_NAME="localhost")
+        client.force_login(self.user)
+        response = client.get(reverse("prediction_history"))
+        self.assertContains(response, upload.storage_path)
+        self.assertFalse(default_storage.exists("thumbnails"))
+
+        call_command("backfill_thumbnails", stdout=io.StringIO())
+        prediction = Prediction.objects.get(submitted_by=self.user)
+        self.assertTrue(default_storage.exists(prediction.thumbnail.name))
+
+
+class DashboardTests(TemporaryMediaMixin, TestCase):
+    """Daily rollups kept by signals and bulk paths, and the dashboard on top."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin")
+        cls.user = User.objects.create_user("active")
+
+    def setUp(self):
+        super().setUp()
+        self.cache = caches[DASHBOARD_CACHE_ALIAS]
+        self.cache.delete(DASHBOARD_CACHE_KEY)
+
+    @staticmethod
+    def counts():
+        return dict(
+            DailyPredictionCount.objects.filter(count__gt=0)
+            .values_list("label")
+            .annotate(total=Sum("count"))
+        )
+
+    def make_prediction(self, label, **fields):
+        prediction = Prediction(submitted_by=self.user, **fields)
+        prediction.set_probabilities(np.eye(10)[label])
+        return prediction
+
+    def test_signals_track_saves_edits_and_deletes(self):
+        prediction = self.make_prediction(3)
+        prediction.save()
+        self.assertEqual(self.counts(), {"cat": 1})
+        prediction.set_probabilities(np.eye(10)[5])
+        prediction.save()
+        self.assertEqual(self.counts(), {"dog": 1})
+        prediction.delete()
+        self.assertEqual(self.counts(), {})
+
+    def test_bulk_paths_update_rollups(self):
+        rows = [
+            (name, (self.make_upload(name), ContentFile(b"")), np.eye(10)[0])
+            for name in ("bulk.png", "bulk2.png")
+        ]
+        DatabaseOutput(self.user).write(rows, done=2)
+        self.assertEqual(self.counts(), {"airplane": 2})
+
+        sources = collect_sources(
+            [SimpleUploadedFile("a.png", png_bytes())], [], limit=1
+        )
+        with (
+            tempfile.TemporaryDirectory() as media,
+            override_settings(MEDIA_ROOT=media),
+            mock.patch(
+                "prediction.batch.predict_many_cached",
+                return_value=[np.eye(10)[9]],
+            ),
+        ):
+            list(classify_batch(sources, self.user))
+        self.assertEqual(self.counts(), {"airplane": 2, "truck": 1})
+
+    def test_saves_invalidate_the_cache_for_every_process(self):
+        self.assertEqual(get_dashboard_context()["total_predictions"], 0)
+        # A new connection stands in for another worker process.
+        other_worker = caches.create_connection(DASHBOARD_CACHE_ALIAS)
+        self.assertIsNotNone(other_worker.get(DASHBOARD_CACHE_KEY))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_prediction(3).save()
+        self.assertIsNone(other_worker.get(DASHBOARD_CACHE_KEY))
+        self.assertEqual(get_dashboard_context()["total_predictions"], 1)
+
+    def test_dashboard_renders(self):
+        last = timezone.make_aware(datetime(2026, 3, 4, 5, 6))
+        self.make_prediction(3, uploaded_at=last - timedelta(days=1)).save()
+        self.make_prediction(3, uploaded_at=last).save()
+        client = Client(SERVER_NAME="localhost")
+        client.force_login(self.admin)
+        response = client.get(reverse("dashboard"))
+        self.assertEqual(response.context["total_predictions"], 2)
+        self.assertEqual(response.context["most_predicted_class"], "cat")
+        self.assertEqual(
+            response.context["top_active_users"],
+            [
+                {
+                    "id": self.user.id,
+                    "username": "active",
+                    "prediction_count": 2,
+                    "last_prediction": last,
+                }
+            ],
+        )
+        self.assertContains(response, "Mar 04, 2026 05:06")
+
+
+class ClassifyBulkTests(TemporaryMediaMixin, TransactionTestCase):
+    """The classify_bulk command, its outputs and resuming after interruptions."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("bulk")
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.source = os.path.join(tmp.name, "images")
+        os.mkdir(self.source)
+        for i in range(5):
+            with open(os.path.join(self.source, f"{i}.png"), "wb") as f:
+                f.write(png_bytes())
+        for target, kwargs in (
+            ("model_version", {"return_value": "test:1"}),
+            ("predict_batch", {"side_effect": self.predict}),
+        ):
+            patcher = mock.patch(
+                f"prediction.management.commands.classify_bulk.{target}", **kwargs
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.interrupt_at = None
+        self.batches = 0
+
+    def predict(self, batch):
+        self.batches += 1
+        if self.batches == self.interrupt_at:
+            raise KeyboardInterrupt
+        return np.tile(np.eye(10)[3], (len(batch), 1))
+
+    def classify(self, **options):
+        out = io.StringIO()
+        call_command(
+            "classify_bulk",
+            self.source,
+            batch_size=2,
+            workers=1,
+            stdout=out,
+            stderr=io.StringIO(),
+            **options,
+        )
+        return out.getvalue()
+
+    @staticmethod
+    def stored_files():
+        return tuple(
+            set(default_storage.listdir(folder)[1])
+            if default_storage.exists(folder)
+            else set()
+            for folder in ("images", "thumbnails")
+        )
+
+    def assert_stored_once(self):
+        predictions = Prediction.objects.filter(submitted_by=self.user)
+        self.assertEqual(predictions.count(), 5)
+        images = {os.path.basename(p.image_file.name) for p in predictions}
+        thumbnails = {os.path.basename(p.thumbnail.name) for p in predictions}
+        self.assertEqual(len(images), 5)
+        self.assertEqual(self.stored_files(), (images, thumbnails))
+
+    def test_database_output_resumes_without_orphans(self):
+        self.interrupt_at = 2
+        self.assertIn("Interrupted after 2 images", self.classify(user="bulk"))
+        self.assertEqual(Prediction.objects.count(), 2)
+        images, thumbnails = self.stored_files()
+        self.assertEqual((len(images), len(thumbnails)), (2, 2))
+
+        self.assertIn("Resuming after 2 of 5", self.classify(user="bulk"))
+        self.assert_stored_once()
+        self.assertIn("Nothing left", self.classify(user="bulk"))
+
+    def test_failed_batch_write_leaves_no_files(self):
+        with (
+            mock.patch(
+                "prediction.management.commands.classify_bulk.update_rollups",
+                side_effect=KeyboardInterrupt,
+            ),
+            self.assertRaises(KeyboardInterrupt),
+        ):
+            DatabaseOutput(self.user).write(
+                [("a.png", (self.make_upload(), ContentFile(b"")), np.eye(10)[0])],
+                done=1,
+            )
+        self.assertFalse(Prediction.objects.exists())
+        self.assertEqual(self.stored_files(), (set(), set()))
+
+    def test_batch_replayed_after_a_lost_checkpoint_is_not_duplicated(self):
+        save_state = ClassifyBulkCommand._save_state
+        saves = []
+
+        def lose_second_checkpoint(path, state):
+            saves.append(state["done"])
+            if len(saves) == 2:
+                raise KeyboardInterrupt
+            save_state(path, state)
+
+        # The first batch is committed, but the checkpoint after it is lost.
+        with mock.patch.object(
+            ClassifyBulkCommand, "_save_state", side_effect=lose_second_checkpoint
+        ):
+            self.classify(user="bulk")
+        self.assertEqual(Prediction.objects.count(), 2)
+        self.assertNotIn("Resuming", self.classify(user="bulk"))
+        self.assert_stored_once()
+
+    def test_csv_output_resumes_from_its_checkpoint(self):
+        output = os.path.join(self.tmp, "results.csv")
+        self.interrupt_at = 2
+        self.classify(output=output)
+        self.classify(output=output)
+        with open(output, newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0][:3], ["path", "label", "confidence"])
+        self.assertEqual(
+            [row[:2] for row in rows[1:]], [[f"{i}.png", "cat"] for i in range(5)]
+        )
+        self.assertFalse(Prediction.objects.exists())
+        self.assertEqual(self.stored_files(), (set(), set()))
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_parquet_output_resumes_from_its_checkpoint(self):
+        import pyarrow.parquet as pq  # noqa: PLC0415
+
+        output = os.path.join(self.tmp, "results.parquet")
+        self.interrupt_at = 2
+        self.classify(output=output)
+        self.classify(output=output)
+        table = pq.read_table(output)
+        self.assertEqual(
+            sorted(table["path"].to_pylist()), [f"{i}.png" for i in range(5)]
+        )
+        self.assertEqual(set(table["label"].to_pylist()), {"cat"})
+
+    def test_other_target_needs_restart(self):
+        self.interrupt_at = 2
+        self.classify(user="bulk")
+        with self.assertRaisesMessage(CommandError, "use --restart"):
+            self.classify(output=os.path.join(self.tmp, "results.csv"))
+
+
+class HistoryPaginationTests(TestCase):
+    """Keyset pagination of a user's prediction history."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("history")
+        other = User.objects.create_user("someone-else")
+        start = timezone.make_aware(datetime(2026, 1, 1))
+        # Two pairs share a timestamp, so pages must break ties on id.
+        times = [start, start, start + timedelta(hours=1), start + timedelta(hours=1)]
+        times += [start + timedelta(hours=h) for h in (2, 3, 4)]
+        cls.predictions = []
+        for i, uploaded_at in enumerate(times):
+            prediction = Prediction(
+                submitted_by=cls.user,
+                uploaded_at=uploaded_at,
+                image_file=f"images/history_{i}.png",
+            )
+            prediction.set_probabilities(np.eye(10)[i])
+            prediction.save()
+            cls.predictions.append(prediction)
+        Prediction.objects.create(submitted_by=other, uploaded_at=start)
+        cls.newest_first = sorted(
+            cls.predictions, key=lambda p: (p.uploaded_at, p.id), reverse=True
+        )
+
+    def test_pages_walk_every_row_once_in_order(self):
+        seen, offsets, cursor = [], [], None
+        while True:
+            page, offset, cursor = history_page(self.user, cursor, page_size=3)
+            seen.extend(page)
+            offsets.append(offset)
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.newest_first)
+        self.assertEqual(offsets, [0, 3, 6])
+
+    def test_exact_final_page_has_no_next_cursor(self):
+        page, _, cursor = history_page(self.user, page_size=7)
+        self.assertEqual(len(page), 7)
+        self.assertIsNone(cursor)
+
+    def test_cursor_round_trip_and_bad_cursor(self):
+        prediction = self.newest_first[2]
+        self.assertEqual(
+            decode_cursor(encode_cursor(prediction, 3)),
+            (prediction.uploaded_at, prediction.id, 3),
+        )
+        with self.assertRaises(ValueError):
+            history_page(self.user, "not-a-cursor")
+
+    @override_settings(PREDICTION_HISTORY_PAGE_SIZE=4)
+    def test_json_endpoint(self):
+        client = Client(SERVER_NAME="localhost")
+        client.force_login(self.user)
+        url = reverse("prediction_history_json")
+        first = client.get(url).json()
+        self.assertEqual(
+            [row["id"] for row in first["results"]],
+            [p.id for p in self.newest_first[:4]],
+        )
+        self.assertEqual(first["results"][0]["classes"][0], "frog")
+        self.assertIn("history_6.png", first["html"])
+
+        second = client.get(url, {"cursor": first["next"]}).json()
+        self.assertEqual(
+            [row["id"] for row in second["results"]],
+            [p.id for p in self.newest_first[4:]],
+        )
+        self.assertIsNone(second["next"])
+        # Row numbers carry on from the previous page.
+        self.assertIn(">5</td>", second["html"])
+
+        response = client.get(url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_json_endpoint_requires_login(self):
+        response = Client(SERVER_NAME="localhost").get(
+            reverse("prediction_history_json")
+        )
+        self.assertEqual(response.status_code, 302)
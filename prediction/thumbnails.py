@@ -0,0 +1,68 @@
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+
+logger = logging.getLogger(__name__)
+
+# Large enough for the 64px history cell on high-density screens and the
+# 50pt PDF cell; small enough that pages and exports never touch originals.
+THUMBNAIL_SIZE = (128, 128)
+
+
+def thumbnail_path(image_name):
+    """Storage path of the thumbnail for an image stored as ``image_name``."""
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f"thumbnails/{stem}.jpg"
+
+
+def render_thumbnail(img, size=THUMBNAIL_SIZE):
+    """Encode a fixed-size JPEG thumbnail of a decoded image."""
+    img = img.copy()
+    img.thumbnail(size)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    output = io.BytesIO()
+    img.save(output, format="JPEG", quality=80)
+    return ContentFile(output.getvalue())
+
+
+def save_thumbnail(image_name, img):
+    """Store the thumbnail of ``img`` and return its storage name."""
+    path = thumbnail_path(image_name)
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    return default_storage.save(path, render_thumbnail(img))
+
+
+def ensure_thumbnail(prediction):
+    """Return the prediction's thumbnail, generating it from the original once.
+
+    Returns None when there is no readable original image.
+    """
+    if prediction.thumbnail:
+        return prediction.thumbnail
+    if not prediction.image_file:
+        return None
+    try:
+        with (
+            default_storage.open(prediction.image_file.name) as f,
+            Image.open(f) as img,
+        ):
+            prediction.thumbnail = save_thumbnail(prediction.image_file.name, img)
+    except Exception as e:
+        logger.warning(f"Error creating thumbnail for prediction {prediction.id}: {e}")
+        return None
+    type(prediction).objects.filter(id=prediction.id).update(
+        thumbnail=prediction.thumbnail.name
+    )
+    return prediction.thumbnail
+
+
+def delete_thumbnail(prediction):
+    if prediction.thumbnail and default_storage.exists(prediction.thumbnail.name):
+        default_storage.delete(prediction.thumbnail.name)
@@ -4,9 +4,25 @@ from django.urls import path
 
 urlpatterns = [
     path("", views.addpredict, name="addpredict"),
+    path("batch/", views.batch_predict, name="batch_predict"),
+    path("job/<int:job_id>/", views.prediction_job, name="prediction_job"),
+    path(
+        "job/<int:job_id>/status",
+        views.prediction_job_status,
+        name="prediction_job_status",
+    ),
+    path("cache-stats", views.prediction_cache_stats, name="prediction_cache_stats"),
+    path("metrics", views.prediction_metrics, name="prediction_metrics"),
+    path("timings", views.prediction_timings, name="prediction_timings"),
     path("predictionhistory", views.prediction_history, name="prediction_history"),
+    path(
+        "predictionhistory.json",
+        views.prediction_history_json,
+        name="prediction_history_json",
+    ),
     path(
         "delete/<int:prediction_id>/", views.delete_prediction, name="delete_prediction"
     ),
     path("export-pdf/", views.export_pdf, name="export_pdf"),
+    path("export-pdf/<int:export_id>/", views.pdf_export, name="pdf_export"),
 ]
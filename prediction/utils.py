@@ -1,14 +1,19 @@
 import io
 import logging
 import os
-from urllib.parse import urlparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
+from .cache import get_prediction_cache, image_cache_key
+from .fetcher import FetchError, fetch_image
+from .metrics import timed
 from .models import Prediction
-from .naive import allowed_file, predict
+from .naive import allowed_file, model_version, predict_many_proba, predict_proba
+from .thumbnails import render_thumbnail, thumbnail_path
 from django.conf import settings
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
+from django.db import connections
 from PIL import Image
 
 
@@ -16,38 +21,67 @@ logger = logging.getLogger(__name__)
 MAX_FILE_SIZE = 10 * 1024 * 1024
 
 
+class UploadedImage:
+    """A submitted image, decoded once and kept in memory for inference.
+
+    ``content`` holds the encoded bytes still to be written to storage; it is
+    None for images that were loaded back from storage or already persisted.
+    ``storage_path`` and ``thumbnail_path`` are the requested names until
+    :func:`save_uploaded_image` replaces them with the names storage chose.
+    """
+
+    def __init__(self, name, image, content=None):
+        self.name = name
+        self.image = image
+        self.content = content
+        self.storage_path = f"images/{name}"
+        self.thumbnail_path = thumbnail_path(name)
+        self.thumbnail_saved = False
+
+    @classmethod
+    def from_storage(cls, name):
+        """Decode an image previously saved under ``images/``."""
+        upload = cls(name, None)
+        with default_storage.open(upload.storage_path) as f:
+            upload.image = Image.open(f)
+            upload.image.load()
+        return upload
+
+
 def compress_image(uploaded_file, max_size=(800, 800)):
+    """Decode and downscale an upload; return the image and its encoded bytes."""
     try:
         img = Image.open(uploaded_file)
         img.thumbnail(max_size)
         output = io.BytesIO()
         img.save(output, format=img.format or "JPEG", quality=85)
-        output.seek(0)
-        return ContentFile(output.read(), name=uploaded_file.name)
+        return img, ContentFile(output.getvalue(), name=uploaded_file.name)
     except Exception as e:
         logger.error(f"Error compressing image: {e}")
-        return None
+        return None, None
 
 
-def get_image_from_request(request, user_data, target_dir):  # noqa: PLR0911
-    link = request.POST.get("link")
-    if link:
-        parsed_url = urlparse(link)
-        if parsed_url.scheme not in {"http", "https"}:
-            return None, "Only HTTP or HTTPS URLs are allowed."
+def get_image_from_link(link, unique_filename):
+    """Download and decode an image link; return ``(upload, error)``."""
+    try:
+        with timed("fetch"):
+            fetched = fetch_image(link, MAX_FILE_SIZE)
+    except FetchError as e:
+        return None, str(e)
+    with timed("decode"):
+        img, compressed_file = compress_image(
+            ContentFile(fetched.content, name=f"link.{fetched.extension}")
+        )
+    if not compressed_file:
+        return None, "The link does not point to a valid image."
+    img_name = f"{unique_filename}.{fetched.extension}"
+    return UploadedImage(img_name, img, compressed_file), None
 
-        file_ext = "jpg"
-        img_name = f"{user_data['unique_filename']}.{file_ext}"
-        img_path = os.path.join(target_dir, img_name)
 
-        try:
-            response = requests.get(link, timeout=5)
-            response.raise_for_status()
-            with open(img_path, "wb") as f:
-                f.write(response.content)
-            return img_name, None
-        except requests.RequestException as e:
-            return None, f"Error fetching image: {e}"
+def get_image_from_request(request, user_data):
+    link = request.POST.get("link")
+    if link:
+        return get_image_from_link(link, user_data["unique_filename"])
 
     if "file" in request.FILES:
         uploaded_file = request.FILES["file"]
@@ -56,34 +90,124 @@ def get_image_from_request(request, user_data, target_dir):  # noqa: PLR0911
             return None, "File size exceeds 10MB limit."
         if not allowed_file(uploaded_file.name):
             return None, "Invalid file format. Only JPG, JPEG, and PNG are allowed."
-        compressed_file = compress_image(uploaded_file)
+        with timed("decode"):
+            img, compressed_file = compress_image(uploaded_file)
         if not compressed_file:
             return None, "Error processing uploaded image."
         file_ext = uploaded_file.name.split(".")[-1].lower()
         img_name = f"{user_data['unique_filename']}.{file_ext}"
-        default_storage.save(f"images/{img_name}", compressed_file)
-        return img_name, None
+        return UploadedImage(img_name, img, compressed_file), None
 
     return None, "No image provided."
 
 
-def process_and_save_prediction(img, user):
-    img_full_path = os.path.join(settings.MEDIA_ROOT, "images", img)
-    if not os.path.exists(img_full_path):
-        return None, "The image file was not found."
+def save_uploaded_image(upload, thumbnail=True):
+    """Write an upload and (unless ``thumbnail`` is False) its thumbnail, once.
+
+    Storage renames a file whose name is taken, so the returned names are
+    kept for the prediction row rather than the requested ones.
+    """
+    if upload.content is not None:
+        upload.storage_path = default_storage.save(upload.storage_path, upload.content)
+        upload.name = os.path.basename(upload.storage_path)
+        upload.thumbnail_path = thumbnail_path(upload.name)
+        upload.content = None
+    if thumbnail and not upload.thumbnail_saved:
+        upload.thumbnail_path = default_storage.save(
+            upload.thumbnail_path, render_thumbnail(upload.image)
+        )
+        upload.thumbnail_saved = True
+
+
+_storage_executor = None
+_storage_lock = threading.Lock()
+
 
-    class_result, prob_result = predict(img_full_path)
+def save_uploaded_image_later(upload, prediction):
+    """Save the upload on a background writer after ``prediction`` is stored."""
+    global _storage_executor
+    if _storage_executor is None:
+        with _storage_lock:
+            if _storage_executor is None:
+                _storage_executor = ThreadPoolExecutor(
+                    max_workers=2, thread_name_prefix="prediction-storage"
+                )
+    future = _storage_executor.submit(_save_and_relink, upload, prediction.pk)
+    future.add_done_callback(_log_storage_error)
+
+
+def _save_and_relink(upload, prediction_id):
+    requested = (upload.storage_path, upload.thumbnail_path)
+    try:
+        save_uploaded_image(upload)
+        # The row was saved with the requested names; follow any rename.
+        if (upload.storage_path, upload.thumbnail_path) != requested:
+            Prediction.objects.filter(id=prediction_id).update(
+                image_file=upload.storage_path, thumbnail=upload.thumbnail_path
+            )
+    finally:
+        connections.close_all()
+
+
+def _log_storage_error(future):
+    if future.exception() is not None:
+        logger.error(f"Error saving uploaded image: {future.exception()}")
+
+
+def predict_cached(img):
+    """Return class probabilities, skipping inference for images seen before."""
+    cache = get_prediction_cache()
+    if cache is None:
+        return predict_proba(img)
+
+    with timed("cache_lookup"):
+        key = image_cache_key(img, model_version())
+        result = cache.get(key)
+    if result is None:
+        result = predict_proba(img)
+        cache.set(key, result)
+    return result
+
+
+def predict_many_cached(images):
+    """Class probabilities for many images, running one batch for cache misses."""
+    cache = get_prediction_cache()
+    if cache is None:
+        return list(predict_many_proba(images))
+
+    version = model_version()
+    keys = [image_cache_key(img, version) for img in images]
+    results = [cache.get(key) for key in keys]
+    misses = [i for i, result in enumerate(results) if result is None]
+    for i, result in zip(
+        misses, predict_many_proba([images[i] for i in misses]), strict=True
+    ):
+        cache.set(keys[i], result)
+        results[i] = result
+    return results
+
+
+def build_prediction(user, upload, probabilities):
+    """Return an unsaved Prediction row for an upload's class probabilities."""
     prediction = Prediction(
         submitted_by=user,
-        image_file=f"images/{img}",
-        class_1=class_result[0],
-        prob_1=prob_result[0],
-        class_2=class_result[1],
-        prob_2=prob_result[1],
-        class_3=class_result[2],
-        prob_3=prob_result[2],
-        class_4=class_result[3],
-        prob_4=prob_result[3],
+        image_file=upload.storage_path,
+        thumbnail=upload.thumbnail_path,
     )
-    prediction.save()
+    prediction.set_probabilities(probabilities)
+    return prediction
+
+
+def process_and_save_prediction(upload, user):
+    """Classify an in-memory upload, persist its image and record the result."""
+    probabilities = predict_cached(upload.image)
+    deferred = settings.PREDICTION_DEFER_STORAGE
+    if not deferred:
+        with timed("storage"):
+            save_uploaded_image(upload)
+    prediction = build_prediction(user, upload, probabilities)
+    with timed("db_save"):
+        prediction.save()
+    if deferred:
+        save_uploaded_image_later(upload, prediction)
     return prediction, None
@@ -1,35 +1,115 @@
 import json
 import logging
 import os
+import secrets
 import uuid
-from datetime import timedelta
-from io import BytesIO
-
-from .models import Prediction
-from .utils import get_image_from_request, process_and_save_prediction
+from datetime import date
+
+from .batch import classify_batch, collect_sources
+from .cache import get_prediction_cache
+from .dashboard import get_dashboard_context
+from .exports import filter_predictions
+from .jobs import enqueue_export, enqueue_prediction
+from .metrics import render_prometheus, timings
+from .models import PdfExport, Prediction, PredictionJob
+from .naive import get_batcher
+from .pagination import history_page
+from .thumbnails import delete_thumbnail
+from .utils import (
+    get_image_from_request,
+    process_and_save_prediction,
+    save_uploaded_image,
+)
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.contrib.auth.models import User
-from django.db.models import Count
-from django.db.models.functions import TruncDate
-from django.http import HttpResponse
+from django.core.cache import caches
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
-from django.utils import timezone
-from PIL import Image
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.utils import ImageReader
-from reportlab.pdfgen import canvas
+from django.template.loader import render_to_string
+from django_ratelimit.core import (
+    EXPIRATION_FUDGE,
+    _get_window,  # noqa: PLC2701
+    _make_cache_key,  # noqa: PLC2701
+    _split_rate,  # noqa: PLC2701
+    get_usage,
+)
+from django_ratelimit.decorators import ratelimit
+from django_ratelimit.exceptions import Ratelimited
 
 
 logger = logging.getLogger(__name__)
 
 
+# Single uploads and batches draw on the same per-user budget.
+UPLOAD_RATE_GROUP = "prediction.upload"
+
+
+def upload_rate(group, request):
+    return settings.PREDICTION_RATE_LIMIT
+
+
+def export_rate(group, request):
+    return settings.PREDICTION_EXPORT_RATE_LIMIT
+
+
+def _upload_usage(request):
+    """The user's upload usage in the current window, or None if not limited."""
+    return get_usage(
+        request, group=UPLOAD_RATE_GROUP, key="user", rate=upload_rate, method="POST"
+    )
+
+
+def _charge_uploads(request, images):
+    """Count ``images`` uploads against the user's rate; raise once it is exceeded.
+
+    get_usage counts one request per call, so the whole batch is added to
+    django_ratelimit's counter in a single increment instead, under the key
+    its private helpers build.
+    """
+    rate = upload_rate(UPLOAD_RATE_GROUP, request)
+    limit, period = _split_rate(rate)
+    value = str(request.user.pk)
+    cache_key = _make_cache_key(
+        UPLOAD_RATE_GROUP, _get_window(value, period), rate, value, "POST"
+    )
+    cache = caches[settings.RATELIMIT_USE_CACHE]
+    cache.add(cache_key, 0, period + EXPIRATION_FUDGE)
+    if cache.incr(cache_key, images) > limit:
+        raise Ratelimited()
+
+
+def _enqueue_upload(request, user_data):
+    """Queue the submitted image as a prediction job and show its status page."""
+    link = request.POST.get("link")
+    if link:
+        # The worker downloads the link, so a slow host never holds the request.
+        job = enqueue_prediction(
+            user_data["unique_filename"], request.user, source_url=link
+        )
+    else:
+        upload, error = get_image_from_request(request, user_data)
+        if error:
+            messages.error(request, error)
+            return render(request, "predictionform/form.html", {"error": error})
+        # The worker writes the thumbnail along with the prediction.
+        save_uploaded_image(upload, thumbnail=False)
+        job = enqueue_prediction(upload.name, request.user)
+    messages.info(request, "Your image has been queued for prediction.")
+    return redirect("prediction_job", job_id=job.id)
+
+
 @login_required(login_url="/account/login")
+@ratelimit(
+    group=UPLOAD_RATE_GROUP, key="user", rate=upload_rate, method="POST", block=True
+)
 def addpredict(request):
-    target_dir = os.path.join(settings.MEDIA_ROOT, "images")
-    os.makedirs(target_dir, exist_ok=True)
-
     if request.method != "POST":
         return render(request, "predictionform/form.html", {"error": ""})
 
@@ -39,13 +119,16 @@ def addpredict(request):
         "unique_filename": f"{request.user.username}_{request.user.id}_{uuid.uuid4().hex[:6]}",
     }
 
-    img, error = get_image_from_request(request, user_data, target_dir)
+    if settings.PREDICTION_ASYNC_JOBS:
+        return _enqueue_upload(request, user_data)
+
+    upload, error = get_image_from_request(request, user_data)
     if error:
         messages.error(request, error)
         return render(request, "predictionform/form.html", {"error": error})
 
     try:
-        prediction, error = process_and_save_prediction(img, request.user)
+        prediction, error = process_and_save_prediction(upload, request.user)
         if error:
             messages.error(request, error)
             return render(request, "predictionform/form.html", {"error": error})
@@ -59,18 +142,198 @@ def addpredict(request):
         return render(request, "predictionform/form.html", {"error": str(e)})
 
 
+@login_required(login_url="/account/login")
+def batch_predict(request):
+    """Classify many uploaded images, a ZIP archive or image links, streaming progress.
+
+    The response is newline-delimited JSON: one ``progress`` object per
+    processed chunk followed by a final ``summary``.
+    """
+    if request.method != "POST":
+        return render(
+            request,
+            "predictionform/batch_form.html",
+            {"max_files": settings.PREDICTION_BATCH_UPLOAD_MAX_FILES},
+        )
+
+    files = request.FILES.getlist("files")
+    archives = request.FILES.getlist("archive")
+    links = request.POST.get("links", "").split()
+    # Reject a batch that cannot fit the remaining budget before any archive
+    # is opened; each file, archive and link holds at least one image.
+    usage = _upload_usage(request)
+    if (
+        usage
+        and usage["count"] + len(files) + len(archives) + len(links) > usage["limit"]
+    ):
+        raise Ratelimited()
+    try:
+        sources = collect_sources(
+            files,
+            archives,
+            limit=settings.PREDICTION_BATCH_UPLOAD_MAX_FILES,
+            links=links,
+        )
+    except ValueError as e:
+        return JsonResponse({"type": "error", "error": str(e)}, status=400)
+    if usage:
+        _charge_uploads(request, len(sources))
+
+    events = classify_batch(
+        sources, request.user, chunk_size=settings.PREDICTION_BATCH_UPLOAD_CHUNK
+    )
+    response = StreamingHttpResponse(
+        (json.dumps(event) + "\n" for event in events),
+        content_type="application/x-ndjson",
+    )
+    response["X-Accel-Buffering"] = "no"  # let nginx pass progress through
+    return response
+
+
+@login_required(login_url="/account/login")
+def prediction_job(request, job_id):
+    """Show a queued prediction: a waiting page until done, then the result."""
+    job = get_object_or_404(
+        PredictionJob.objects.select_related("prediction"),
+        id=job_id,
+        submitted_by=request.user,
+    )
+    if job.status == PredictionJob.Status.DONE:
+        if job.prediction is None:
+            # SET_NULL: the result was deleted after the job finished.
+            messages.info(request, "The prediction for this job has been deleted.")
+            return redirect("prediction_history")
+        return render(
+            request, "predictionform/success.html", {"prediction": job.prediction}
+        )
+    if job.status == PredictionJob.Status.FAILED:
+        messages.error(request, job.error)
+        return render(request, "predictionform/form.html", {"error": job.error})
+    return render(request, "predictionform/job_status.html", {"job": job})
+
+
+@login_required(login_url="/account/login")
+def prediction_job_status(request, job_id):
+    """JSON status of a queued prediction, polled by the waiting page."""
+    job = get_object_or_404(PredictionJob, id=job_id, submitted_by=request.user)
+    return JsonResponse({
+        "id": job.id,
+        "status": job.status,
+        "error": job.error,
+        "prediction_id": job.prediction_id,
+    })
+
+
+@login_required(login_url="/account/login")
+@user_passes_test(lambda u: u.is_staff, login_url="/account/login")
+def prediction_cache_stats(request):
+    """Hit/miss counters of this process's prediction cache."""
+    cache = get_prediction_cache()
+    return JsonResponse(cache.stats() if cache else {"enabled": False})
+
+
+def _pipeline_stats():
+    cache = get_prediction_cache()
+    batcher = get_batcher() if settings.PREDICTION_BATCHING else None
+    return (cache.stats() if cache else None, batcher.stats() if batcher else None)
+
+
+def prediction_metrics(request):
+    """This process's stage timings and counters in Prometheus text format.
+
+    Open to staff, and to scrapers sending ``Authorization: Bearer <token>``
+    with PREDICTION_METRICS_TOKEN.
+    """
+    token = settings.PREDICTION_METRICS_TOKEN
+    authorization = request.headers.get("Authorization", "")
+    if not request.user.is_staff and not (
+        token and secrets.compare_digest(authorization, f"Bearer {token}")
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render_prometheus(*_pipeline_stats()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@login_required(login_url="/account/login")
+@user_passes_test(lambda u: u.is_staff, login_url="/account/login")
+def prediction_timings(request):
+    """Staff page with per-stage latency percentiles of this process."""
+    stages = []
+    for stage, histogram in timings.histograms().items():
+        summary = histogram.summary()
+        count = summary.pop("count")
+        # Durations are shown in milliseconds.
+        stages.append({
+            "stage": stage,
+            "count": count,
+            **{name: seconds * 1000 for name, seconds in summary.items()},
+        })
+    cache_stats, batcher_stats = _pipeline_stats()
+    return render(
+        request,
+        "predictionform/timings.html",
+        {
+            "stages": stages,
+            "sample_rate": settings.PREDICTION_METRICS_SAMPLE_RATE,
+            "cache_stats": cache_stats,
+            "batcher_stats": batcher_stats,
+        },
+    )
+
+
 @login_required(login_url="/account/login")
 def prediction_history(request):
     if request.user.is_authenticated:
-        prediction = Prediction.objects.filter(submitted_by=request.user).order_by(
-            "-uploaded_at"
-        )
-        context = {"prediction": prediction}
+        try:
+            prediction, offset, next_cursor = history_page(
+                request.user,
+                request.GET.get("cursor"),
+                settings.PREDICTION_HISTORY_PAGE_SIZE,
+            )
+        except ValueError:
+            return redirect("prediction_history")
+        context = {
+            "prediction": prediction,
+            "offset": offset,
+            "next_cursor": next_cursor,
+        }
         return render(request, "predictionform/predictionhistory.html", context)
     messages.error(request, "You must login to your account first")
     return redirect("login")
 
 
+@login_required(login_url="/account/login")
+def prediction_history_json(request):
+    """One history page as JSON, with rendered rows for infinite scrolling."""
+    try:
+        prediction, offset, next_cursor = history_page(
+            request.user,
+            request.GET.get("cursor"),
+            settings.PREDICTION_HISTORY_PAGE_SIZE,
+        )
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    results = [
+        {
+            "id": p.id,
+            "uploaded_at": p.uploaded_at.isoformat(),
+            "image_url": p.image_file.url if p.image_file else "",
+            "thumbnail_url": p.thumbnail_url,
+            "classes": p.top_results[0],
+            "probabilities": p.top_results[1],
+        }
+        for p in prediction
+    ]
+    html = render_to_string(
+        "predictionform/history_rows.html",
+        {"prediction": prediction, "offset": offset},
+        request=request,
+    )
+    return JsonResponse({"results": results, "html": html, "next": next_cursor})
+
+
 @login_required(login_url="/account/login")
 def delete_prediction(request, prediction_id):
     if not request.user.is_authenticated:
@@ -84,6 +347,7 @@ def delete_prediction(request, prediction_id):
             image_path = prediction.image_file.path
             if os.path.isfile(image_path):
                 os.remove(image_path)
+        delete_thumbnail(prediction)
         prediction.delete()
         messages.success(request, "Prediction deleted successfully.")
         return redirect("prediction_history")
@@ -91,167 +355,63 @@ def delete_prediction(request, prediction_id):
     return redirect("prediction_history")
 
 
+def _parse_date(value):
+    return date.fromisoformat(value) if value else None
+
+
 @login_required(login_url="/account/login")
-def export_pdf(request):  # noqa: C901, PLR0915
-    """Generate and export the prediction history as a PDF with images."""
+@ratelimit(key="user", rate=export_rate, block=True)
+def export_pdf(request):
+    """Export the prediction history as a PDF with images.
+
+    The PDF is rendered by the job workers and the user is sent to a page
+    that links the file once it is ready. ``start`` and ``end``
+    (YYYY-MM-DD) limit the export to a date range.
+    """
     if not request.user.is_authenticated:
         return HttpResponse("Unauthorized", status=401)
 
-    predictions = Prediction.objects.filter(submitted_by=request.user).order_by(
-        "-uploaded_at"
-    )
-    if not predictions.exists():
+    try:
+        start_date = _parse_date(request.GET.get("start"))
+        end_date = _parse_date(request.GET.get("end"))
+    except ValueError:
+        messages.error(request, "Invalid date range.")
+        return redirect("prediction_history")
+
+    if not filter_predictions(request.user, start_date, end_date).exists():
         messages.info(request, "No predictions found.")
         return HttpResponse("No data available", content_type="text/plain")
 
-    buffer = BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=letter)
-    _, letter_height = letter
-
-    def setup_pdf_canvas():
-        pdf.setTitle("Prediction History")
-        pdf.setFont("Helvetica-Bold", 16)
-        pdf.drawString(230, letter_height - 50, "Prediction History")
-
-    def draw_table_headers(y_pos):
-        pdf.setFont("Helvetica-Bold", 12)
-        pdf.drawString(20, y_pos, "S.N")
-        pdf.drawString(95, y_pos, "Image")
-        pdf.drawString(225, y_pos, "Class A")
-        pdf.drawString(325, y_pos, "Probability A")
-        pdf.drawString(425, y_pos, "Class B")
-        pdf.drawString(525, y_pos, "Probability B")
-        pdf.drawString(625, y_pos, "Class C")
-        pdf.drawString(725, y_pos, "Probability C")
-
-    def draw_prediction_row(index, prediction, y_pos):
-        pdf.drawString(20, y_pos, str(index))
-        if prediction.image_file:
-            try:
-                image_path = os.path.join(
-                    settings.MEDIA_ROOT, str(prediction.image_file)
-                )
-                with Image.open(image_path) as img:
-                    img.thumbnail((50, 50))
-                    img_buffer = BytesIO()
-                    img.save(img_buffer, format="PNG")
-                    img_buffer.seek(0)
-                    pdf.drawImage(
-                        ImageReader(img_buffer), 95, y_pos - 20, width=50, height=50
-                    )
-            except Exception as e:
-                pdf.drawString(95, y_pos, "[Error: Img]")
-                messages.warning(request, f"Error loading image: {e}")
-        pdf.drawString(225, y_pos, prediction.class_1 or "")
-        pdf.drawString(325, y_pos, f"{prediction.prob_1}%" if prediction.prob_1 else "")
-        pdf.drawString(425, y_pos, prediction.class_2 or "")
-        pdf.drawString(525, y_pos, f"{prediction.prob_2}%" if prediction.prob_2 else "")
-        pdf.drawString(625, y_pos, prediction.class_3 or "")
-        pdf.drawString(725, y_pos, f"{prediction.prob_3}%" if prediction.prob_3 else "")
-
-    def create_pdf_response(buffer):
-        buffer.seek(0)
-        response = HttpResponse(buffer, content_type="application/pdf")
-        response["Content-Disposition"] = "attachment; filename=prediction_history.pdf"
-        buffer.close()
-        return response
-
-    setup_pdf_canvas()
-    y_position = letter_height - 100
-    draw_table_headers(y_position)
-    pdf.setFont("Helvetica", 12)
-    y_position -= 50
-
-    for index, p in enumerate(predictions, start=1):
-        if y_position < 100:
-            pdf.showPage()
-            pdf.setFont("Helvetica", 12)
-            y_position = letter_height - 50
-            draw_table_headers(y_position)
-            y_position -= 50
-        draw_prediction_row(index, p, y_position)
-        y_position -= 60
-
-    pdf.showPage()
-    pdf.save()
-    return create_pdf_response(buffer)
-
-
-# @cache_page(60 * 2)
-@login_required(login_url="/account/login")
-@user_passes_test(lambda u: u.is_superuser, login_url="/account/login")
-def admin_dashboard(request):  # noqa: PLR0914
-    """Admin dashboard with overview of key metrics."""
-    # Total users
-    total_users = User.objects.count()
+    export = enqueue_export(request.user, start_date, end_date)
+    messages.info(request, "Your PDF is being generated.")
+    return redirect("pdf_export", export_id=export.id)
 
-    # Total predictions
-    total_predictions = Prediction.objects.count()
 
-    # Average predictions per user
-    total_active_users = (
-        User.objects.filter(prediction__isnull=False).distinct().count()
-    )
-    avg_predictions_per_user = (
-        round(total_predictions / total_active_users, 2)
-        if total_active_users > 0
-        else 0
-    )
+@login_required(login_url="/account/login")
+def pdf_export(request, export_id):
+    """Status page of a background PDF export; downloads the file when done."""
+    export = get_object_or_404(PdfExport, id=export_id, submitted_by=request.user)
+    if export.status == PredictionJob.Status.DONE and export.file:
+        if request.GET.get("download"):
+            return FileResponse(
+                export.file.open("rb"),
+                as_attachment=True,
+                filename="prediction_history.pdf",
+                content_type="application/pdf",
+            )
+    elif export.status == PredictionJob.Status.FAILED:
+        messages.error(request, export.error)
+    return render(request, "predictionform/export_status.html", {"export": export})
 
-    # Most predicted class (based on class_1)
-    most_predicted = (
-        Prediction.objects.exclude(class_1__isnull=True)
-        .values("class_1")
-        .annotate(count=Count("class_1"))
-        .order_by("-count")
-        .first()
-    )
-    most_predicted_class = most_predicted["class_1"] if most_predicted else "N/A"
-
-    # Recent predictions (last 5)
-    recent_predictions = Prediction.objects.select_related("submitted_by").order_by(
-        "-uploaded_at"
-    )[:5]
-
-    # Predictions over the last 7 days for the chart
-    today = timezone.now()
-    start_date = today - timedelta(days=7)
-    prediction_counts_by_date = (
-        Prediction.objects.filter(uploaded_at__gte=start_date)
-        .annotate(date=TruncDate("uploaded_at"))
-        .values("date")
-        .annotate(count=Count("id"))
-        .order_by("date")
-    )
-    date_counts = {entry["date"]: entry["count"] for entry in prediction_counts_by_date}
-    chart_labels = []
-    chart_data = []
-    for i in range(7, -1, -1):
-        date = (today - timedelta(days=i)).date()
-        chart_labels.append(date.strftime("%Y-%m-%d"))
-        chart_data.append(date_counts.get(date, 0))
-
-    # New Stats
-    # Recent user registrations (last 7 days)
-    recent_users = User.objects.filter(date_joined__gte=start_date).count()
-
-    # Top active users (top 5 by prediction count)
-    top_active_users = (
-        User.objects.filter(prediction__isnull=False)
-        .annotate(prediction_count=Count("prediction"))
-        .order_by("-prediction_count")[:5]
-    )
 
+@login_required(login_url="/account/login")
+@user_passes_test(lambda u: u.is_superuser, login_url="/account/login")
+def admin_dashboard(request):
+    """Admin dashboard with overview of key metrics."""
+    context = get_dashboard_context()
     context = {
-        "total_users": total_users,
-        "total_predictions": total_predictions,
-        "avg_predictions_per_user": avg_predictions_per_user,
-        "most_predicted_class": most_predicted_class,
-        "recent_predictions": recent_predictions,
-        "has_predictions": total_predictions > 0,
-        "chart_labels": json.dumps(chart_labels),
-        "chart_data": json.dumps(chart_data),
-        "recent_users": recent_users,
-        "top_active_users": top_active_users,
+        **context,
+        "chart_labels": json.dumps(context["chart_labels"]),
+        "chart_data": json.dumps(context["chart_data"]),
     }
     return render(request, "index/dashboard.html", context)